@@ -3,6 +3,7 @@ import readers
 import vis
 import tools
 import constants
+import parcel
 
 #What do we want to pull into the top-level namespace
 from calc import *
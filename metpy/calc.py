@@ -1,16 +1,111 @@
 'A collection of generic calculation functions.'
 
-__all__ = ['vapor_pressure', 'dewpoint', 'get_speed_dir','get_wind_components',
+__all__ = ['vapor_pressure', 'VaporPressureTable', 'dewpoint', 'get_speed_dir','get_wind_components',
     'mixing_ratio','tke', 'windchill', 'heat_index', 'h_convergence',
     'v_vorticity', 'convergence_vorticity', 'advection', 'geostrophic_wind']
 
+from multiprocessing.pool import ThreadPool
 import numpy as np
 from numpy.ma import log, exp, cos, sin, masked_array
 from scipy.constants import degree, kilo, hour, g
 from metpy.cbook import iterable
 
 sat_pressure_0c = 6.112 # mb
-def vapor_pressure(temp):
+
+def _is_masked(*args):
+    'Helper for checking whether any of the arguments are masked arrays.'
+    return any(isinstance(a, np.ma.MaskedArray) for a in args)
+
+def _prepare_out(out, *args):
+    '''
+    Helper for the unmasked kernels.  Converts *args* to arrays and returns
+    them after the array that will hold the result.  If *out* is None, it is
+    allocated with the broadcast shape of *args*, keeping the precision of
+    floating point inputs (anything else gives float64).  Any argument that
+    shares memory with *out* is copied, since the kernels overwrite *out*
+    before they are done reading their inputs.
+    '''
+    args = [np.asarray(a) for a in args]
+    if out is None:
+        dtype = np.result_type(*args)
+        if dtype.kind != 'f':
+            dtype = np.float64
+        shape = np.broadcast(*args).shape if len(args) > 1 else args[0].shape
+        out = np.empty(shape, dtype=dtype)
+    else:
+        args = [a.copy() if np.may_share_memory(a, out) else a for a in args]
+    return [out] + args
+
+def _finish_out(result, out):
+    '''
+    Helper for returning the result of a kernel, turning 0-dimensional
+    results back into scalars unless they were written to a given *out*.
+    Masked results are copied into *out* if one is given.
+    '''
+    if out is None:
+        return result[()] if result.ndim == 0 else result
+    if result is not out:
+        out[...] = result
+    return out
+
+# Arrays smaller than this are always calculated serially, and larger ones
+# are split into blocks of about this many elements for the threads
+_parallel_min_size = 2**18
+_parallel_block_size = 2**16
+
+def _run_kernel(kernel, out, args, workers=None, **kwargs):
+    '''
+    Helper for running an in place kernel, which is called as
+    kernel(out, *args, **kwargs) and returns a mask of undefined values (or
+    None).  With more than one *workers*, large arrays are split into
+    blocks small enough to stay in cache, which are calculated by a pool of
+    threads writing into the same output.  This works since numpy releases
+    the GIL in the ufuncs the kernels use.
+
+    Returns : tuple
+        The output array and the mask (or None)
+    '''
+    args = _prepare_out(out, *args)
+    out, args = args[0], args[1:]
+    if not workers or workers < 2 or out.size < _parallel_min_size:
+        return out, kernel(out, *args, **kwargs)
+
+    # Blocks are runs along the outermost axis whose trailing dimensions
+    # fit in a block, so that each one is contiguous in a C ordered output
+    # however small the leading dimensions are
+    args = [np.broadcast_to(a, out.shape) for a in args]
+    axis = 0
+    while np.prod(out.shape[axis + 1:]) > _parallel_block_size:
+        axis += 1
+    step = max(1, _parallel_block_size // int(np.prod(out.shape[axis + 1:])))
+    blocks = [index + (slice(i, i + step),)
+              for index in np.ndindex(*out.shape[:axis])
+              for i in range(0, out.shape[axis], step)]
+    def run_block(block):
+        return kernel(out[block], *[a[block] for a in args], **kwargs)
+
+    pool = ThreadPool(workers)
+    try:
+        masks = pool.map(run_block, blocks)
+    finally:
+        pool.close()
+        pool.join()
+
+    if masks[0] is None:
+        return out, None
+    mask = np.empty(out.shape, dtype=np.bool_)
+    for block, block_mask in zip(blocks, masks):
+        mask[block] = block_mask
+    return out, mask
+
+def _mask_undefined(result, mask):
+    'Helper for masking undefined values, but only if there are any.'
+    mask = np.asarray(mask)
+    if mask.any():
+        result = masked_array(result, mask=mask)
+    return result
+
+def vapor_pressure(temp, out=None, table=None):
     '''
     Calculate the saturation water vapor (partial) pressure given
     *temperature*.
@@ -18,16 +113,167 @@ def vapor_pressure(temp):
     temp : scalar or array
         The temperature in degrees Celsius.
 
+    out : array, optional
+        An array in which to place the result, which must have the
+        right shape.  It may be *temp* itself.
+
+    table : :class:`VaporPressureTable`, boolean, or None
+        A lookup table to interpolate the vapor pressure from, instead of
+        evaluating the exponential.  True uses a default table with a
+        resolution of 0.05C between -100C and 60C, whose maximum relative
+        error is 1.3e-5.  Defaults to None, which uses the exact formula.
+
     Returns : scalar or array
         The saturation water vapor (partial) presure in millibars, with
         the same shape as *temp*.
 
     Instead of temperature, dewpoint may be used in order to calculate
     the actual (ambient) water vapor (partial) pressure.
-    '''
-    return sat_pressure_0c * exp(17.67 * temp / (temp + 243.5))
 
-def dewpoint(temp, rh):
+    Unless *temp* is a masked array, the calculation is done in place
+    in the output array without any temporary arrays, and single precision
+    input gives a single precision result.
+    '''
+    if _is_masked(temp):
+        return _finish_out(sat_pressure_0c * exp(17.67 * temp / (temp + 243.5)),
+            out)
+
+    if table:
+        if table is True:
+            table = _default_vapor_pressure_table()
+        return table(temp, out)
+
+    result, temp = _prepare_out(out, temp)
+    _vapor_pressure_kernel(result, temp)
+    return _finish_out(result, out)
+
+def _vapor_pressure_kernel(out, temp):
+    'Helper for calculating the vapor pressure in place in *out*.'
+    np.add(temp, 243.5, out=out)
+    np.divide(temp, out, out=out)
+    out *= 17.67
+    np.exp(out, out=out)
+    out *= sat_pressure_0c
+
+# Number of values looked up at a time by VaporPressureTable
+_table_block_size = 2**15
+
+class VaporPressureTable(object):
+    '''
+    A lookup table for calculating the saturation water vapor pressure, as
+    in :func:`vapor_pressure`, by linear interpolation between values
+    tabulated at evenly spaced temperatures.  This replaces the division
+    and exponential for each value with two table lookups, and the values
+    are worked through in blocks that stay in cache, so this is faster than
+    the exact formula for large arrays.  Temperatures outside the table (and
+    NaNs) fall back to the exact formula.
+
+    tmin, tmax : scalar
+        The range of temperatures (in degrees Celsius) in the table.
+        *tmin* must be above -243.5C, where the formula is singular.
+        Defaults to -100C and 60C.
+
+    step : scalar
+        The spacing of the temperatures in the table.  Defaults to 0.05C.
+
+    The maximum relative error versus the exact formula within the table is
+    available as the *max_rel_error* attribute.  This is a bound, not an
+    estimate: for f(T) = 6.112 exp(g(T)), linear interpolation over
+    [T0, T1] has error at most (step**2 / 8) max |f''|, and f''/f =
+    g'**2 + g'' is positive and decreasing for temperatures of interest,
+    so the relative error on the interval is at most
+    (step**2 / 8) (g'(T0)**2 + g''(T0)) f(T1) / f(T0).  The bound
+    scales with step**2; 1.3e-5 for the default 0.05C spacing,
+    decreasing to 5.1e-7 for 0.01C.
+    '''
+    def __init__(self, tmin=-100., tmax=60., step=0.05):
+        if tmin <= -243.5:
+            raise ValueError('Table cannot start below -243.5C')
+        self.tmin = float(tmin)
+        self.step = float(step)
+        npoints = int(np.ceil((tmax - tmin) / step)) + 1
+        self.tmax = self.tmin + (npoints - 1) * self.step
+        temps = self.tmin + self.step * np.arange(npoints)
+        self.values = vapor_pressure(temps)
+
+        # Each interval is stored as an intercept and slope in terms of the
+        # position in the table plus one.  The NaNs at each end are where
+        # the lookup clips temperatures outside the table to (those just
+        # below tmin truncate to 0), so they show up in the result.
+        self.slopes = np.empty(npoints + 1)
+        self.slopes[[0, -1]] = np.nan
+        self.slopes[1:-1] = np.diff(self.values)
+        self.intercepts = np.empty(npoints + 1)
+        self.intercepts[[0, -1]] = np.nan
+        self.intercepts[1:-1] = (self.values[:-1]
+            - np.arange(1, npoints) * self.slopes[1:-1])
+
+        # Bound on the relative error of each interval, see above
+        a, b = 17.67, 243.5
+        x = temps[:-1] + b
+        curvature = a * b / x**3 * (a * b / x - 2)
+        bound = (self.step**2 / 8.) * curvature * (self.values[1:]
+            / self.values[:-1])
+        self.max_rel_error = bound.max()
+
+    def __call__(self, temp, out=None):
+        '''
+        Look up the saturation vapor pressure for *temp* (degrees Celsius),
+        placing the result in *out*, if given.  The result is float64
+        unless *temp* (or *out*) is float32.
+        '''
+        result, temp = _prepare_out(out, temp)
+        temp = temp.ravel()
+        contiguous = result.flags.c_contiguous
+        if contiguous:
+            flat = result.reshape(-1)
+        else:
+            flat = np.empty(result.size, dtype=result.dtype)
+
+        # The values are worked through in blocks small enough to stay in
+        # cache, reusing the same few scratch arrays.  The position in the
+        # table is worked out in double precision (single precision would
+        # lose the fraction within the interval), and only the final value
+        # is cast to the type of the result.
+        scale = 1. / self.step
+        offset = 1. - self.tmin / self.step
+        pos = np.empty(min(temp.size, _table_block_size))
+        buf = np.empty_like(pos)
+        inds = np.empty(pos.shape, dtype=np.intp)
+        with np.errstate(invalid='ignore'):
+            for start in range(0, temp.size, _table_block_size):
+                block = slice(start, start + _table_block_size)
+                n = len(flat[block])
+                if n < len(pos):
+                    pos, buf, inds = pos[:n], buf[:n], inds[:n]
+                np.multiply(temp[block], scale, out=pos, dtype=np.float64)
+                pos += offset
+                inds[...] = pos
+                self.slopes.take(inds, out=buf, mode='clip')
+                pos *= buf
+                self.intercepts.take(inds, out=buf, mode='clip')
+                pos += buf
+                # Values outside the table (and NaNs) come out as NaN, which
+                # a sum finds faster than checking the range
+                if np.isnan(pos.sum()):
+                    outside = np.isnan(pos)
+                    pos[outside] = vapor_pressure(
+                        temp[block][outside].astype(np.float64))
+                flat[block] = pos
+
+        if not contiguous:
+            result[...] = flat.reshape(result.shape)
+        return _finish_out(result, out)
+
+_vapor_pressure_table = None
+def _default_vapor_pressure_table():
+    'Helper for creating the default lookup table the first time it is used.'
+    global _vapor_pressure_table
+    if _vapor_pressure_table is None:
+        _vapor_pressure_table = VaporPressureTable()
+    return _vapor_pressure_table
+
+def dewpoint(temp, rh, out=None, workers=None):
     '''
     Calculate the ambient dewpoint given air temperature and relative
     humidity.
@@ -38,15 +284,62 @@ def dewpoint(temp, rh):
     rh : scalar or array
         The relative humidity expressed as a ratio in the range [0, 1]
 
+    out : array, optional
+        An array in which to place the result, which must have the
+        broadcast shape of the inputs.
+
+    workers : integer, optional
+        The number of threads to use for the calculation.  Large arrays
+        are split into blocks that are calculated in parallel; small
+        arrays (and masked arrays) are always calculated serially.
+        Defaults to None, which is serial.
+
     Returns : scalar or array
         The dew point temperature in degrees Celsius, with the shape
         of the result being determined using numpy's broadcasting rules.
+        Values where *rh* is not positive are masked.
+
+    Unless the inputs are masked arrays, the vapor pressure and logarithm
+    are fused into a single pass over the output array, using
+    log(rh * es / 6.112) = log(rh) + 17.67 * T / (T + 243.5).
     '''
-    es = vapor_pressure(temp)
-    val = log(rh * es/sat_pressure_0c)
-    return 243.5 * val / (17.67 - val)
+    if _is_masked(temp, rh):
+        es = vapor_pressure(temp)
+        val = log(rh * es/sat_pressure_0c)
+        return _finish_out(243.5 * val / (17.67 - val), out)
+
+    result, invalid = _run_kernel(_dewpoint_kernel, out, (temp, rh), workers)
 
-def mixing_ratio(part_press, tot_press):
+    # Match the masked implementation, where the log masks rh <= 0
+    result = _finish_out(result, out)
+    if invalid.any():
+        return masked_array(result, mask=invalid)
+    return result
+
+def _dewpoint_kernel(out, temp, rh):
+    '''
+    Helper for calculating the dewpoint for unmasked arrays in place in
+    *out*.  Returns the mask of values that are not finite.
+    '''
+    np.add(temp, 243.5, out=out)
+    np.divide(temp, out, out=out)
+    out *= 17.67
+    old_err = np.seterr(divide='ignore', invalid='ignore')
+    try:
+        # Reuse the log buffer for the denominator when the shapes allow
+        tmp = np.empty(rh.shape, dtype=out.dtype)
+        np.log(rh, out=tmp)
+        out += tmp
+        if tmp.shape != out.shape:
+            tmp = np.empty_like(out)
+        np.subtract(17.67, out, out=tmp)
+        out /= tmp
+    finally:
+        np.seterr(**old_err)
+    out *= 243.5
+    return ~np.isfinite(out)
+
+def mixing_ratio(part_press, tot_press, out=None):
     '''
     Calculates the mixing ratio of gas given its partial pressure
     and the total pressure of the air.
@@ -57,13 +350,23 @@ def mixing_ratio(part_press, tot_press):
     tot_press : scalar or array
         The total air pressure.
 
+    out : array, optional
+        An array in which to place the result, which must have the
+        broadcast shape of the inputs.
+
     Returns : scalar or array
         The (mass) mixing ratio, unitless (e.g. Kg/Kg or g/g)
 
     There are no required units for the input arrays, other than that
     they have the same units.
     '''
-    return part_press / (tot_press - part_press)
+    if _is_masked(part_press, tot_press):
+        return _finish_out(part_press / (tot_press - part_press), out)
+
+    result, part_press, tot_press = _prepare_out(out, part_press, tot_press)
+    np.subtract(tot_press, part_press, out=result)
+    np.divide(part_press, result, out=result)
+    return _finish_out(result, out)
 
 def get_speed_dir(u,v,w=None):
     '''
@@ -130,7 +433,7 @@ def tke(u,v,w):
     return tke
 
 def windchill(temp, speed, metric=True, face_level_winds=False,
-    mask_undefined=True):
+    mask_undefined=True, out=None, workers=None):
     '''
     Calculate the Wind Chill Temperature Index (WCTI) from the current
     temperature and wind speed.
@@ -169,9 +472,28 @@ def windchill(temp, speed, metric=True, face_level_winds=False,
         the temperature > 50F or wind speed <= 3 miles per hour. Defaults
         to True.
 
+    out : array, optional
+        An array in which to place the result, which must have the
+        broadcast shape of the inputs.
+
+    workers : integer, optional
+        The number of threads to use for the calculation.  Large arrays
+        are split into blocks that are calculated in parallel; small
+        arrays (and masked arrays) are always calculated serially.
+        Defaults to None, which is serial.
+
     Returns : scalar or array
         The correspond Wind Chill Temperature Index value(s)
     '''
+    if not _is_masked(temp, speed):
+        result, mask = _run_kernel(_windchill_kernel, out, (temp, speed),
+            workers, metric=metric, face_level_winds=face_level_winds,
+            mask_undefined=mask_undefined)
+        result = _finish_out(result, out)
+        if mask_undefined:
+            return _mask_undefined(result, mask)
+        return result
+
     # Correct for lower height measurement of winds if necessary
     if face_level_winds:
         speed = speed * 1.5
@@ -192,13 +514,44 @@ def windchill(temp, speed, metric=True, face_level_winds=False,
 
     #See if we need to mask any undefined values
     if mask_undefined:
-        mask = np.array((temp > temp_limit) | (speed <= speed_limit))
-        if mask.any():
-            wcti = masked_array(wcti, mask=mask)
+        wcti = _mask_undefined(wcti, (temp > temp_limit) | (speed <= speed_limit))
 
-    return wcti
+    return _finish_out(wcti, out)
 
-def heat_index(temp, rh, mask_undefined=True):
+def _windchill_kernel(out, temp, speed, metric, face_level_winds,
+    mask_undefined):
+    '''
+    Helper for calculating wind chill for unmasked arrays in place in *out*.
+    The formula is rearranged as a + b * s + T * (c + d * s), with s the
+    speed factor, so that the only temporary is the speed factor itself.
+    Returns the mask of undefined values, if requested.
+    '''
+    factor = 1.5 if face_level_winds else 1.
+    if metric:
+        temp_limit, speed_limit = 10., 4.828 #Temp in C, speed in km/h
+        factor *= hour / kilo
+        a, b, c, d = 13.12, -11.37, 0.6215, 0.3965
+    else:
+        temp_limit, speed_limit = 50., 3.
+        a, b, c, d = 35.74, -35.75, 0.6215, 0.4275
+
+    speed_factor = np.empty(speed.shape, dtype=out.dtype)
+    np.multiply(speed, factor, out=speed_factor)
+    if mask_undefined:
+        mask = (temp > temp_limit) | (speed_factor <= speed_limit)
+    np.power(speed_factor, 0.16, out=speed_factor)
+
+    np.multiply(speed_factor, d, out=out)
+    out += c
+    out *= temp
+    speed_factor *= b
+    speed_factor += a
+    out += speed_factor
+
+    if mask_undefined:
+        return mask
+
+def heat_index(temp, rh, mask_undefined=True, out=None, workers=None):
     '''
     Calculate the Heat Index from the current temperature and relative
     humidity.
@@ -218,6 +571,16 @@ def heat_index(temp, rh, mask_undefined=True):
         the temperature < 80F or relative humidity < 40 percent. Defaults
         to True.
 
+    out : array, optional
+        An array in which to place the result, which must have the
+        broadcast shape of the inputs.
+
+    workers : integer, optional
+        The number of threads to use for the calculation.  Large arrays
+        are split into blocks that are calculated in parallel; small
+        arrays (and masked arrays) are always calculated serially.
+        Defaults to None, which is serial.
+
     Returns : scalar or array
         The corresponding Heat Index value(s)
 
@@ -226,6 +589,14 @@ def heat_index(temp, rh, mask_undefined=True):
         temperature-humidity index based on human physiology and clothing
         science. J. Appl. Meteor., 18, 861-873.
     '''
+    if not _is_masked(temp, rh):
+        result, mask = _run_kernel(_heat_index_kernel, out, (temp, rh),
+            workers, mask_undefined=mask_undefined)
+        result = _finish_out(result, out)
+        if mask_undefined:
+            return _mask_undefined(result, mask)
+        return result
+
     rh2 = rh**2
     temp2 = temp**2
 
@@ -237,84 +608,222 @@ def heat_index(temp, rh, mask_undefined=True):
 
     # See if we need to mask any undefined values
     if mask_undefined:
-        mask = np.array((temp < 80.) | (rh < 40))
-        if mask.any():
-            HI = masked_array(HI, mask=mask)
+        HI = _mask_undefined(HI, (temp < 80.) | (rh < 40))
 
-    return HI
+    return _finish_out(HI, out)
 
-def _get_gradients(u, v, dx, dy):
-    #Helper function for getting convergence and vorticity from 2D arrays
-    dudx, dudy = np.gradient(u, dx, dy)
-    dvdx, dvdy = np.gradient(v, dx, dy)
-    return dudx, dudy, dvdx, dvdy
+def _heat_index_kernel(out, temp, rh, mask_undefined):
+    '''
+    Helper for calculating the heat index for unmasked arrays in place in
+    *out*.  The polynomial is evaluated in Horner form, as a quadratic in
+    relative humidity whose coefficients are quadratics in temperature,
+    which needs a single temporary with the shape of *temp*.  Returns the
+    mask of undefined values, if requested.
+    '''
+
+    # Coefficient of rh**2
+    np.multiply(temp, -1.99e-6, out=out)
+    out += 8.5282e-4
+    out *= temp
+    out -= 5.481717e-2
+    out *= rh
+
+    # Coefficient of rh
+    tmp = np.empty(temp.shape, dtype=out.dtype)
+    np.multiply(temp, 1.22874e-3, out=tmp)
+    tmp -= 0.22475541
+    tmp *= temp
+    tmp += 10.14333127
+    out += tmp
+    out *= rh
+
+    # Constant term
+    np.multiply(temp, -6.83783e-3, out=tmp)
+    tmp += 2.04901523
+    tmp *= temp
+    tmp -= 42.379
+    out += tmp
+
+    if mask_undefined:
+        return (temp < 80.) | (rh < 40)
 
-def v_vorticity(u, v, dx, dy):
+def _derivative(f, axis=0, delta=1.):
     '''
-    Calculate the vertical vorticity of the horizontal wind.  The grid
-    must have a constant spacing in each direction.
+    Calculate the derivative of *f* along a single axis, using second order
+    centered differences in the interior and first order differences at
+    the edges (the same as :func:`numpy.gradient`).  Only the one derivative
+    is calculated, so any other (leading or trailing) dimensions are
+    treated as a batch of independent arrays.
+
+    f : N-dimensional array
+        The values to differentiate.
+
+    axis : integer
+        The axis along which to take the derivative.
+
+    delta : scalar or 1-dimensional array
+        Either the (constant) grid spacing along *axis* or the coordinates
+        of the grid points, which do not need to be evenly spaced.
 
-    u, v : 2 dimensional arrays
+    Returns : N-dimensional array
+        The derivative, with the same shape as *f*.
+    '''
+    f = np.asanyarray(f)
+    axis = axis % f.ndim
+    n = f.shape[axis]
+    if n < 2:
+        raise ValueError('At least 2 points are needed along axis %d' % axis)
+
+    dtype = f.dtype if f.dtype.kind == 'f' else np.float64
+    out = np.empty_like(f, dtype=dtype)
+
+    def sl(s):
+        'Index *f* or *out* with the slice *s* along *axis*.'
+        index = [slice(None)] * f.ndim
+        index[axis] = s
+        return tuple(index)
+
+    delta = np.asarray(delta, dtype=np.float64)
+    if delta.ndim == 0:
+        interior = sl(slice(1, -1))
+        if _is_masked(f):
+            out[interior] = f[sl(slice(2, None))] - f[sl(slice(None, -2))]
+        else:
+            np.subtract(f[sl(slice(2, None))], f[sl(slice(None, -2))],
+                out=out[interior])
+        out[interior] *= 0.5 / delta
+        out[sl(0)] = (f[sl(1)] - f[sl(0)]) / delta
+        out[sl(-1)] = (f[sl(-1)] - f[sl(-2)]) / delta
+        return out
+
+    if delta.shape != (n,):
+        raise ValueError('Coordinates along axis %d must have length %d'
+            % (axis, n))
+
+    # Weights for the second order difference on an uneven grid, shaped to
+    # broadcast along *axis*
+    dx = np.diff(delta)
+    dx1 = dx[:-1]
+    dx2 = dx[1:]
+    shape = [1] * f.ndim
+    shape[axis] = n - 2
+    a = (-dx2 / (dx1 * (dx1 + dx2))).reshape(shape)
+    b = ((dx2 - dx1) / (dx1 * dx2)).reshape(shape)
+    c = (dx1 / (dx2 * (dx1 + dx2))).reshape(shape)
+
+    interior = sl(slice(1, -1))
+    out[interior] = a * f[sl(slice(None, -2))]
+    out[interior] += b * f[interior]
+    out[interior] += c * f[sl(slice(2, None))]
+    out[sl(0)] = (f[sl(1)] - f[sl(0)]) / dx[0]
+    out[sl(-1)] = (f[sl(-1)] - f[sl(-2)]) / dx[-1]
+    return out
+
+def _masked_if(a, *others):
+    '''
+    Helper for getting a masked view of *a* if any of *others* are masked
+    arrays, so that updating it in place with them keeps their masks.
+    '''
+    if _is_masked(*others):
+        return np.ma.asarray(a)
+    return a
+
+def v_vorticity(u, v, dx, dy, axes=(0, 1)):
+    '''
+    Calculate the vertical vorticity of the horizontal wind.
+
+    u, v : N dimensional arrays
         Arrays with the x and y components of the wind, respectively.
-        X must be the first dimension and y the second.
+        By default, x is the first dimension and y the second, and any
+        trailing dimensions (e.g. level and time) are handled as a batch.
+        Use *axes* for arrays with other layouts.
 
-    dx : scalar
-        The grid spacing in the x-direction
+    dx : scalar or 1 dimensional array
+        The grid spacing in the x-direction, or the x coordinates of the
+        grid points if the spacing is not constant.
 
-    dy : scalar
-        The grid spacing in the y-direction
+    dy : scalar or 1 dimensional array
+        The grid spacing in the y-direction, or the y coordinates of the
+        grid points if the spacing is not constant.
 
-    Returns : 2 dimensional array
+    axes : tuple of 2 integers
+        The dimensions corresponding to x and y.  Defaults to (0, 1), the
+        same as :func:`geostrophic_wind`.  For a (time, level, x, y) array,
+        this would be (-2, -1).
+
+    Returns : N dimensional array
         The vertical vorticity
     '''
-    dudx, dudy, dvdx, dvdy = _get_gradients(u, v, dx, dy)
-    return dvdx - dudy
+    x_axis, y_axis = axes
+    dudy = _derivative(u, y_axis, dy)
+    vort = _masked_if(_derivative(v, x_axis, dx), dudy)
+    vort -= dudy
+    return vort
 
-def h_convergence(u, v, dx, dy):
+def h_convergence(u, v, dx, dy, axes=(0, 1)):
     '''
-    Calculate the horizontal convergence of the horizontal wind.  The grid
-    must have a constant spacing in each direction.
+    Calculate the horizontal convergence of the horizontal wind.
 
-    u, v : 2 dimensional arrays
+    u, v : N dimensional arrays
         Arrays with the x and y components of the wind, respectively.
-        X must be the first dimension and y the second.
+        By default, x is the first dimension and y the second, and any
+        trailing dimensions (e.g. level and time) are handled as a batch.
+        Use *axes* for arrays with other layouts.
+
+    dx : scalar or 1 dimensional array
+        The grid spacing in the x-direction, or the x coordinates of the
+        grid points if the spacing is not constant.
 
-    dx : scalar
-        The grid spacing in the x-direction
+    dy : scalar or 1 dimensional array
+        The grid spacing in the y-direction, or the y coordinates of the
+        grid points if the spacing is not constant.
 
-    dy : scalar
-        The grid spacing in the y-direction
+    axes : tuple of 2 integers
+        The dimensions corresponding to x and y.  Defaults to (0, 1), the
+        same as :func:`geostrophic_wind`.  For a (time, level, x, y) array,
+        this would be (-2, -1).
 
-    Returns : 2 dimensional array
+    Returns : N dimensional array
         The horizontal convergence
     '''
-    dudx, dudy, dvdx, dvdy = _get_gradients(u, v, dx, dy)
-    return dudx + dvdy
+    x_axis, y_axis = axes
+    dvdy = _derivative(v, y_axis, dy)
+    conv = _masked_if(_derivative(u, x_axis, dx), dvdy)
+    conv += dvdy
+    return conv
 
-def convergence_vorticity(u, v, dx, dy):
+def convergence_vorticity(u, v, dx, dy, axes=(0, 1)):
     '''
     Calculate the horizontal convergence and vertical vorticity of the
-    horizontal wind.  The grid must have a constant spacing in each direction.
-    This is a convenience function that will do less work than calculating
-    the horizontal convergence and vertical vorticity separately.
+    horizontal wind.  This is a convenience function that will do less work
+    than calculating the horizontal convergence and vertical vorticity
+    separately.
 
-    u, v : 2 dimensional arrays
+    u, v : N dimensional arrays
         Arrays with the x and y components of the wind, respectively.
-        X must be the first dimension and y the second.
+        By default, x is the first dimension and y the second, and any
+        trailing dimensions (e.g. level and time) are handled as a batch.
+        Use *axes* for arrays with other layouts.
 
-    dx : scalar
-        The grid spacing in the x-direction
+    dx : scalar or 1 dimensional array
+        The grid spacing in the x-direction, or the x coordinates of the
+        grid points if the spacing is not constant.
 
-    dy : scalar
-        The grid spacing in the y-direction
+    dy : scalar or 1 dimensional array
+        The grid spacing in the y-direction, or the y coordinates of the
+        grid points if the spacing is not constant.
 
-    Returns : A 2-item tuple of 2 dimensional arrays
+    axes : tuple of 2 integers
+        The dimensions corresponding to x and y.  Defaults to (0, 1), the
+        same as :func:`geostrophic_wind`.  For a (time, level, x, y) array,
+        this would be (-2, -1).
+
+    Returns : A 2-item tuple of N dimensional arrays
         A tuple of (horizontal convergence, vertical vorticity)
     '''
-    dudx, dudy, dvdx, dvdy = _get_gradients(u, v, dx, dy)
-    return dudx + dvdy, dvdx - dudy
+    return h_convergence(u, v, dx, dy, axes), v_vorticity(u, v, dx, dy, axes)
 
-def advection(scalar, wind, deltas):
+def advection(scalar, wind, deltas, axes=None):
     '''
     Calculate the advection of *scalar* by the wind. The order of the
     dimensions of the arrays must match the order in which the wind
@@ -329,28 +838,48 @@ def advection(scalar, wind, deltas):
         Length N sequence of N-dimensional arrays.  Represents the flow,
         with a component of the wind in each dimension.  For example, for
         horizontal advection, this could be a list: [u, v], where u and v
-        are each a 2-dimensional array.
+        are each a 2-dimensional array.  If *axes* is given, there should
+        instead be a component for each of those dimensions.
 
     deltas : sequence
         A (length N) sequence containing the grid spacing in each dimension.
+        Each item can instead be a 1-dimensional array of coordinates, for
+        dimensions that are not evenly spaced.
+
+    axes : sequence of integers or None
+        The dimensions of *scalar* that correspond to the components of
+        *wind*.  Any other dimensions, such as time, are handled as a
+        batch.  Defaults to None, which uses all of the dimensions.
 
     Return : N-dimensional array
         An N-dimensional array containing the advection at all grid points.
     '''
-    # Gradient returns a list of derivatives along each dimension.  We convert
-    # this to an array with dimension as the first index
-    grad = np.asarray(np.gradient(scalar, *deltas))
-
-    # This allows passing in a list of wind components or an array
-    wind = np.asarray(wind)
-
-    # Make them be at least 2D (handling the 1D case) so that we can do the
-    # multiply and sum below
-    grad,wind = np.atleast_2d(grad, wind)
-
-    return (-grad * wind).sum(axis=0)
-
-def geostrophic_wind(heights, f, dx, dy, geopotential=False):
+    scalar = np.asanyarray(scalar)
+    if axes is None:
+        axes = range(scalar.ndim)
+    if len(deltas) == 1:
+        # A single spacing applies to all dimensions, as in np.gradient
+        deltas = list(deltas) * len(axes)
+
+    # A single array for the wind is used as the component for every
+    # dimension
+    if np.ndim(wind) == scalar.ndim:
+        wind = [wind] * len(axes)
+
+    # Accumulate the products of the wind components and the derivatives
+    # one dimension at a time
+    adv = None
+    for comp, axis, delta in zip(wind, axes, deltas):
+        deriv = _masked_if(_derivative(scalar, axis, delta), comp)
+        deriv *= comp
+        if adv is None:
+            adv = deriv
+        else:
+            adv = _masked_if(adv, deriv)
+            adv += deriv
+    return -adv
+
+def geostrophic_wind(heights, f, dx, dy, geopotential=False, axes=(0, 1)):
     '''
     Calculate the geostrophic wind given from the heights.  If geopotential
     is set to true, it treats the passed in heights as geopotential and
@@ -367,11 +896,18 @@ def geostrophic_wind(heights, f, dx, dy, geopotential=False):
         The coriolis parameter in s^-1.  This can be a scalar to be applied
         everywhere or an array of values.
 
-    dx : scalar
-        The grid spacing in the x-direction in meters.
+    dx : scalar or 1-dimensional array
+        The grid spacing in the x-direction in meters, or the x coordinates
+        of the grid points if the spacing is not constant.
 
-    dy : scalar
-        The grid spacing in the y-direction in meters.
+    dy : scalar or 1-dimensional array
+        The grid spacing in the y-direction in meters, or the y coordinates
+        of the grid points if the spacing is not constant.
+
+    axes : tuple of 2 integers
+        The dimensions of *heights* corresponding to x and y.  Defaults to
+        (0, 1), the same as the vorticity and convergence functions.  For a
+        (time, level, x, y) array, this would be (-2, -1).
 
     Returns : A 2-item tuple of arrays
         A tuple of the x-component and y-component of the geostropic wind in
@@ -382,13 +918,9 @@ def geostrophic_wind(heights, f, dx, dy, geopotential=False):
     else:
         norm_factor = g / f
 
-    # If heights is has more than 2 dimensions, we need to pass in some dummy
-    # grid deltas so that we can still use np.gradient.  It may be better to
-    # to loop in this case, but that remains to be done.
-    deltas = [dx, dy]
-    if heights.ndim > 2:
-        deltas = deltas + [1.] * (heights.ndim - 2)
-
-    grad = np.gradient(heights, *deltas)
-    dx,dy = grad[0], grad[1] # This throws away unused gradient components
-    return -norm_factor * dy, norm_factor * dx
+    x_axis, y_axis = axes
+    ug = _masked_if(_derivative(heights, y_axis, dy), norm_factor)
+    ug *= -norm_factor
+    vg = _masked_if(_derivative(heights, x_axis, dx), norm_factor)
+    vg *= norm_factor
+    return ug, vg
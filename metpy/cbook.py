@@ -4,6 +4,10 @@ from operator import itemgetter as _itemgetter
 from keyword import iskeyword as _iskeyword
 import itertools
 import sys as _sys
+import os as _os
+import time as _time
+import tempfile as _tempfile
+from hashlib import md5 as _md5
 import numpy as np
 from numpy import ma
 
@@ -176,6 +180,145 @@ def lru_cache(maxsize):
         return wrapper
     return decorating_function
 
+class DiskCache(object):
+    '''
+    A cache of byte strings stored as files in a directory, keyed by an
+    arbitrary string (such as a URL).  The total size of the cache is
+    limited, with the least recently used entries removed first.
+
+    directory : string
+        The directory in which to store the cached files.  It will be
+        created when the first entry is stored.
+
+    max_size : integer
+        The maximum total size, in bytes, of all of the cached files.
+        Defaults to 100 MB.
+
+    Cache performance statistics are stored in the hits and misses
+    attributes.
+    '''
+    def __init__(self, directory, max_size=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return _os.path.join(self.directory, _md5(key).hexdigest())
+
+    def __contains__(self, key):
+        return _os.path.exists(self._path(key))
+
+    def modified(self, key):
+        '''
+        Return the time (in seconds since the epoch) at which the entry for
+        *key* was stored, or None if there is no entry.
+        '''
+        try:
+            return _os.path.getmtime(self._path(key))
+        except OSError:
+            return None
+
+    def get(self, key, max_age=None):
+        '''
+        Return the cached data for *key*, or None if there is no entry.
+
+        max_age : scalar or None
+            The maximum age, in seconds, of an entry that will be returned.
+            Older entries are treated as missing.  If None (the default),
+            entries never expire.
+        '''
+        path = self._path(key)
+        try:
+            modified = _os.path.getmtime(path)
+            if max_age is not None and _time.time() - modified > max_age:
+                self.misses += 1
+                return None
+            fh = open(path, 'rb')
+            try:
+                data = fh.read()
+            finally:
+                fh.close()
+            # Update the access time, which is used for the LRU eviction,
+            # while leaving the modification time (the age) alone
+            _os.utime(path, (_time.time(), modified))
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        '''
+        Store *data* in the cache under *key* and evict old entries.  The
+        cache is only an optimization, so if the entry can't be written
+        (e.g. the disk is full), nothing is stored.
+        '''
+        tmp_path = None
+        try:
+            if not _os.path.isdir(self.directory):
+                _os.makedirs(self.directory)
+
+            # Write to a temporary file and rename so that other processes
+            # never see a partially written entry
+            fd, tmp_path = _tempfile.mkstemp(dir=self.directory,
+                suffix='.tmp')
+            try:
+                _os.write(fd, data)
+            finally:
+                _os.close(fd)
+            _os.rename(tmp_path, self._path(key))
+        except (IOError, OSError):
+            if tmp_path is not None:
+                try:
+                    _os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for fname in _os.listdir(self.directory):
+            if fname.endswith('.tmp'):
+                continue
+            path = _os.path.join(self.directory, fname)
+            try:
+                info = _os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_atime, info.st_size, path))
+        return entries
+
+    def size(self):
+        'Return the total size, in bytes, of the cached data.'
+        if not _os.path.isdir(self.directory):
+            return 0
+        return sum(e[1] for e in self._entries())
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(e[1] for e in entries)
+        entries.sort()
+        for atime, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                _os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        'Remove all entries from the cache.'
+        if not _os.path.isdir(self.directory):
+            return
+        for atime, size, path in self._entries():
+            try:
+                _os.remove(path)
+            except OSError:
+                pass
+
 #
 # These can be removed once numpy 1.3 is released
 #
@@ -1,4 +1,9 @@
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
 from numpy import *
+from numpy import dtype as dtype_
 from numpy.linalg import norm
 
 try:
@@ -18,6 +23,89 @@ except:
     # return array(radians) * 180.0 / pi
 
 
+# WGS-84 ellipsoid
+WGS84_a = 6378137.0                 # Equatorial radius, m
+WGS84_f = 1/298.257223563           # Flattening
+WGS84_b = WGS84_a * (1 - WGS84_f)   # Polar radius, m
+WGS84_e2 = WGS84_f * (2 - WGS84_f)  # First eccentricity squared
+WGS84_ep2 = WGS84_e2 / (1 - WGS84_e2) # Second eccentricity squared
+
+def _blockwise(kernel, inputs, out, dtype, buffersize):
+    """Run kernel(in1, in2, in3, out1, out2, out3) over 1-D blocks of the broadcast inputs, 
+    so that the temporary arrays stay small no matter how many points there are. The 
+    outputs are allocated with the given dtype unless out is given. Each block is read 
+    before it is written, so out can be the input arrays themselves."""
+    if out is None:
+        out = (None, None, None)
+        if dtype is None:
+            dtype = 'float64'
+    elif dtype is None:
+        dtype = out[0].dtype
+    dtype = dtype_(dtype)
+    it = nditer(list(inputs) + list(out),
+        flags=['external_loop', 'buffered', 'zerosize_ok', 'refs_ok'],
+        op_flags=[['readonly']]*3 + [['writeonly', 'allocate', 'no_broadcast']]*3,
+        op_dtypes=[dtype]*6, casting='same_kind', buffersize=buffersize)
+    for block in it:
+        kernel(*block)
+    return tuple(it.operands[3:])
+
+def _geodetic_to_ecef_kernel(lon, lat, alt, x, y, z):
+    lon = radians(lon)
+    lat = radians(lat)
+    sinlat = sin(lat)
+    coslat = cos(lat)
+    # Prime vertical radius of curvature
+    N = WGS84_a / sqrt(1 - WGS84_e2 * sinlat * sinlat)
+    # The outputs may be the inputs, so they are only written at the end
+    zz = (N * (1 - WGS84_e2) + alt) * sinlat
+    N += alt
+    N *= coslat
+    x[...] = N * cos(lon)
+    y[...] = N * sin(lon)
+    z[...] = zz
+
+def _ecef_to_geodetic_kernel(x, y, z, lon, lat, alt):
+    p = hypot(x, y)
+    # Bowring's (1976) method with one iteration, starting from the parametric latitude
+    theta = arctan2(z * WGS84_a, p * WGS84_b)
+    s = sin(theta)
+    c = cos(theta)
+    phi = arctan2(z + WGS84_ep2 * WGS84_b * s * s * s, p - WGS84_e2 * WGS84_a * c * c * c)
+    s = sin(phi)
+    # This form of the height is good everywhere, including near the poles
+    h = p * cos(phi) + z * s - WGS84_a * sqrt(1 - WGS84_e2 * s * s)
+    # The outputs may be the inputs, so they are only written at the end
+    lon[...] = degrees(arctan2(y, x))
+    lat[...] = degrees(phi)
+    alt[...] = h
+
+def geodetic_to_ecef(lon, lat, alt, out=None, dtype=None, buffersize=2**14):
+    """Convert WGS-84 longitude, latitude (degrees) and altitude (m) to ECEF x, y, z (m) 
+    with numpy alone, in blocks of buffersize points.
+    
+    The arguments can be any shapes that broadcast together. out can be a tuple of three 
+    arrays to hold x, y, z, including the input arrays themselves to convert in place. dtype 
+    is the precision of the calculation and results, and defaults to that of out or float64.
+    In float64, this agrees with proj to about 1e-9 m. 'float32' halves the memory, but 
+    only resolves ECEF coordinates to about 1 m."""
+    return _blockwise(_geodetic_to_ecef_kernel, (lon, lat, alt), out, dtype, buffersize)
+
+def ecef_to_geodetic(x, y, z, out=None, dtype=None, buffersize=2**14):
+    """Convert ECEF x, y, z (m) to WGS-84 longitude, latitude (degrees) and altitude (m) 
+    with numpy alone, using Bowring's one-iteration formula, in blocks of buffersize points.
+    For points within a few hundred km of the earth's surface, the error from the single 
+    iteration is well below a millimeter.
+    
+    The arguments are as for geodetic_to_ecef."""
+    return _blockwise(_ecef_to_geodetic_kernel, (x, y, z), out, dtype, buffersize)
+
+def _unpack(projected):
+    """Split the output of proj4.transform into x, y, z, turning lists into
+    arrays but leaving arrays (of any shape) and scalars alone."""
+    return tuple(array(v) if isinstance(v, (list, tuple)) else v for v in projected)
+
+
 class CoordinateSystem(object):
     """The abstract coordinate system handling provided here works as follows.
     
@@ -59,39 +147,52 @@ class CoordinateSystem(object):
         raise NotImplemented
 
 
+def _check_backend(backend):
+    if backend not in ('proj', 'numpy'):
+        raise ValueError("Unknown backend %r, should be 'proj' or 'numpy'" % (backend,))
+    return backend
+
+
 class GeographicSystem(CoordinateSystem):
     """
     Coordinate system defined on the surface of the earth using latitude, longitide, and altitude 
+    
+    With backend='numpy', the conversions use geodetic_to_ecef and ecef_to_geodetic instead 
+    of proj, with the given dtype.
     """
     
     WGS84lla = proj4.Proj(proj='latlong', ellps='WGS84', datum='WGS84')
+    
+    def __init__(self, backend='proj', dtype=None):
+        self.backend = _check_backend(backend)
+        self.dtype = dtype
         
     def toECEF(self, lon, lat, alt):
-        projectedData = array(proj4.transform(GeographicSystem.WGS84lla, CoordinateSystem.WGS84xyz, lon, lat, alt ))
-        if len(projectedData.shape) == 1:
-            return projectedData[0], projectedData[1], projectedData[2]
-        else:
-            return projectedData[0,:], projectedData[1,:], projectedData[2,:]
+        if self.backend == 'numpy':
+            return geodetic_to_ecef(lon, lat, alt, dtype=self.dtype)
+        return _unpack(proj4.transform(GeographicSystem.WGS84lla, CoordinateSystem.WGS84xyz, lon, lat, alt ))
         
     def fromECEF(self, x, y, z):
-        projectedData = array(proj4.transform(CoordinateSystem.WGS84xyz, GeographicSystem.WGS84lla, x, y, z ))
-        if len(projectedData.shape) == 1:
-            return projectedData[0], projectedData[1], projectedData[2]
-        else:
-            return projectedData[0,:], projectedData[1,:], projectedData[2,:]
+        if self.backend == 'numpy':
+            return ecef_to_geodetic(x, y, z, dtype=self.dtype)
+        return _unpack(proj4.transform(CoordinateSystem.WGS84xyz, GeographicSystem.WGS84lla, x, y, z ))
 
 
 class MapProjection(CoordinateSystem):
     """Map projection coordinate system. Wraps proj4, and uses its projecion names. Defaults to 
         equidistant cylindrical projection
+        
+        With backend='numpy', only the horizontal projection is done by proj, and the conversion 
+        between latitude, longitude, and altitude and ECEF is done by the numpy functions.
     """
     
-    def __init__(self, projection='eqc', ctrLat=None, ctrLon=None, **kwargs):
+    def __init__(self, projection='eqc', ctrLat=None, ctrLon=None, backend='proj', **kwargs):
         self.projection = proj4.Proj(proj=projection, ellps='WGS84', datum='WGS84', **kwargs)
         self.ctrLat=ctrLat
         self.ctrLon=ctrLon
         self.ctrAlt=0.0
-        self.geoCS = GeographicSystem()
+        self.backend = _check_backend(backend)
+        self.geoCS = GeographicSystem(backend=backend)
         self.cx, self.cy, self.cz = 0, 0, 0
         self.cx, self.cy, self.cz = self.ctrPosition()
     
@@ -107,6 +208,9 @@ class MapProjection(CoordinateSystem):
         x += self.cx
         y += self.cy
         z += self.cz
+        if self.backend == 'numpy':
+            lon, lat = self.projection(x, y, inverse=True)
+            return self.geoCS.toECEF(lon, lat, z)
         projectedData = array(proj4.transform(self.projection, CoordinateSystem.WGS84xyz, x, y, z ))
         if len(projectedData.shape) == 1:
             px, py, pz = projectedData[0], projectedData[1], projectedData[2]
@@ -115,6 +219,10 @@ class MapProjection(CoordinateSystem):
         return px, py, pz
         
     def fromECEF(self, x, y, z):
+        if self.backend == 'numpy':
+            lon, lat, alt = self.geoCS.fromECEF(x, y, z)
+            px, py = self.projection(lon, lat)
+            return px-self.cx, py-self.cy, alt-self.cz
         projectedData = array(proj4.transform(CoordinateSystem.WGS84xyz, self.projection, x, y, z ))
         if len(projectedData.shape) == 1:
             px, py, pz = projectedData[0], projectedData[1], projectedData[2]
@@ -136,9 +244,12 @@ class RadarCoordinateSystem(CoordinateSystem):
         Converts spherical (range, az, el) radar coordinates to lat/lon/alt, and then to ECEF.
         
         An earth's effective radius of 4/3 is assumed to correct for atmospheric refraction.
+        
+        backend chooses how latitude, longitude, and altitude are converted to ECEF, as for 
+        GeographicSystem.
     """
     
-    def __init__(self, ctrLat, ctrLon, ctrAlt, datum='WGS84', ellps='WGS84', effectiveRadiusMultiplier=4./3.):
+    def __init__(self, ctrLat, ctrLon, ctrAlt, datum='WGS84', ellps='WGS84', effectiveRadiusMultiplier=4./3., backend='proj'):
         self.ctrLat = float(ctrLat)
         self.ctrLon = float(ctrLon)
         self.ctrAlt = float(ctrAlt)
@@ -154,6 +265,10 @@ class RadarCoordinateSystem(CoordinateSystem):
         
         self.eccen = (2.0-self.flattening)*self.flattening   # First eccentricity squared - WGS-84 value = 0.00669437999013
         self.effectiveRadiusMultiplier = effectiveRadiusMultiplier
+        
+        # Created once here, since toECEF and fromECEF are called for every sweep
+        self.geoSys = GeographicSystem(backend=backend)
+        self.geodetic = proj4.Geod(ellps=self.ellps)
             
     def getGroundRangeHeight(self, r, elevationAngle):
         """Convert slant range (along the beam) and elevation angle into 
@@ -210,44 +325,50 @@ class RadarCoordinateSystem(CoordinateSystem):
         
         return r, el
             
-    def toECEF(self, r, az, el):
-        """Convert slant range r, azimuth az, and elevation el to ECEF system"""
-        geoSys = GeographicSystem()
-        geodetic = proj4.Geod(ellps='WGS84')
-        
-        try:
-            n = max((az.size, r.size))
-        except AttributeError:
-            n = max((len(az), len(r)))
+    def toGeographic(self, r, az, el):
+        """Convert slant range r, azimuth az, and elevation el to longitude, latitude, and altitude.
         
+        The arguments can have any shapes that broadcast together, as for toECEF."""
         dist, z = self.getGroundRangeHeight(r,el)
-        lon, lat, backAz = geodetic.fwd([self.ctrLon]*n, [self.ctrLat]*n, az, dist) 
-        return geoSys.toECEF(lon, lat, z.ravel())
+        az, dist, z = broadcast_arrays(asarray(az, dtype='float64'), dist, z)
+        # Geod needs every argument to have the same shape, so the radar location is 
+        # broadcast as well (which doesn't copy)
+        ctrLon = broadcast_to(self.ctrLon, az.shape)
+        ctrLat = broadcast_to(self.ctrLat, az.shape)
+        lon, lat, backAz = self.geodetic.fwd(ctrLon, ctrLat, az, dist) 
+        return lon, lat, z
         
-    def fromECEF(self, x, y, z):
-        """Convert ECEF system to slant range r, azimuth az, and elevation el"""
-        geoSys = GeographicSystem()
-        geodetic = proj4.Geod(ellps='WGS84')
+    def toECEF(self, r, az, el):
+        """Convert slant range r, azimuth az, and elevation el to ECEF system.
         
-        try:
-            n = x.size
-        except AttributeError:
-            n = len(x)
+        The arguments can have any shapes that broadcast together, e.g. gates (ngates,),
+        azimuths (nsweeps, nazimuths, 1) and elevations (nsweeps, 1, 1) for a volume, 
+        and the ECEF x, y, z have the broadcast shape."""
+        return self.geoSys.toECEF(*self.toGeographic(r, az, el))
         
-        lon, lat, z = geoSys.fromECEF(x, y, z)
-        radarToGateAz, gateToRadarAz, dist = geodetic.inv([self.ctrLon]*n, [self.ctrLat]*n, lon, lat)
-        az = array(radarToGateAz)   #radarToGateAz may be a list.
+    def fromECEF(self, x, y, z):
+        """Convert ECEF system to slant range r, azimuth az, and elevation el.
+        
+        The arguments can have any (matching) shape, which the results also have."""
+        lon, lat, z = self.geoSys.fromECEF(x, y, z)
+        lon, lat = asarray(lon), asarray(lat)
+        ctrLon = broadcast_to(self.ctrLon, lon.shape)
+        ctrLat = broadcast_to(self.ctrLat, lon.shape)
+        radarToGateAz, gateToRadarAz, dist = self.geodetic.inv(ctrLon, ctrLat, lon, lat)
         # change negative azimuths to positive
-        az[az < 0.0] += 360.0
+        az = radarToGateAz + 360.0 * (radarToGateAz < 0.0)
         
         #have height, ground range, azimuth. need to get elev angle and slant range from ground range and height
         r, el = self.getSlantRangeElevation(dist, z)
         
         return r, az, el
 
-class TangentPlaneCartesianSystem:
-    """ TODO: This function needs to be updated to inherit from CoordinateSystem
+class TangentPlaneCartesianSystem(CoordinateSystem):
+    """Local cartesian coordinate system on the plane tangent to the earth's surface at 
+        (ctrLat, ctrLon, ctrAlt), with +x east, +y north, and +z up, and the origin at the center.
         
+        The conversions to and from ECEF are a rotation and a translation, so they are done with 
+        matrix products over all of the points at once.
     """
     
     def __init__(self, ctrLat, ctrLon, ctrAlt):
@@ -265,7 +386,7 @@ class TangentPlaneCartesianSystem:
         #normal vector to earth's surface at the center is the local z direction
         n = aboveCenterECEF - self.centerECEF
         n = n / norm(n)
-        localz = n[:,NewAxis] #make a column vector
+        localz = n[:,newaxis] #make a column vector
         
         # n (dot) x = d defines a plane for normal vector n and position vector x on the plane
         d = dot(n, aboveCenterECEF)
@@ -280,7 +401,7 @@ class TangentPlaneCartesianSystem:
         # This calculation seems like it should only be done with latitude/north since the local x 
         #   direction curves away along a non-straight line when projected onto the plane
         northCenterECEF = array(proj4.transform(WGS84lla, WGS84xyz, self.ctrLon, self.ctrLat+0.01, self.ctrAlt))
-        localy = dot(P, northCenterECEF[:,NewAxis] )
+        localy = dot(P, northCenterECEF[:,newaxis] )
         localy = -localy / norm(localy) # negation gets x and y pointing in the right direction
         
         
@@ -289,9 +410,9 @@ class TangentPlaneCartesianSystem:
         localx = localx / norm(localx)
         
         
-        ECEFx = array((1.0, 0.0, 0.0))[:,NewAxis]
-        ECEFy = array((0.0, 1.0, 0.0))[:,NewAxis]
-        ECEFz = array((0.0, 0.0, 1.0))[:,NewAxis]
+        ECEFx = array((1.0, 0.0, 0.0))[:,newaxis]
+        ECEFy = array((0.0, 1.0, 0.0))[:,newaxis]
+        ECEFz = array((0.0, 0.0, 1.0))[:,newaxis]
         
         #
         # Calculate the transformation matrix TM to go from 
@@ -320,8 +441,163 @@ class TangentPlaneCartesianSystem:
         
     def toLocal(self, data):
         """Transforms 3xN array of data (position vectors) in the ECEF sytem to the local tangent plane cartesian system.
-           Returns another 3xN array 
+           Returns another 3xN array, or an array of shape (3,) for a single 3x1 vector. Any array with 3 as 
+           its first dimension works.
         """
-        return array( [ dot(self.TransformToLocal, (v-self.centerECEF)[:,NewAxis]) for v in data[0:3,:].transpose()]).squeeze().transpose()
+        data = asarray(data, dtype='float64')
+        center = self.centerECEF.reshape((3,) + (1,)*(data.ndim-1))
+        local = tensordot(self.TransformToLocal, data[0:3] - center, axes=1)
+        if local.shape[1:] == (1,):
+            local = local[:, 0]
+        return local
+        
+    def fromLocal(self, data):
+        """Transforms 3xN array of data (position vectors) in the local tangent plane cartesian system to the ECEF system.
+           Returns another 3xN array. Any array with 3 as its first dimension works.
+        """
+        #Transform from local to ECEF uses transpose of the TransformToLocal matrix
+        data = asarray(data, dtype='float64')
+        center = self.centerECEF.reshape((3,) + (1,)*(data.ndim-1))
+        ecef = tensordot(self.TransformToLocal.transpose(), data[0:3], axes=1)
+        ecef += center
+        return ecef
+        
+    def _rotate(self, M, x, y, z):
+        """Multiply M by the vectors (x, y, z), which can be arrays of any shape that broadcast"""
+        return (M[0,0]*x + M[0,1]*y + M[0,2]*z,
+                M[1,0]*x + M[1,1]*y + M[1,2]*z,
+                M[2,0]*x + M[2,1]*y + M[2,2]*z)
+        
+    def fromECEF(self, x, y, z):
+        """Take ECEF x, y, z values and return local tangent plane x, y, z. These can be 
+           arrays of any shape, e.g. the output of RadarCoordinateSystem.toECEF, so the components 
+           don't need to be stacked into a 3xN array first."""
+        cx, cy, cz = self.centerECEF
+        return self._rotate(self.TransformToLocal, asarray(x) - cx, asarray(y) - cy, asarray(z) - cz)
         
-        #Transform from local to ECEF uses transpose of the TransformToLocal matrix
\ No newline at end of file
+    def toECEF(self, x, y, z):
+        """Take local tangent plane x, y, z and return ECEF x, y, z"""
+        cx, cy, cz = self.centerECEF
+        ex, ey, ez = self._rotate(self.TransformToLocal.transpose(), asarray(x), asarray(y), asarray(z))
+        return ex + cx, ey + cy, ez + cz
+
+
+class GateGeometryCache(object):
+    """Cache of the locations of every gate in a radar volume.
+    
+    For a given radar site and scan strategy, the locations of the gates never change, so 
+    they only need to be calculated once. The coordinates are kept in memory for the 
+    maxsize most recently used scan strategies, and, if directory is given, saved there as 
+    .npy files, which are memory-mapped when they are needed again, even by another process.
+    
+    The results are read-only arrays, and can be used directly as the x, y, z for 
+    tools.oban.grid_spherical_decomposed.
+    
+    >>> cache = GateGeometryCache('/tmp/gates')
+    >>> radar = RadarCoordinateSystem(35.2, -97.4, 370.)
+    >>> x, y, z = cache.get(radar, ranges, azimuths, elevations, MapProjection('lcc', ...))
+    """
+    
+    def __init__(self, directory=None, maxsize=8, dtype='float64'):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.dtype = dtype_(dtype)
+        self._cache = OrderedDict()
+        self.hits = self.misses = 0
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+        
+    def _key(self, radar, ranges, azimuths, elevations, system):
+        """Hash of everything the gate locations depend on, which is also the file name"""
+        if system is None:
+            sysKey = ('ecef',)
+        elif isinstance(system, GeographicSystem):
+            sysKey = ('geographic',)
+        elif isinstance(system, MapProjection):
+            sysKey = ('map', sorted(system.projection.srs.split()), system.cx, system.cy, system.cz)
+        elif isinstance(system, TangentPlaneCartesianSystem):
+            sysKey = ('tangent', system.ctrLat, system.ctrLon, system.ctrAlt)
+        else:
+            raise ValueError("Can't cache coordinates for %r" % (system,))
+        siteKey = (radar.ctrLat, radar.ctrLon, radar.ctrAlt, radar.effectiveRadiusMultiplier,
+                   radar.ellps, radar.datum)
+        h = hashlib.sha1(repr((siteKey, sysKey, self.dtype.str)))
+        for a in (ranges, azimuths, elevations):
+            h.update(repr(a.shape))
+            h.update(a.tostring())
+        return h.hexdigest()
+        
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+        
+    def get(self, radar, ranges, azimuths, elevations, system=None):
+        """Get the locations of the gates of a volume.
+        
+        radar is a RadarCoordinateSystem for the site. ranges (ngates,) are the slant ranges 
+        to the gates, azimuths the azimuths, either (nazimuths,) for all sweeps or 
+        (nsweeps, nazimuths), and elevations (nsweeps,) the elevation angles.
+        
+        system is the coordinate system for the results: None (the default) for ECEF x, y, z, 
+        a GeographicSystem for longitude, latitude, and altitude, or a MapProjection or 
+        TangentPlaneCartesianSystem for x, y, z in that system.
+        
+        Returns three (nsweeps, nazimuths, ngates) arrays."""
+        ranges = ascontiguousarray(ranges, dtype='float64')
+        azimuths = ascontiguousarray(azimuths, dtype='float64')
+        elevations = ascontiguousarray(elevations, dtype='float64')
+        key = self._key(radar, ranges, azimuths, elevations, system)
+        
+        coords = self._cache.pop(key, None)
+        if coords is None and self.directory is not None and os.path.exists(self._path(key)):
+            coords = load(self._path(key), mmap_mode='r')
+        if coords is None:
+            self.misses += 1
+            coords = self._calculate(radar, ranges, azimuths, elevations, system)
+            if self.directory is not None:
+                coords = self._save(key, coords)
+        else:
+            self.hits += 1
+            
+        # Most recently used at the end
+        self._cache[key] = coords
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return coords[0], coords[1], coords[2]
+        
+    def _calculate(self, radar, ranges, azimuths, elevations, system):
+        """Calculate the locations as a read-only (3, nsweeps, nazimuths, ngates) array"""
+        if azimuths.ndim == 1:
+            azimuths = azimuths[newaxis, :]
+        shape = (elevations.shape[0], azimuths.shape[-1], ranges.shape[0])
+        r = asarray(ranges, dtype=float64)[newaxis, newaxis, :]
+        az = asarray(azimuths, dtype=float64)[:, :, newaxis]
+        el = asarray(elevations, dtype=float64)[:, newaxis, newaxis]
+        
+        # Work in double precision throughout, and only round to the cache's
+        # dtype once at the end
+        if isinstance(system, GeographicSystem):
+            locations = radar.toGeographic(r, az, el)
+        else:
+            locations = radar.toECEF(r, az, el)
+            if system is not None:
+                locations = system.fromECEF(*locations)
+        coords = empty((3,) + shape, dtype=self.dtype)
+        coords[0], coords[1], coords[2] = locations
+        coords.flags.writeable = False
+        return coords
+        
+    def _save(self, key, coords):
+        """Write the coordinates to the cache directory, and return them memory-mapped. The 
+        file is renamed into place so other processes never see a partial file."""
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        fh = os.fdopen(fd, 'wb')
+        try:
+            save(fh, coords)
+        finally:
+            fh.close()
+        os.rename(tmpname, self._path(key))
+        return load(self._path(key), mmap_mode='r')
+        
+    def clear(self):
+        """Empty the in-memory cache. Files in the directory are left alone."""
+        self._cache.clear()
@@ -6,7 +6,11 @@ Here's an extension to np.loadtxt, designed to take missing values into account.
 
 
 
+import os
 import itertools
+import cPickle
+import cStringIO
+import multiprocessing
 import numpy as np
 import numpy.ma as ma
 
@@ -490,84 +494,19 @@ class StringConverter:
 
 
 
-def genloadtxt(fname, dtype=float, comments='#', delimiter=None, skiprows=0,
-               converters=None, missing='', missing_values=None, usecols=None,
-               names=None, excludelist=None, deletechars=None,
-               unpack=None, usemask=False, loose=True):
+def _genloadtxt_setup(fname, dtype, comments, delimiter, skiprows, converters,
+                      missing, missing_values, usecols, names, excludelist,
+                      deletechars):
     """
-    Load data from a text file.
-
-    Each row in the text file must have the same number of values.
-
-    Parameters
-    ----------
-    fname : file or string
-        File or filename to read.  If the filename extension is `.gz` or `.bz2`,
-        the file is first decompressed.
-    dtype : data-type
-        Data type of the resulting array.  If this is a flexible data-type,
-        the resulting array will be 1-dimensional, and each row will be
-        interpreted as an element of the array. In this case, the number
-        of columns used must match the number of fields in the data-type,
-        and the names of each field will be set by the corresponding name
-        of the dtype.
-        If None, the dtypes will be determined by the contents of each
-        column, individually.
-    comments : {string}, optional
-        The character used to indicate the start of a comment.
-    delimiter : {string}, optional
-        The string used to separate values.  By default, any consecutive
-        whitespace act as delimiter.
-    skiprows : {int}, optional
-        Numbers of lines to skip at the beginning of the file.
-    converters : {None, dictionary}, optional
-        A dictionary mapping column number to a function that will convert
-        that column to a float.  E.g., if column 0 is a date string:
-        ``converters = {0: datestr2num}``. Converters can also be used to
-        provide a default value for missing data:
-        ``converters = {3: lambda s: float(s or 0)}``.
-    missing : {string}, optional
-        A string representing a missing value, irrespective of the column where
-        it appears (e.g., `'missing'` or `'unused'`).
-    missing_values : {None, dictionary}, optional
-        A dictionary mapping a column number to a string indicating whether the
-        corresponding field should be masked.
-    usecols : {None, sequence}, optional
-        Which columns to read, with 0 being the first.  For example,
-        ``usecols = (1,4,5)`` will extract the 2nd, 5th and 6th columns.
-    names : {None, True, string, sequence}, optional
-        If `names` is True, the field names are read from the first valid line
-        after the first `skiprows` lines.
-        If `names` is a sequence or a single-string of comma-separated names,
-        the names will be used to define the field names in a flexible dtype.
-        If `names` is None, the names of the dtype fields will be used, if any.
-    unpack : {bool}, optional
-        If True, the returned array is transposed, so that arguments may be
-        unpacked using ``x, y, z = loadtxt(...)``
-    usemask : {bool}, optional
-        Whether to create a mask indicating where data is missing.
-    loose : {bool}, optional
-        Whether to use a loose converter or not. With a loose converter,
-        data that cannot be converted is transformed to a default value,
-        and no ValueError exception is raised.
-
+    Open the file and set up the names, columns and converters, as described
+    in :func:`genloadtxt`.
 
     Returns
     -------
-    out : MaskedArray
-        Data read from the text file.
-
-    Notes
-    --------
-    * When spaces are used as delimiters, or when no delimiter has been given
-      as input, there should not be any missing data between two fields.
-    * When `names` is not None, names are lower cased, the spaces replaced by
-      underscores, and any illegal character suppressed.
-    * When the variable are named (either by a flexible dtype or with `names`,
-      there must not be any header in the file (else a :exc:ValueError exception
-      is raised).
-
-
+    (fhd, first_line, split_line, dtype, names, usecols, converters,
+     missing_values)
+        The filehandle, positioned after the first line with data, and
+        that first line ('' if it held the names).
     """
     # Check the input dictionary of converters
     user_converters = converters or {}
@@ -683,11 +622,127 @@ def genloadtxt(fname, dtype=float, comments='#', delimiter=None, skiprows=0,
         converters[i].update(conv, default=None,
                              missing_values=missing_values[i],
                              locked=True)
-    all_locked = min((_._locked for _ in converters))
 
     # Reset the names to match the usecols
     if (not first_line) and usecols:
         names = [names[_] for _ in usecols]
+    return (fhd, first_line, split_line, dtype, names, usecols, converters,
+            missing_values)
+
+
+def genloadtxt(fname, dtype=float, comments='#', delimiter=None, skiprows=0,
+               converters=None, missing='', missing_values=None, usecols=None,
+               names=None, excludelist=None, deletechars=None,
+               unpack=None, usemask=False, loose=True, chunksize=None,
+               infer_rows=None, fastpath=True):
+    """
+    Load data from a text file.
+
+    Each row in the text file must have the same number of values.
+
+    Parameters
+    ----------
+    fname : file or string
+        File or filename to read.  If the filename extension is `.gz` or `.bz2`,
+        the file is first decompressed.
+    dtype : data-type
+        Data type of the resulting array.  If this is a flexible data-type,
+        the resulting array will be 1-dimensional, and each row will be
+        interpreted as an element of the array. In this case, the number
+        of columns used must match the number of fields in the data-type,
+        and the names of each field will be set by the corresponding name
+        of the dtype.
+        If None, the dtypes will be determined by the contents of each
+        column, individually.
+    comments : {string}, optional
+        The character used to indicate the start of a comment.
+    delimiter : {string}, optional
+        The string used to separate values.  By default, any consecutive
+        whitespace act as delimiter.
+    skiprows : {int}, optional
+        Numbers of lines to skip at the beginning of the file.
+    converters : {None, dictionary}, optional
+        A dictionary mapping column number to a function that will convert
+        that column to a float.  E.g., if column 0 is a date string:
+        ``converters = {0: datestr2num}``. Converters can also be used to
+        provide a default value for missing data:
+        ``converters = {3: lambda s: float(s or 0)}``.
+    missing : {string}, optional
+        A string representing a missing value, irrespective of the column where
+        it appears (e.g., `'missing'` or `'unused'`).
+    missing_values : {None, dictionary}, optional
+        A dictionary mapping a column number to a string indicating whether the
+        corresponding field should be masked.
+    usecols : {None, sequence}, optional
+        Which columns to read, with 0 being the first.  For example,
+        ``usecols = (1,4,5)`` will extract the 2nd, 5th and 6th columns.
+    names : {None, True, string, sequence}, optional
+        If `names` is True, the field names are read from the first valid line
+        after the first `skiprows` lines.
+        If `names` is a sequence or a single-string of comma-separated names,
+        the names will be used to define the field names in a flexible dtype.
+        If `names` is None, the names of the dtype fields will be used, if any.
+    unpack : {bool}, optional
+        If True, the returned array is transposed, so that arguments may be
+        unpacked using ``x, y, z = loadtxt(...)``
+    usemask : {bool}, optional
+        Whether to create a mask indicating where data is missing.
+    loose : {bool}, optional
+        Whether to use a loose converter or not. With a loose converter,
+        data that cannot be converted is transformed to a default value,
+        and no ValueError exception is raised.
+    chunksize : {None, int}, optional
+        If given, the rows are converted in batches of `chunksize` rows into
+        growable column buffers, instead of holding every row as a tuple of
+        strings until the end.  This keeps the memory needed to not much
+        more than the size of the output.  When the dtype is None and a
+        column's type is upgraded after earlier batches were converted, the
+        values already converted are cast to the new type.
+    infer_rows : {None, int}, optional
+        When the dtype is None, only use the first `infer_rows` rows to
+        guess the type of each column, instead of checking every value.
+        The remaining values are converted with the guessed types; if one
+        cannot be, the type of its column is upgraded and just that column
+        is converted again.
+    fastpath : {True, False}, optional
+        Whether to read purely numeric data (a numeric `dtype`, no
+        `converters`, and a character or whitespace `delimiter`) in large
+        blocks, converting each block with one call to
+        :func:`numpy.fromstring`.  Blocks that can't be read this way (for
+        example, with empty or non-numeric fields) are read line by line as
+        usual.  Missing values are masked by comparing with the values in
+        `missing` and `missing_values` as numbers, rather than as strings.
+
+
+    Returns
+    -------
+    out : MaskedArray
+        Data read from the text file.
+
+    Notes
+    --------
+    * When spaces are used as delimiters, or when no delimiter has been given
+      as input, there should not be any missing data between two fields.
+    * When `names` is not None, names are lower cased, the spaces replaced by
+      underscores, and any illegal character suppressed.
+    * When the variable are named (either by a flexible dtype or with `names`,
+      there must not be any header in the file (else a :exc:ValueError exception
+      is raised).
+
+
+    """
+    fastpath = _use_fastpath(fastpath, converters, comments, delimiter)
+    (fhd, first_line, split_line, dtype, names, usecols, converters,
+     missing_values) = _genloadtxt_setup(fname, dtype, comments, delimiter,
+        skiprows, converters, missing, missing_values, usecols, names,
+        excludelist, deletechars)
+    if ((fastpath and _fast_eligible(dtype, missing_values) is not None)
+        or chunksize or (infer_rows is not None and dtype is None)):
+        (data, datamask) = _read_columns(fhd, first_line, split_line,
+            comments, delimiter, dtype, usecols, converters, missing_values,
+            usemask, loose, chunksize, infer_rows, fastpath)
+        return _finish_output(data, datamask, dtype, names,
+                              _checked_types(converters), usemask, unpack)
 
     rows = []
     append_to_rows = rows.append
@@ -792,29 +847,687 @@ def genloadtxt(fname, dtype=float, comments='#', delimiter=None, skiprows=0,
 
 
 
+def _iter_chunks(lines, split_line, usecols, chunksize):
+    """
+    Split the lines and group the values of the non-empty ones into lists of
+    at most `chunksize` rows (or a single list, if `chunksize` is None).
+    """
+    chunk = []
+    for line in lines:
+        values = split_line(line)
+        # Skip an empty line
+        if len(values) == 0:
+            continue
+        # Select only the columns we need
+        if usecols:
+            values = [values[_] for _ in usecols]
+        chunk.append(values)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _convert_column(converter, strings, loose, upgrade):
+    """
+    Convert a column of strings.  If `upgrade` is True, a value that cannot
+    be converted upgrades the converter (unless it is locked), and the column
+    is converted again from the start.
+    """
+    if not upgrade or converter._locked:
+        if loose:
+            convert = converter._loose_call
+        else:
+            convert = converter._strict_call
+        return [convert(_) for _ in strings]
+
+    convert = converter._strict_call
+    values = []
+    append = values.append
+    try:
+        for item in strings:
+            append(convert(item))
+    except ValueError:
+        converter.upgrade(item)
+        return _convert_column(converter, strings, loose, upgrade)
+    return values
+
+
+def _convert_chunk(chunk, dtype, converters, missing_values, usemask, loose,
+                   infer_rows=None):
+    """
+    Convert a list of rows of strings column by column, upgrading the
+    converters first if the dtype is to be guessed.  If `infer_rows` is
+    given, only that many rows from the start of the chunk are used to
+    upgrade the converters, and the rest of the chunk is checked while it is
+    converted.
+
+    Returns
+    -------
+    (columns, masks)
+        Lists with an array of values for each column and, if `usemask`,
+        a boolean array flagging the missing values of each column.
+    """
+    if dtype is None:
+        if infer_rows is None:
+            sample = chunk
+        else:
+            sample = chunk[:infer_rows]
+        for values in sample:
+            for (converter, item) in zip(converters, values):
+                converter.upgrade(item)
+        coltypes = [None] * len(converters)
+    else:
+        flatdtypes = flatten_dtype(dtype)
+        if len(flatdtypes) > 1:
+            coltypes = flatdtypes
+        else:
+            coltypes = [dtype] * len(converters)
+    upgrade = dtype is None and infer_rows is not None
+    # Short rows can't be filled in column by column (the serial reader
+    # fails on them when it builds the array)
+    if [_ for _ in chunk if len(_) < len(converters)]:
+        raise ValueError("Some rows have fewer than %i fields."
+                         % len(converters))
+
+    columns = []
+    masks = []
+    for (conv, coltype, mss, strings) in zip(converters, coltypes,
+                                             missing_values, zip(*chunk)):
+        values = _convert_column(conv, strings, loose, upgrade)
+        if coltype is None:
+            coltype = conv.type
+        if coltype in (type('S'), np.string_):
+            coltype = "|S%i" % max(len(_) for _ in values)
+        columns.append(np.array(values, dtype=coltype))
+        if usemask:
+            masks.append(np.array([_.strip() in mss for _ in strings],
+                                  dtype=np.bool))
+    return (columns, masks)
+
+
+class _ColumnBuffers:
+    """
+    Growable storage for a set of columns, filled a chunk at a time.
+
+    The buffers are over-allocated by doubling so that appending is
+    amortized, and are promoted in place if a chunk holds values of a wider
+    type than the ones before it.  Numeric values promoted to strings are
+    not formatted the way they were written, so columns that may be
+    upgraded to strings need to be replaced (see :func:`_chunked_columns`).
+    """
+    def __init__(self):
+        self.columns = None
+        self.size = 0
+
+    def append(self, columns):
+        nrows = len(columns[0])
+        if self.columns is None:
+            self.columns = [np.empty(2 * nrows, dtype=_.dtype)
+                            for _ in columns]
+        end = self.size + nrows
+        for (i, values) in enumerate(columns):
+            current = self.columns[i]
+            newtype = np.promote_types(current.dtype, values.dtype)
+            if end > len(current) or newtype != current.dtype:
+                grown = np.empty(max(end, 2 * len(current)), dtype=newtype)
+                grown[:self.size] = current[:self.size]
+                self.columns[i] = current = grown
+            current[self.size:end] = values
+        self.size = end
+
+    def finish(self):
+        """Returns the columns trimmed to the number of rows stored."""
+        return [_[:self.size] for _ in self.columns]
+
+
+def _checked_types(converters):
+    """
+    Returns the set of the types of the converters that have been used to
+    guess a type.
+    """
+    return set([c.type for c in converters if c._checked])
+
+
+def _assemble_output(columns, masks, dtype, names, base, usemask):
+    """
+    Build the (unsqueezed) output and mask arrays of :func:`genloadtxt` from
+    arrays of the values (and masks) of each column.  `base` is the set of
+    guessed column types (see :func:`_checked_types`), used to decide
+    whether the output has named fields when the dtype is guessed.
+    """
+    nrows = len(columns[0])
+    if dtype is None:
+        coldtypes = [_.dtype for _ in columns]
+        if names is None:
+            # If the dtype is uniform, don't define names, else use ''
+            if len(base) == 1:
+                ddtype = reduce(np.promote_types, coldtypes)
+                mdtype = np.bool
+            else:
+                ddtype = [('', dt) for dt in coldtypes]
+                mdtype = [('', np.bool) for dt in coldtypes]
+        else:
+            ddtype = zip(names, coldtypes)
+            mdtype = zip(names, [np.bool] * len(coldtypes))
+        outdtype = maskdtype = None
+    else:
+        # Overwrite the initial dtype names if needed
+        if names and dtype.names:
+            dtype.names = names
+        if dtype.names:
+            # Fill using a flattened dtype, then view using the one specified
+            ddtype = [('', t) for t in flatten_dtype(dtype)]
+            mdtype = [('', np.bool) for t in ddtype]
+            outdtype = dtype
+            maskdtype = [tuple(_) for _ in nested_masktype(dtype)]
+        else:
+            ddtype = dtype
+            mdtype = np.bool
+            outdtype = maskdtype = None
+
+    def fill(arrays, filldtype, viewdtype):
+        filldtype = np.dtype(filldtype)
+        if filldtype.names:
+            result = np.empty(nrows, dtype=filldtype)
+            for (name, values) in zip(filldtype.names, arrays):
+                result[name] = values
+            if viewdtype is not None:
+                result = result.view(viewdtype)
+        else:
+            result = np.empty((nrows, len(arrays)), dtype=filldtype)
+            for (i, values) in enumerate(arrays):
+                result[:, i] = values
+        return result
+
+    output = fill(columns, ddtype, outdtype)
+    if usemask:
+        outputmask = fill(masks, mdtype, maskdtype)
+    else:
+        outputmask = None
+    return (output, outputmask)
+
+
+def _chunked_columns(fhd, first_line, split_line, dtype, usecols, converters,
+                     missing_values, usemask, loose, chunksize, infer_rows):
+    """
+    Read the rest of the file in chunks, converting column by column.
+
+    Returns
+    -------
+    (data, datamask)
+        :class:`_ColumnBuffers` holding the values and masks of each column.
+    """
+    data = _ColumnBuffers()
+    datamask = _ColumnBuffers()
+    # When the types are guessed, a later chunk can upgrade a column that
+    # earlier chunks converted as a narrower type.  Rather than keeping the
+    # strings of the whole file around, note where the data starts so that
+    # just those columns can be read again with the final converters.
+    start = fhd.tell()
+    statuses = None
+    for chunk in _iter_chunks(itertools.chain([first_line,], fhd), split_line,
+                              usecols, chunksize):
+        (columns, masks) = _convert_chunk(chunk, dtype, converters,
+                                          missing_values, usemask, loose,
+                                          infer_rows)
+        if infer_rows is not None:
+            infer_rows = max(infer_rows - len(chunk), 0)
+        if dtype is None and statuses is None:
+            statuses = [conv._status for conv in converters]
+        data.append(columns)
+        if usemask:
+            datamask.append(masks)
+
+    if statuses is not None:
+        upgraded = [i for (i, conv) in enumerate(converters)
+                    if conv._status != statuses[i]]
+        if upgraded:
+            fhd.seek(start)
+            redone = _ColumnBuffers()
+            for chunk in _iter_chunks(itertools.chain([first_line,], fhd),
+                                      split_line, usecols, chunksize):
+                columns = []
+                for i in upgraded:
+                    conv = converters[i]
+                    values = _convert_column(conv, [_[i] for _ in chunk],
+                                             loose, False)
+                    coltype = conv.type
+                    if coltype in (type('S'), np.string_):
+                        coltype = "|S%i" % max(len(_) for _ in values)
+                    columns.append(np.array(values, dtype=coltype))
+                redone.append(columns)
+            for (i, values) in zip(upgraded, redone.columns):
+                data.columns[i] = values
+    return (data, datamask)
+
+
+def _use_fastpath(fastpath, converters, comments, delimiter):
+    """
+    Check whether the arguments of :func:`genloadtxt` allow the numeric fast
+    path: a character delimiter and no converters.
+    """
+    return bool(fastpath and not converters and _is_string_like(comments)
+                and comments and (delimiter is None or
+                                  (_is_string_like(delimiter)
+                                   and delimiter.strip())))
+
+
+def _fast_eligible(dtype, missing_values):
+    """
+    Check whether the numeric fast path can be used for reading data of the
+    given dtype.
+
+    Returns
+    -------
+    sentinels : {None, list}
+        None if the fast path can't be used, else a list with an array of
+        the numeric missing values for each column.
+    """
+    if dtype is None:
+        return None
+    if [t for t in flatten_dtype(dtype) if t.kind not in 'iuf']:
+        return None
+    sentinels = []
+    for mss in missing_values:
+        try:
+            sentinels.append(np.array([float(_) for _ in mss if _.strip()]))
+        except ValueError:
+            return None
+    return sentinels
+
+
+def _parse_block(lines, comments, delimiter, usecols, dtype, sentinels,
+                 missing_values, usemask):
+    """
+    Parse lines of purely numeric data all at once.  The values equal to one
+    of the `sentinels` are only masked if they are written the same way as
+    one of the `missing_values`, as when the lines are parsed one by one.
+
+    Returns
+    -------
+    (columns, masks)
+        As for :func:`_convert_chunk`, or None if the lines could not all
+        be parsed (e.g. they have empty or non-numeric fields), in which
+        case they should be parsed the slow way.
+    """
+    lines = [_.split(comments)[0] for _ in lines]
+    lines = [_ for _ in lines if _.strip()]
+    if not lines:
+        return ([], [])
+    sep = delimiter or ' '
+    # Every line needs the same number of fields, or the values would be
+    # shifted between rows and still add up to the right total
+    if delimiter:
+        ncols = lines[0].count(delimiter) + 1
+        ragged = [_ for _ in lines if _.count(delimiter) + 1 != ncols]
+    else:
+        ncols = len(lines[0].split())
+        ragged = [_ for _ in lines if len(_.split()) != ncols]
+    if ragged:
+        return None
+    values = np.fromstring(sep.join(lines), dtype=np.float64, sep=sep)
+    if values.size != len(lines) * ncols:
+        return None
+    values = values.reshape(len(lines), ncols)
+    if usecols:
+        values = values[:, usecols]
+    if values.shape[1] != len(sentinels):
+        return None
+
+    flatdtypes = flatten_dtype(dtype)
+    if len(flatdtypes) == 1:
+        flatdtypes = flatdtypes * values.shape[1]
+    # Integers can't hold nan or inf, which the slow way turns into defaults
+    if ([t for t in flatdtypes if t.kind in 'iu'] and
+        not np.isfinite(values).all()):
+        return None
+    columns = [values[:, i].astype(t) for (i, t) in enumerate(flatdtypes)]
+    masks = []
+    if usemask:
+        for (i, (missing, mss)) in enumerate(zip(sentinels, missing_values)):
+            mask = np.in1d(values[:, i], missing)
+            for row in np.flatnonzero(mask):
+                fields = lines[row].split(delimiter)
+                if usecols:
+                    fields = [fields[_] for _ in usecols]
+                mask[row] = fields[i].strip() in mss
+            masks.append(mask)
+    return (columns, masks)
+
+
+def _fast_columns(fhd, first_line, split_line, comments, delimiter, dtype,
+                  usecols, converters, missing_values, sentinels, usemask,
+                  loose, blocksize=2**20):
+    """
+    Read the rest of a file of numeric data in blocks of about `blocksize`
+    bytes, converting each block in bulk.  Blocks that can't be converted
+    that way are parsed line by line.
+
+    Returns
+    -------
+    (data, datamask)
+        :class:`_ColumnBuffers` holding the values and masks of each column.
+    """
+    data = _ColumnBuffers()
+    datamask = _ColumnBuffers()
+    pending = first_line
+    while True:
+        block = pending + fhd.read(blocksize)
+        if not block:
+            break
+        # Finish off the last line
+        block += fhd.readline()
+        pending = ''
+        lines = block.splitlines()
+
+        result = _parse_block(lines, comments, delimiter, usecols, dtype,
+                              sentinels, missing_values, usemask)
+        if result is None:
+            chunk = list(_iter_chunks(lines, split_line, usecols, None))
+            if not chunk:
+                continue
+            result = _convert_chunk(chunk[0], dtype, converters,
+                                    missing_values, usemask, loose)
+        (columns, masks) = result
+        if not columns:
+            continue
+        data.append(columns)
+        if usemask:
+            datamask.append(masks)
+    return (data, datamask)
+
+
+def _read_columns(fhd, first_line, split_line, comments, delimiter, dtype,
+                  usecols, converters, missing_values, usemask, loose,
+                  chunksize, infer_rows, fastpath):
+    """
+    Read the rest of the file into column buffers, using the numeric fast
+    path if allowed (see :func:`_use_fastpath`) and possible for the dtype.
+
+    Returns
+    -------
+    (data, datamask)
+        :class:`_ColumnBuffers` holding the values and masks of each column.
+    """
+    if fastpath:
+        sentinels = _fast_eligible(dtype, missing_values)
+        if sentinels is not None:
+            return _fast_columns(fhd, first_line, split_line, comments,
+                                 delimiter or None, dtype, usecols, converters,
+                                 missing_values, sentinels, usemask, loose)
+    return _chunked_columns(fhd, first_line, split_line, dtype, usecols,
+                            converters, missing_values, usemask, loose,
+                            chunksize, infer_rows)
+
+
+def _finish_output(data, datamask, dtype, names, base, usemask, unpack):
+    """
+    Build the final output of :func:`genloadtxt` from filled column buffers.
+    """
+    if not data.size:
+        raise IOError('No data found in the file.')
+    (output, outputmask) = _assemble_output(data.finish(),
+                                            usemask and datamask.finish(),
+                                            dtype, names, base, usemask)
+    # Construct the final array
+    if unpack:
+        if usemask:
+            return (output.squeeze().T, outputmask.squeeze().T)
+        return (output.squeeze().T, None)
+    if usemask:
+        return (output.squeeze(), outputmask.squeeze().T)
+    return (output.squeeze(), None)
+
+
+def iterloadtxt(fname, chunksize=10000, dtype=float, comments='#',
+                delimiter=None, skiprows=0, converters=None, missing='',
+                missing_values=None, usecols=None, names=None,
+                excludelist=None, deletechars=None, usemask=False, loose=True,
+                infer_rows=None):
+    """
+    Load data from a text file `chunksize` rows at a time.
+
+    This is a generator version of :func:`genloadtxt`, for processing files
+    too large to hold in memory at once.  The arguments are the same as for
+    :func:`genloadtxt`.  When `dtype` is None, the types are guessed from
+    the rows read so far, so a later chunk can have wider types than an
+    earlier one; give a `dtype` to avoid this.
+
+    Yields
+    ------
+    out : ndarray or MaskedArray
+        The next (at most) `chunksize` rows of data.  If `usemask` is True,
+        a MaskedArray with the missing data masked.
+    """
+    (fhd, first_line, split_line, dtype, names, usecols, converters,
+     missing_values) = _genloadtxt_setup(fname, dtype, comments, delimiter,
+        skiprows, converters, missing, missing_values, usecols, names,
+        excludelist, deletechars)
+    for chunk in _iter_chunks(itertools.chain([first_line,], fhd), split_line,
+                              usecols, chunksize):
+        (columns, masks) = _convert_chunk(chunk, dtype, converters,
+                                          missing_values, usemask, loose,
+                                          infer_rows)
+        if infer_rows is not None:
+            infer_rows = max(infer_rows - len(chunk), 0)
+        (output, outputmask) = _assemble_output(columns, masks, dtype, names,
+                                                _checked_types(converters),
+                                                usemask)
+        if usemask:
+            output = output.view(ma.MaskedArray)
+            output.mask = outputmask
+        yield output
+
+
+def _parse_range(task):
+    """
+    Parse one byte range of a file for :func:`parallel_loadtxt`.  The
+    header, the bytes before `header_end`, is parsed along with the range so
+    that the names and columns are set up as for the whole file.
+
+    If `statuses` is given, the type guessing starts from those converter
+    statuses, rather than from scratch.
+
+    Returns
+    -------
+    (columns, masks, statuses)
+        The arrays of values (and masks) of each column, and the status
+        of each converter, or None if there was no data in the range.
+    """
+    (fname, header_end, start, end, kwargs, statuses) = task
+    kwargs = dict(kwargs)
+    usemask = kwargs.pop('usemask')
+    loose = kwargs.pop('loose')
+    fastpath = _use_fastpath(kwargs.pop('fastpath'), kwargs['converters'],
+                             kwargs['comments'], kwargs['delimiter'])
+    fhd = open(fname, 'rb')
+    text = fhd.read(header_end)
+    fhd.seek(start)
+    text += fhd.read(end - start)
+    fhd.close()
+
+    try:
+        (fhd, first_line, split_line, dtype, names, usecols, converters,
+         missing_values) = _genloadtxt_setup(cStringIO.StringIO(text),
+                                             **kwargs)
+    except IOError:
+        # Nothing but comments or blank lines
+        return None
+    if statuses is not None:
+        for (conv, status) in zip(converters, statuses):
+            if status > conv._status:
+                conv._status = status
+                (conv.type, conv.func, conv.default) = conv._mapper[status]
+    (data, datamask) = _read_columns(fhd, first_line, split_line,
+                                     kwargs['comments'], kwargs['delimiter'],
+                                     dtype, usecols, converters,
+                                     missing_values, usemask, loose, 10000,
+                                     None, fastpath)
+    if not data.size:
+        return None
+    return (data.finish(), usemask and datamask.finish(),
+            [conv._status for conv in converters])
+
+
+def _newline_offsets(fname, start, nchunks):
+    """
+    Split the bytes of the file from `start` on into `nchunks` ranges, with
+    each boundary moved forward to just after a newline.
+
+    Returns
+    -------
+    offsets : list
+        The boundaries, from `start` to the size of the file.
+    """
+    size = os.path.getsize(fname)
+    fhd = open(fname, 'rb')
+    offsets = [start]
+    for i in range(1, nchunks):
+        offset = start + i * (size - start) // nchunks
+        if offset <= offsets[-1]:
+            continue
+        fhd.seek(offset - 1)
+        fhd.readline()
+        if fhd.tell() > offsets[-1] and fhd.tell() < size:
+            offsets.append(fhd.tell())
+    fhd.close()
+    offsets.append(size)
+    return offsets
+
+
+def parallel_loadtxt(fname, processes=None, nchunks=None, dtype=float,
+                     comments='#', delimiter=None, skiprows=0, converters=None,
+                     missing='', missing_values=None, usecols=None,
+                     unpack=None, names=None, excludelist=None,
+                     deletechars=None, usemask=False, loose=True,
+                     fastpath=True):
+    """
+    Load data from a text file, parsing parts of the file in parallel.
+
+    The file is split into byte ranges at line boundaries, which are parsed
+    by :func:`genloadtxt` in a pool of processes, and the results are joined
+    in order.  When `dtype` is None, the types guessed for each range are
+    reconciled, and any range that guessed a narrower type for a column
+    than another range is parsed again, so that the result is the same as
+    reading the file all at once.
+
+    The other arguments are the same as for :func:`genloadtxt`.  If `fname`
+    is not the name of an uncompressed file, or the arguments (such as
+    lambda `converters`) can't be sent to other processes, the file is
+    parsed in this process.
+
+    Parameters
+    ----------
+    processes : {None, int}, optional
+        Number of processes to use.  Defaults to the number of CPUs.
+    nchunks : {None, int}, optional
+        Number of byte ranges to split the file into.  Defaults to four
+        times the number of processes.
+
+    Returns
+    -------
+    out : ndarray or MaskedArray
+        Data read from the text file.  If `usemask` is True, a MaskedArray
+        with the missing data masked.
+    """
+    kwargs = dict(dtype=dtype, comments=comments, delimiter=delimiter,
+                  skiprows=skiprows, converters=converters, missing=missing,
+                  missing_values=missing_values, usecols=usecols, names=names,
+                  excludelist=excludelist, deletechars=deletechars)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    parallel = (processes > 1 and _is_string_like(fname)
+                and not fname.endswith(('.gz', '.bz2')))
+    if parallel:
+        try:
+            cPickle.dumps(kwargs, -1)
+        except (cPickle.PicklingError, TypeError, AttributeError):
+            parallel = False
+    if not parallel:
+        (output, outputmask) = genloadtxt(fname, unpack=unpack,
+                                          usemask=usemask, loose=loose,
+                                          fastpath=fastpath, **kwargs)
+        if usemask:
+            output = output.view(ma.MaskedArray)
+            output.mask = outputmask
+        return output
+
+    # Set up the names and columns here, to find where the data start
+    task_kwargs = dict(kwargs, usemask=usemask, loose=loose, fastpath=fastpath)
+    (fhd, first_line, split_line, dtype, names, usecols, converters,
+     missing_values) = _genloadtxt_setup(fname, **kwargs)
+    header_end = fhd.tell() - len(first_line)
+    fhd.close()
+
+    offsets = _newline_offsets(fname, header_end, nchunks or 4 * processes)
+    tasks = [(fname, header_end, start, end, task_kwargs, None)
+             for (start, end) in zip(offsets[:-1], offsets[1:])]
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(_parse_range, tasks)
+        if dtype is None:
+            # Make the guessed types agree, parsing again the ranges which
+            # didn't get as far as the others
+            found = [r for r in results if r is not None]
+            statuses = [max(_) for _ in zip(*[r[2] for r in found])]
+            redo = [i for (i, r) in enumerate(results)
+                    if r is not None and r[2] != statuses]
+            redone = pool.map(_parse_range,
+                              [tasks[i][:-1] + (statuses,) for i in redo])
+            for (i, result) in zip(redo, redone):
+                results[i] = result
+    finally:
+        pool.close()
+        pool.join()
+
+    data = _ColumnBuffers()
+    datamask = _ColumnBuffers()
+    for result in results:
+        if result is not None:
+            data.append(result[0])
+            if usemask:
+                datamask.append(result[1])
+    if dtype is None and data.size:
+        base = set([StringConverter._mapper[_][0] for _ in statuses])
+    else:
+        base = set()
+    (output, outputmask) = _finish_output(data, datamask, dtype, names, base,
+                                          usemask, unpack)
+    if usemask:
+        output = output.view(ma.MaskedArray)
+        output.mask = outputmask
+    return output
+
+
 def loadtxt(fname, dtype=float, comments='#', delimiter=None, skiprows=0,
                converters=None, missing='', missing_values=None,
                usecols=None, unpack=None,
-               names=None, excludelist=None, deletechars=None):
+               names=None, excludelist=None, deletechars=None,
+               chunksize=None, infer_rows=None, fastpath=True):
     kwargs = dict(dtype=dtype, comments=comments, delimiter=delimiter,
                   skiprows=skiprows, converters=converters,
                   missing=missing, missing_values=missing_values,
                   usecols=usecols, unpack=unpack, names=names,
                   excludelist=excludelist, deletechars=deletechars,
-                  usemask=False)
+                  usemask=False, chunksize=chunksize, infer_rows=infer_rows,
+                  fastpath=fastpath)
     (output, _) = genloadtxt(fname, **kwargs)
     return output
 
 def mloadtxt(fname, dtype=float, comments='#', delimiter=None, skiprows=0,
                converters=None, missing='', missing_values=None,
                usecols=None, unpack=None,
-               names=None, excludelist=None, deletechars=None):
+               names=None, excludelist=None, deletechars=None,
+               chunksize=None, infer_rows=None, fastpath=True):
     kwargs = dict(dtype=dtype, comments=comments, delimiter=delimiter,
                   skiprows=skiprows, converters=converters,
                   missing=missing, missing_values=missing_values,
                   usecols=usecols, unpack=unpack, names=names,
                   excludelist=excludelist, deletechars=deletechars,
-                  usemask=True)
+                  usemask=True, chunksize=chunksize, infer_rows=infer_rows,
+                  fastpath=fastpath)
     (output, outputmask) = genloadtxt(fname, **kwargs)
     output = output.view(ma.MaskedArray)
     output.mask = outputmask
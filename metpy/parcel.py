@@ -0,0 +1,332 @@
+'''
+Parcel theory calculations: the lifting condensation level, the temperature
+of a lifted parcel, and the convective available potential energy (CAPE)
+and convective inhibition (CIN).
+
+All of the functions work on whole stacks of soundings at once, with the
+levels along the last dimension, so that they can be used on every column
+of gridded model output.  The only loop is over the levels.
+'''
+import numpy as np
+
+__all__ = ['moist_lapserate', 'moist_pseudo_lapserate', 'lcl',
+    'parcel_profile', 'cape_cin']
+
+# Same constants as the skew-T moist adiabats
+Rd = 287.0
+Cp = 1004.
+kappa = Rd / Cp
+T0 = 273.15
+
+def moist_lapserate(w, T):
+    # From AMS glossary,
+    # http://glossary.ametsoc.org/wiki/Moist-adiabatic_lapse_rate
+
+    # the constants are hardcoded to match consts in plot_skewt - 
+    # probably this ought to be refactored to group all atmo 
+    # related consts into one common location
+
+    # copied from Wallace & Hobbs 2nd edition, page 467,468
+    g = 9.81
+    Cp = 1004
+    Rd = 287.0
+    Rv = 461.51
+    epsilon = Rd/Rv
+    T0 = 273.15
+
+    # assumes T is in deg C; this is a linear interp/extrap from:
+    # Lv = 2.5e6 (O deg C) and 2.0e6 (100 deg C)
+    Lv_func = lambda T: 2.5e6 - 2500.0 * T
+    # alternate form (Glanz and Orlob 1973, 
+    # B. Henderson-Sellers 1984 QJRMS
+    #Lv_func = lambda T: 1.91846e6 * ((T+T0)/(T+T0-33.91))**2
+
+    TK = T + T0
+    Lv = Lv_func(T)
+    A = Lv * w / (Rd*TK)
+    return g * (1 + A) / (Cp + Lv * epsilon * A / TK)
+
+def moist_pseudo_lapserate(w, T):
+    # From AMS glossary,
+    # http://glossary.ametsoc.org/wiki/Pseudoadiabatic_lapse_rate
+
+    # the constants are hardcoded to match consts in plot_skewt - 
+    # probably this ought to be refactored to group all atmo 
+    # related consts into one common location
+
+    # copied from Wallace & Hobbs 2nd edition, page 467,468
+    g = 9.81
+    Cp = 1004
+    Cv = 717
+    Rd = 287.0
+    Rv = 461.51
+    epsilon = Rd/Rv
+    T0 = 273.15
+
+    # assumes T is in deg C; this is a linear interp/extrap from:
+    # Lv = 2.5e6 (O deg C) and 2.0e6 (100 deg C)
+    Lv_func = lambda T: 2.5e6 - 2500.0 * T
+    # alternate form (Glanz and Orlob 1973, 
+    # B. Henderson-Sellers 1984 QJRMS)
+    #Lv_func = lambda T: 1.91846e6 * (T/(T-33.91))**2
+
+    TK = T + T0
+    Lv = Lv_func(T)
+    A = Lv * w / (Rd*TK)
+    return g * ( (1 + w) * (1 + A) / 
+                 (Cp + w*Cv + Lv * (epsilon + w) * A / TK) )
+
+def _moist_step(T, Pbot, Ptop, lapse_rate=moist_lapserate):
+    '''
+    Helper for taking a single midpoint step along moist adiabats, from
+    temperature(s) *T* (C) at pressure *Pbot* to pressure *Ptop* (both mb).
+    The arguments only need to broadcast against each other, so each
+    adiabat can have its own layer; where *Pbot* equals *Ptop* the
+    temperature is unchanged.
+    '''
+    # the constants are hardcoded to match consts in plot_skewt - 
+    # probably this ought to be refactored to group all atmo 
+    # related consts into one common location
+
+    # copied from Wallace & Hobbs 2nd edition, page 467,468
+    g = 9.81
+    Rd = 287.0
+    Rv = 461.51
+    epsilon = Rd/Rv
+    T0 = 273.15
+
+    dP = Pbot - Ptop
+
+    # First, find the thickness, in m, of the layer with pressure 
+    # thickess given by dP, but assuming the T and wv pressure from 
+    # the level at the bottom of the layer.
+
+    # using same approx as used below in plot_skewt() to plot the mixing 
+    # ratio lines (though I am unsure of the source)
+    # May want to modify to use the MK approximation.
+    wv_sat = 6.112 * np.exp(17.67 * T / (243.5 + T))
+    # wv_sat = wv_satpressure_mk(T)
+
+    # Following Wallace & Hobbs, page 80, 2nd ed.
+    # find mixing ratio from dewpoint and then virtual temp
+    w = epsilon * wv_sat / (Pbot - wv_sat)
+    Tv = (T + T0) * (1 + ((1-epsilon)/epsilon) * w)
+    rho = Pbot / (Rd * Tv)
+    Dz = dP / rho / g
+
+    # second, compute the lapse rate, and then combine with the 
+    # thickess to get the temperate at the level at the top of the layer.
+    Gamma = lapse_rate(w, T)
+    Ttop = T - Gamma * Dz
+
+    # Now that we have the temp at layer top, repeat calculation at midpt, 
+    # using the average layer temp (I think this is slightly more correct)
+    Tbar = 0.5*(T + Ttop)
+    Pbar = 0.5*(Pbot + Ptop)
+    wv_sat = 6.112 * np.exp(17.67 * Tbar / (243.5 + Tbar))
+    w = epsilon * wv_sat / (Pbar - wv_sat)
+    Tv = (Tbar + T0) * (1 + ((1-epsilon)/epsilon) * w)
+    rho = Pbar / (Rd * Tv)
+    Dz = dP / rho / g
+    Gamma = lapse_rate(w, Tbar)
+    return T - Gamma * Dz
+
+def lcl(pressure, temp, dewpt):
+    '''
+    Calculate the lifting condensation level (LCL) using equation 15 of
+    Bolton (1980), which is accurate to about 0.1 K.
+
+    pressure : scalar or array
+        The starting pressure of the parcel, in mb.
+
+    temp : scalar or array
+        The starting temperature of the parcel, in degrees C.
+
+    dewpt : scalar or array
+        The starting dewpoint of the parcel, in degrees C.
+
+    Returns : tuple of arrays
+        The pressure (mb) and temperature (C) of the LCL, with the
+        broadcast shape of the arguments.
+    '''
+    TK = np.asarray(temp, dtype=np.float64) + T0
+    TdK = np.asarray(dewpt, dtype=np.float64) + T0
+    T_lcl = 1. / (1. / (TdK - 56.) + np.log(TK / TdK) / 800.) + 56.
+    p_lcl = pressure * (T_lcl / TK)**(1. / kappa)
+    return p_lcl, T_lcl - T0
+
+def _lift(pressure, temp, dewpt, lapse_rate, substeps):
+    '''
+    Helper for lifting parcels from the first level, which yields the LCL
+    pressure and then the parcel temperature at each level in turn, so that
+    only one level of the soundings needs to be in memory at a time.
+    '''
+    p_lcl, T_lcl = lcl(pressure[..., 0], temp, dewpt)
+    # A saturated parcel is already at its LCL
+    saturated = p_lcl >= pressure[..., 0]
+    p_lcl = np.where(saturated, pressure[..., 0], p_lcl)
+    T_lcl = np.where(saturated, temp, T_lcl)
+    yield p_lcl
+
+    # Below the LCL, the parcel follows the dry adiabat
+    theta = (temp + T0) / pressure[..., 0]**kappa
+    yield theta * pressure[..., 0]**kappa - T0
+
+    # Step all of the parcels up together.  Each starts at its own LCL, and
+    # those that are still below it take steps of zero thickness.
+    T_moist = T_lcl
+    p_moist = p_lcl
+    for n in range(1, pressure.shape[-1]):
+        p = pressure[..., n]
+        above = p < p_lcl
+        dry = theta * p**kappa - T0
+        if not above.any():
+            yield dry
+            continue
+        p_top = np.where(above, p, p_moist)
+        for i in range(substeps):
+            p_bot = p_moist + (p_top - p_moist) * (float(i) / substeps)
+            p_sub = p_moist + (p_top - p_moist) * (float(i + 1) / substeps)
+            T_moist = _moist_step(T_moist, p_bot, p_sub, lapse_rate)
+        p_moist = p_top
+        yield np.where(above, T_moist, dry)
+
+def _sounding_shape(pressure, *args):
+    '''
+    Helper for getting the shape of the soundings, including the levels,
+    from the pressure and the arguments that have no level dimension.
+    '''
+    shapes = [np.broadcast_to(0., np.shape(pressure))]
+    shapes.extend(np.broadcast_to(0., np.shape(a) + (1,)) for a in args)
+    return np.broadcast(*shapes).shape
+
+def parcel_profile(pressure, temp, dewpt, lapse_rate=moist_lapserate,
+    substeps=2):
+    '''
+    Calculate the temperature of a parcel lifted from the first level of
+    each sounding: dry adiabatically up to its LCL, and then moist
+    adiabatically.
+
+    pressure : array
+        The pressure levels, in mb, along the last dimension, starting
+        from the bottom.  This can have a level dimension only, when all of
+        the soundings share the same levels, or the full shape of the
+        soundings (e.g. (nsoundings, nlevels)).
+
+    temp : scalar or array
+        The starting temperature of the parcels, in degrees C, with the
+        shape of the soundings without the level dimension.
+
+    dewpt : scalar or array
+        The starting dewpoint of the parcels, in degrees C.
+
+    lapse_rate : callable
+        The moist lapse rate function, :func:`moist_lapserate` (the default)
+        or :func:`moist_pseudo_lapserate`.
+
+    substeps : integer
+        The number of midpoint steps to take through each layer of the
+        moist ascent.  The error falls off as the square of the step size;
+        the default of 2 keeps it to about 0.3 K for levels every 50 mb.
+
+    Returns : array
+        The parcel temperatures, in degrees C, for each sounding and level.
+    '''
+    pressure = np.asarray(pressure, dtype=np.float64)
+    temp = np.asarray(temp, dtype=np.float64)
+    dewpt = np.asarray(dewpt, dtype=np.float64)
+    shape = _sounding_shape(pressure, temp, dewpt)
+
+    # Fill in the levels first, so that each level is contiguous
+    parcel = np.empty(shape[-1:] + shape[:-1])
+    levels = _lift(pressure, temp, dewpt, lapse_rate, substeps)
+    levels.next()
+    for n, T in enumerate(levels):
+        parcel[n] = T
+    return np.rollaxis(parcel, 0, parcel.ndim)
+
+def cape_cin(pressure, temp, dewpt, lapse_rate=moist_lapserate, substeps=2):
+    '''
+    Calculate the convective available potential energy (CAPE) and the
+    convective inhibition (CIN) for a parcel lifted from the first level
+    of each sounding.
+
+    The buoyancy of the parcel is taken to vary linearly with the log of
+    pressure within each layer, and the area in each layer is split where
+    the parcel and environment temperatures cross.  The level of free
+    convection (LFC) is the bottom of the first layer above the LCL where
+    the parcel becomes warmer than the environment.  CAPE is all of the
+    positive area above the LFC and CIN is the negative area below it.
+    Soundings with no LFC have a CAPE and CIN of 0.  Temperatures, rather
+    than virtual temperatures, are used for the buoyancy.
+
+    The soundings are worked through a level at a time, so the memory
+    needed beyond the inputs is only a few arrays the size of one level.
+
+    pressure : array
+        The pressure levels, in mb, along the last dimension, starting
+        from the bottom.  This can have a level dimension only, when all of
+        the soundings share the same levels, or the full shape of the
+        soundings (e.g. (nsoundings, nlevels)).
+
+    temp : array
+        The environmental temperatures, in degrees C, with the shape of
+        the soundings.
+
+    dewpt : array
+        The environmental dewpoints, in degrees C.  Only the first level is
+        used, to start the parcel.
+
+    lapse_rate : callable
+        The moist lapse rate function, as in :func:`parcel_profile`.
+
+    substeps : integer
+        The number of steps through each layer, as in
+        :func:`parcel_profile`.
+
+    Returns : tuple of arrays
+        The CAPE and CIN, in J/kg, for each sounding.  CIN is negative or 0.
+    '''
+    pressure = np.asarray(pressure, dtype=np.float64)
+    temp = np.asarray(temp, dtype=np.float64)
+    dewpt = np.asarray(dewpt, dtype=np.float64)
+    shape = _sounding_shape(pressure, temp[..., 0], dewpt[..., 0])
+    temp = np.broadcast_to(temp, shape)
+
+    levels = _lift(pressure, temp[..., 0], dewpt[..., 0], lapse_rate,
+        substeps)
+    p_lcl = levels.next()
+    cape = np.zeros(shape[:-1])
+    cin = np.zeros(shape[:-1])
+    found = np.zeros(shape[:-1], dtype=np.bool)
+
+    b0 = levels.next() - temp[..., 0]
+    for n, parcel in enumerate(levels, 1):
+        # Buoyancy at the top of the layer, and the positive and negative
+        # areas (in K times the log of pressure) of the layer, taking the
+        # buoyancy to be linear in the log of pressure
+        b1 = parcel - temp[..., n]
+        dlnp = np.log(pressure[..., n - 1] / pressure[..., n])
+        # When the sign changes, the area of each part is a triangle over
+        # the fraction of the layer on that side of the crossing; otherwise
+        # this is the trapezoid rule
+        crosses = b0 * b1 < 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w0 = np.where(crosses, b0 / (b0 - b1), 1.)
+        w1 = np.where(crosses, 1. - w0, 1.)
+        dlnp *= 0.5
+        pos = (np.maximum(b0, 0) * w0 + np.maximum(b1, 0) * w1) * dlnp
+        neg = (np.minimum(b0, 0) * w0 + np.minimum(b1, 0) * w1) * dlnp
+
+        # The layer with the LFC and those above it add to CAPE, while those
+        # below add to CIN
+        lfc = ~found & (b1 > 0) & (pressure[..., n] < p_lcl)
+        cin += np.where(found, 0, neg)
+        found |= lfc
+        cape += np.where(found, pos, 0)
+        b0 = b1
+
+    cape *= Rd
+    cin *= Rd
+    cin[~found] = 0
+    return cape, cin
@@ -4,7 +4,9 @@ import ju2003
 import spc
 
 from mesonet import *
+from mesonet_archive import *
 from data_object import *
 
 __all__ = []
 __all__.extend(mesonet.__all__)
+__all__.extend(mesonet_archive.__all__)
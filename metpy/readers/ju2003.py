@@ -2,6 +2,7 @@
 import numpy as np
 import os
 import datetime
+from metpy.readers.ltm import _read_sonic_table, _convert_dates
 
 def pull_date(x):
     year=int(x[0:4])
@@ -16,11 +17,13 @@ def pull_date(x):
         microsecond = int(x[20:])*100000
         return datetime.datetime(year,month,day,hour,minute,second,microsecond)
 
-def sonics(top_dir,filedate):
+def sonics(top_dir,filedate,use_datetime64=False):
     '''
         Read in all RMY Sonic Anemometer Data from the Joint Urban 2003 field campagin for a specific hour.
         top dir = path to directory where tower1 and tower 2 reside
         filedate = yyyy-mm-dd-hhhh
+        use_datetime64 = return the dates as numpy datetime64[ms] values
+            instead of datetime objects (default False)
     '''
 #
 #       Open File
@@ -30,34 +33,24 @@ def sonics(top_dir,filedate):
     filename = []
     filename.append(top_dir+'/tower1/'+filedate+'-tower1-ts.txt.gz')
     filename.append(top_dir+'/tower2/'+filedate+'-tower2-ts.txt.gz')
-    try:
-
-        date1 = np.loadtxt(filename[0], usecols=[1], dtype=datetime.datetime,converters={1:pull_date}, comments='%', delimiter=',')
-        date2 = np.loadtxt(filename[1], usecols=[1], dtype=datetime.datetime,converters={1:pull_date}, comments='%', delimiter=',')
-    except IOError:
-        print '%s does not exist\n'%filename
-        raise
 
+    columns = dict(u=range(3,8), v=range(8,13), w=range(13,18),
+        T=range(18,23))
+    dates = []
+    rdata = []
     for i in range(0,2):
-
-        data = np.loadtxt(filename[i], usecols=np.arange(3,28), comments='%', delimiter=',')
-
-        u=data[:,0:5]
-        v=data[:,5:10]
-        w=data[:,10:15]
-        T=data[:,15:20]
-#        flags = data[:,20:25].astype(int)
-
-        dt = np.dtype([('u1',np.float,(36000,5)),('v1',np.float,(36000,5)),
-                       ('w1',np.float,(36000,5)),('T1',np.float,(36000,5))])
-        if i == 0:
-            rdata1=np.rec.fromarrays([u,v,w,T],names='u,v,w,T')
-#            rdata1=np.array((u,v,w,T), dtype=dt)
-        elif i == 1:
-            rdata2=np.rec.fromarrays([u,v,w,T],names='u,v,w,T')
-#            rdata2=np.array((u,v,w,T), dtype=dt)
-
-    return (date1,date2,rdata1,rdata2)
+        try:
+            date,data,fields = _read_sonic_table(filename[i], columns, 1)
+        except IOError:
+            print '%s does not exist\n'%filename[i]
+            raise
+        dates.append(_convert_dates(date, use_datetime64))
+#        flags = fields[:,23:28].astype(int)
+
+        #Data are stored by level, returned as (nsamples, nlevels)
+        rdata.append(data.T.view(np.recarray))
+
+    return (dates[0],dates[1],rdata[0],rdata[1])
 
 
 if __name__=='__main__':
@@ -31,9 +31,64 @@ in degrees)
 
     return u_new, v_new
 
-def sonic_2005(filename):
+def _read_sonic_table(filename, columns, date_col, skiprows=0, comments='%',
+    nlevels=5):
+    '''
+    Read a comma-separated file of sonic anemometer data in a single pass.
+    All the values are split at once and the timestamps are converted to
+    numpy datetime64 values in bulk, rather than with a converter per row.
+
+    columns : dictionary
+        Maps each variable name (u, v, w, T) to the sequence of the columns
+        in the file holding that variable for each level.
+
+    date_col : integer
+        The column with the timestamps, as YYYY-MM-DD HH:MM:SS[.f], which
+        may be in quotes.
+
+    Returns : (dates, data, fields)
+        The datetime64[ms] timestamps, a (nlevels, nsamples) structured
+        array with fields u, v, w, and T, and the 2D array of the
+        (unconverted) strings for each row and column of the file.
+    '''
+    if filename.endswith('.gz'):
+        import gzip
+        fh = gzip.open(filename)
+    else:
+        fh = open(filename)
+    lines = fh.read().splitlines()[skiprows:]
+    fh.close()
+
+    lines = [l.split(comments)[0] for l in lines]
+    lines = [l for l in lines if l.strip()]
+    fields = np.array(','.join(lines).split(','))
+    fields = fields.reshape(len(lines), -1)
+
+    dates = np.char.strip(fields[:, date_col], '" ').astype('datetime64[ms]')
+
+    dt = np.dtype([('u',np.float),('v',np.float),('w',np.float),
+              ('T',np.float)])
+    data = np.empty((nlevels, len(lines)), dtype=dt)
+    for name in dt.names:
+        for level,col in enumerate(columns[name]):
+            data[name][level] = fields[:, col].astype(np.float)
+
+    return dates, data, fields
+
+def _convert_dates(dates, use_datetime64):
+    '''
+    Helper for returning the datetime64 timestamps from
+    :func:`_read_sonic_table` as datetime objects if requested.
+    '''
+    if use_datetime64:
+        return dates
+    return dates.astype(datetime.datetime)
+
+def sonic_2005(filename, use_datetime64=False):
     '''
         Read in RMY Sonic Anemometer Data from the Lake Thunderbird Micronet Spring 2005
+          --dates are returned as datetime objects, or as numpy datetime64[ms]
+            values if use_datetime64 is True
     '''
 #
 #   Determine file type
@@ -43,20 +98,17 @@ def sonic_2005(filename):
 #       Open File
 #
         try:
-            date = np.loadtxt(filename,delimiter=',',skiprows=2,usecols=np.arange(0,1),dtype=datetime.datetime,converters={0:pull_date})
-            u1,u2,u3,u4,u5,v1,v2,v3,v4,v5,w1,w2,w3,w4,w5,T1,T2,T3,T4,T5,voltage= \
-                np.loadtxt(filename, usecols=np.arange(1,22), comments='%', delimiter=',',unpack=True)
-            u=np.r_[u1,u2,u3,u4,u5]
-            v=np.r_[v1,v2,v3,v4,v5]
-            w=np.r_[w1,w2,w3,w4,w5]
-            T=np.r_[T1,T2,T3,T4,T5]
-
-            dt = np.dtype([('u',np.float),('v',np.float),('w',np.float),
-                      ('T',np.float)])
-            data=np.array(zip(u,v,w,T), dtype=dt).reshape(5,-1)
-
-            dt = np.dtype([('date',object),('voltage',np.float)])
-            ext = np.array(zip(date,voltage), dtype=dt)
+            #Columns are date,u1-u5,v1-v5,w1-w5,T1-T5,voltage
+            columns = dict(u=range(1,6), v=range(6,11), w=range(11,16),
+                T=range(16,21))
+            date,data,fields = _read_sonic_table(filename, columns, 0,
+                skiprows=2)
+            date = _convert_dates(date, use_datetime64)
+
+            dt = np.dtype([('date',date.dtype),('voltage',np.float)])
+            ext = np.empty(date.shape, dtype=dt)
+            ext['date'] = date
+            ext['voltage'] = fields[:, 21].astype(np.float)
 
         except IOError:
             print '%s does not exist\n'%filename
@@ -78,11 +130,13 @@ def sonic_2005(filename):
 
         return data
 
-def sonic(filename, L5_fix=True):
+def sonic(filename, L5_fix=True, use_datetime64=False):
     '''
         Read in RMY Sonic Anemometer Data from the Lake Thunderbird Micronet year >=2007
           --includes fix for level 5 alignment as default (controlled with keyword
             L5_fix (L5_fix=True default)
+          --dates are returned as datetime objects, or as numpy datetime64[ms]
+            values if use_datetime64 is True
     '''
     haf = horizontal_align_fix
 #
@@ -93,18 +147,14 @@ def sonic(filename, L5_fix=True):
 #       Open File
 #
         try:
-            date = np.loadtxt(filename,delimiter=',',skiprows=2,usecols=np.arange(0,1),dtype=datetime.datetime,converters={0:pull_date})
-            u1,v1,w1,T1,u2,v2,w2,T2,u3,v3,w3,T3,u4,v4,w4,T4,u5,v5,w5,T5= \
-                np.loadtxt(filename, usecols=np.arange(2,22), comments='%', delimiter=',',skiprows=2,unpack=True)
-            u5,v5=haf(u5,v5,-15.3)
-            u=np.r_[u1,u2,u3,u4,u5]
-            v=np.r_[v1,v2,v3,v4,v5]
-            w=np.r_[w1,w2,w3,w4,w5]
-            T=np.r_[T1,T2,T3,T4,T5]
-
-            dt = np.dtype([('u',np.float),('v',np.float),('w',np.float),
-                      ('T',np.float)])
-            data=np.array(zip(u,v,w,T), dtype=dt).reshape(5,-1)
+            #Columns are date,record,u1,v1,w1,T1,...,u5,v5,w5,T5
+            columns = dict(u=range(2,22,4), v=range(3,22,4), w=range(4,22,4),
+                T=range(5,22,4))
+            date,data,fields = _read_sonic_table(filename, columns, 0,
+                skiprows=2)
+            date = _convert_dates(date, use_datetime64)
+            if L5_fix:
+                data['u'][4],data['v'][4]=haf(data['u'][4],data['v'][4],-15.3)
 
         except IOError:
             print '%s does not exist\n'%filename
@@ -1,13 +1,15 @@
 #!/usr/bin/env python
+import os
 from cStringIO import StringIO
-from urllib2 import urlopen, HTTPError
+from urllib2 import urlopen, Request, HTTPError
 import numpy as np
 from numpy import ma
-from metpy.cbook import is_string_like, lru_cache, add_dtype_titles
+from metpy.cbook import is_string_like, lru_cache, add_dtype_titles, DiskCache
 # Can go back to numpy once it's updated
-from metpy.cbook import ndfromtxt, mafromtxt, stack_arrays, append_fields
+from metpy.cbook import ndfromtxt, stack_arrays, append_fields
 
-__all__ = ['remote_mesonet_data', 'read_mesonet_data', 'mesonet_stid_info']
+__all__ = ['remote_mesonet_data', 'read_mesonet_data', 'mesonet_stid_info',
+    'MesonetPoller']
 
 #This is a direct copy and paste of the mesonet station data avaiable at
 #http://www.mesonet.org/sites/geomeso.csv
@@ -286,11 +288,20 @@ mesonet_units = {'TAIR':'C', 'RELH':'%', 'PRES':'mb', 'WSPD':'m/s',
 BAD_DATA_LIMIT = -990
 FUTURE_OBSERVATION = -996
 
-@lru_cache(maxsize=20)
-def _fetch_mesonet_data(date_time, site=None):
+#Cache of downloaded files.  Files never change once their (UTC) day is over,
+#so copies downloaded after that are kept until evicted for space; copies
+#downloaded during the day may be incomplete, so they are only reused for
+#CURRENT_DAY_MAX_AGE seconds.
+#The location can be changed with the METPY_CACHE_DIR environment variable or
+#by setting mesonet_cache.directory.  Set mesonet_cache to None to disable.
+mesonet_cache = DiskCache(os.path.join(os.environ.get('METPY_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.metpy', 'cache')), 'mesonet'),
+    max_size=200 * 1024 * 1024)
+CURRENT_DAY_MAX_AGE = 5 * 60
+
+def _mesonet_url(date_time, site=None):
     '''
-    Helper function for fetching mesonet data from a remote location.
-    Uses an LRU cache.
+    Helper function for constructing the URL of a mesonet data file.
     '''
     if site is None:
         data_type = 'mdf'
@@ -307,19 +318,175 @@ def _fetch_mesonet_data(date_time, site=None):
         date_time.day)
     baseurl='http://www.mesonet.org/data/public/mesonet/%s'
 
+    return baseurl % (path + fname)
+
+def _fetch_mesonet_data(date_time, site=None):
+    '''
+    Helper function for fetching mesonet data from a remote location.
+    Uses the on-disk cache in mesonet_cache, if set.
+    '''
+    from calendar import timegm
+    from datetime import timedelta
+
+    url = _mesonet_url(date_time, site)
+
+    if mesonet_cache is not None:
+        #A copy downloaded after the end of the (UTC) day is complete and can
+        #be used indefinitely; one from before then may still be missing data
+        end_of_day = timegm((date_time.date() + timedelta(days=1)).timetuple())
+        modified = mesonet_cache.modified(url)
+        if modified is not None and modified >= end_of_day:
+            max_age = None
+        else:
+            max_age = CURRENT_DAY_MAX_AGE
+        data = mesonet_cache.get(url, max_age)
+        if data is not None:
+            return data
+
     #Open the remote location
-    url = baseurl % (path + fname)
     try:
         datafile = urlopen(url)
     except HTTPError:
             print "Could not open: %s" % url
             raise
-    return datafile.read()
+    data = datafile.read()
+
+    if mesonet_cache is not None:
+        mesonet_cache.put(url, data)
+    return data
+
+def _parse_mesonet_table(fh, fields=None, names=None):
+    '''
+    Helper function for parsing the table portion of a mesonet file: a
+    line of column names followed by whitespace-separated rows.  This is a
+    fixed layout, so rather than inferring types value by value, all values
+    are split at once and each column is converted in bulk.  STID is kept as
+    a fixed-width string and the rest are numeric, with anything at or below
+    BAD_DATA_LIMIT masked.
+
+    The types match what :func:`mafromtxt` infers for these files: a column
+    is integer if all of its valid values are written without a decimal
+    point, float if any are, and boolean if there are no valid values.
+
+    If the column *names* are given, the table is assumed to have no header
+    line.
+
+    Returns : masked structured array
+    '''
+    if names is None:
+        names = fh.readline().split()
+    ncols = len(names)
+    tokens = np.array(fh.read().split())
+    if tokens.size % ncols:
+        raise ValueError('Number of values is not a multiple of the number '
+            'of columns (%d)' % ncols)
+    tokens = tokens.reshape(-1, ncols)
+
+    # Look for decimal points by viewing the strings as bytes, rather than
+    # searching string by string
+    width = tokens.dtype.itemsize
+    has_point = (tokens.view(np.uint8).reshape(tokens.shape + (width,))
+        == ord('.')).any(axis=-1)
+
+    if fields is None:
+        fields = names
+
+    descr = []
+    columns = []
+    masks = []
+    for name in fields:
+        ind = names.index(name)
+        col = tokens[:, ind]
+        if name == 'STID':
+            values = col.astype('|S%d' % np.char.str_len(col).max())
+            mask = np.zeros(values.shape, dtype=np.bool)
+        else:
+            values = col.astype(np.float64)
+            mask = values <= BAD_DATA_LIMIT
+            point = has_point[:, ind]
+            if mask.all():
+                values = np.zeros(values.shape, dtype=np.bool)
+            elif not point[~mask].any():
+                # Missing values written as floats can't be converted to
+                # int directly, and so come out as -1
+                values = values.astype(np.int)
+                values[mask & point] = -1
+        descr.append((name, values.dtype))
+        columns.append(values)
+        masks.append(mask)
+
+    data = np.empty(tokens.shape[:1], dtype=descr)
+    mask = np.empty(tokens.shape[:1], dtype=[(n, np.bool) for n in fields])
+    for name, values, m in zip(fields, columns, masks):
+        data[name] = values
+        mask[name] = m
+    return ma.array(data, mask=mask)
+
+def _replace_field(data, old_name, new_name, values):
+    '''
+    Helper function for replacing a field in the masked structured array
+    *data* with *values*, renaming it to *new_name*.
+    '''
+    names = list(data.dtype.names)
+    descr = [(n, data.dtype[n]) for n in names]
+    ind = names.index(old_name)
+    descr[ind] = (new_name, values.dtype)
+    names[ind] = new_name
+
+    new_data = np.empty(data.shape, dtype=descr)
+    new_mask = np.empty(data.shape, dtype=[(n, np.bool) for n in names])
+    for old, new in zip(data.dtype.names, names):
+        new_data[new] = values if old == old_name else data[old].data
+        new_mask[new] = ma.getmaskarray(data[old])
+    return ma.array(new_data, mask=new_mask)
+
+def _process_mesonet_table(data, info, fields, convert_time, lookup_stids,
+    use_datetime64):
+    '''
+    Helper function for finishing off data parsed from a mesonet file:
+    converting the times, adding titles, and adding station information, as
+    described in :func:`read_mesonet_data`.  *info* is the split 2nd line of
+    the file, which has the date.
+    '''
+    from datetime import datetime, timedelta
+    from pytz import utc
+
+    if convert_time and 'TIME' in data.dtype.names:
+        if use_datetime64:
+            date = np.datetime64('%04d-%02d-%02d' % tuple(map(int, info[1:4])),
+                'm')
+            times = date + data['TIME'].data.astype('timedelta64[m]')
+        else:
+            dt = datetime(tzinfo=utc, *map(int, info[1:4]))
+            # Only create a datetime object for each distinct time in the file
+            minutes, inds = np.unique(data['TIME'].data, return_inverse=True)
+            times = np.empty(minutes.shape, dtype=object)
+            times[:] = [dt + timedelta(minutes=int(t)) for t in minutes]
+            times = times[inds]
+        data = _replace_field(data, 'TIME', 'datetime', times)
+
+    #Use the inverted dictionary to map names in the FILE to their more
+    #descriptive counterparts
+    data = add_dtype_titles(data, mesonet_inv_var_map)
+
+    #Lookup station information so that returned data has latitude and
+    #longitude information
+    if lookup_stids and (fields is None or 'STID' in fields):
+        lat, lon, elev, names = _lookup_stations(data['STID'],
+            ('Lat', 'Lon', 'Elev', 'Name'))
+        data = append_fields(data,
+            ('latitude', 'longitude', 'elevation', 'site'),
+            (lat, lon, elev, names))
+
+    return data
 
 def remote_mesonet_data(date_time=None, fields=None, site=None,
-    convert_time=True, lookup_stids=True, full_day_record=True, num_days=1):
+    convert_time=True, lookup_stids=True, full_day_record=True, num_days=1,
+    use_datetime64=False):
     '''
     Reads in Oklahoma Mesonet Datafile (MDF) directly from their servers.
+    Downloaded files are kept in the on-disk cache given by
+    :data:`mesonet_cache`, so each file is only fetched once.
 
     date_time : datetime object
         A python :class:`datetime` object specify that date and time
@@ -347,6 +514,13 @@ def remote_mesonet_data(date_time=None, fields=None, site=None,
         Flag indicating whether to lookup the location for the station id
         and include this information in the returned data. Defaults to True.
 
+    use_datetime64 : boolean
+        Flag indicating whether converted times should be returned as a
+        numpy datetime64[m] column (in UTC) instead of datetime.datetime
+        objects.  This is much faster to create and allows vectorized
+        comparisons of the times.  Only used if *convert_time* is True.
+        Defaults to False.
+
     full_day_record : boolean
         Flag indicating whether to get yesterday's data as well as today's,
         when datetime is None.  This will give a full 24 hour of data, as
@@ -381,13 +555,170 @@ def remote_mesonet_data(date_time=None, fields=None, site=None,
     for n in range(num_days - 1, -1, -1):
         data = StringIO(
             _fetch_mesonet_data(date_time - datetime.timedelta(days=n), site))
-        data = read_mesonet_data(data, fields, convert_time, lookup_stids)
+        data = read_mesonet_data(data, fields, convert_time, lookup_stids,
+            use_datetime64)
         data_list.append(data)
 
     return stack_arrays(data_list, autoconvert=True)
 
+def _merge_dtypes(dtype1, dtype2):
+    '''
+    Helper function for combining two structured dtypes with the same
+    fields, promoting each field to a type that can hold values of both.
+    Titles are taken from *dtype1*.
+    '''
+    names = dtype1.names
+    titles = [dtype1.fields[n][2] if len(dtype1.fields[n]) > 2 else None
+        for n in names]
+    formats = [np.promote_types(dtype1[n], dtype2[n]) for n in names]
+    return np.dtype(dict(names=names, formats=formats, titles=titles))
+
+class MesonetPoller(object):
+    '''
+    Incrementally reads a mesonet time series file that is still being
+    appended to, such as the current day's file for a station.
+
+    Each call to :meth:`poll` asks the server only for the bytes past the
+    end of the last complete line that was read, using an HTTP Range
+    request, and parses just the new rows onto the end of the existing data.
+    If the server does not honor the range, the whole file is fetched and
+    the already-read part is skipped.  If the file has shrunk, it has been
+    replaced, and it is read again from the start.
+
+    site : string
+        The station id. This is case-insensitive.
+
+    date_time : datetime object
+        The date of the file to read.  Defaults to the current UTC date.
+
+    fields, convert_time, lookup_stids, use_datetime64
+        As for :func:`read_mesonet_data`.
+
+    url : string
+        Optional location to read from, instead of the Oklahoma Mesonet's
+        server.
+    '''
+    def __init__(self, site, date_time=None, fields=None, convert_time=True,
+        lookup_stids=True, use_datetime64=False, url=None):
+        if date_time is None:
+            from datetime import datetime
+            date_time = datetime.utcnow()
+        if url is None:
+            url = _mesonet_url(date_time, site)
+        self.url = url
+        if fields:
+            fields = map(str.upper, fields)
+        self.fields = fields
+        self.convert_time = convert_time
+        self.lookup_stids = lookup_stids
+        self.use_datetime64 = use_datetime64
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.nrows = 0
+        self._info = None
+        self._names = None
+        self._buffer = None
+
+    @property
+    def data(self):
+        '''
+        The rows read so far, as a masked record array like that returned by
+        :func:`read_mesonet_data`, or None if nothing has been read.
+        '''
+        if self._buffer is None:
+            return None
+        return self._buffer[:self.nrows]
+
+    def _fetch(self):
+        '''
+        Get the file contents from the current offset on.
+        '''
+        request = Request(self.url)
+        if self.offset:
+            request.add_header('Range', 'bytes=%d-' % self.offset)
+        try:
+            response = urlopen(request)
+        except HTTPError, e:
+            # Range not satisfiable means no new data
+            if e.code == 416:
+                return ''
+            raise
+        text = response.read()
+
+        if self.offset and response.getcode() != 206:
+            # Got the full file
+            if len(text) < self.offset:
+                self._reset()
+            else:
+                text = text[self.offset:]
+        return text
+
+    def poll(self):
+        '''
+        Read any new rows from the file.
+
+        Returns : integer
+            The number of new rows.
+        '''
+        text = self._fetch()
+
+        # Only use complete lines; anything after the last newline is
+        # requested again next time
+        end = text.rfind('\n') + 1
+        fh = StringIO(text[:end])
+        self.offset += end
+
+        if self._names is None:
+            fh.readline()
+            self._info = fh.readline().split()
+            self._names = fh.readline().split()
+            if not self._names:
+                # Didn't get the whole header; start over next time
+                self._reset()
+                return 0
+
+        pos = fh.tell()
+        if not fh.read().strip():
+            return 0
+        fh.seek(pos)
+        new = _parse_mesonet_table(fh, self.fields, self._names)
+        new = _process_mesonet_table(new, self._info, self.fields,
+            self.convert_time, self.lookup_stids, self.use_datetime64)
+        self._add_rows(new)
+        return len(new)
+
+    def _add_rows(self, new):
+        '''
+        Add rows to the buffer, growing it and promoting field types as
+        needed.
+        '''
+        start = self.nrows
+        self.nrows += len(new)
+        if self._buffer is None:
+            self._buffer = new
+            return
+
+        dtype = _merge_dtypes(self._buffer.dtype, new.dtype)
+        if self.nrows > len(self._buffer) or dtype != self._buffer.dtype:
+            # Grow by doubling so that repeated polls are amortized
+            size = max(self.nrows, 2 * len(self._buffer))
+            buf = ma.empty(size, dtype=dtype)
+            buf.mask = np.ones(size, dtype=buf.mask.dtype)
+            for name in dtype.names:
+                buf.data[name][:start] = self._buffer.data[name][:start]
+                buf.mask[name][:start] = ma.getmaskarray(
+                    self._buffer[name])[:start]
+            self._buffer = buf
+
+        for name in dtype.names:
+            self._buffer.data[name][start:self.nrows] = new.data[name]
+            self._buffer.mask[name][start:self.nrows] = ma.getmaskarray(
+                new[name])
+
 def read_mesonet_data(filename, fields=None, convert_time=True,
-    lookup_stids=True):
+    lookup_stids=True, use_datetime64=False):
     '''
     Reads Oklahoma Mesonet data from *filename*.
 
@@ -414,15 +745,19 @@ def read_mesonet_data(filename, fields=None, convert_time=True,
         Flag indicating whether to lookup the location for the station id
         and include this information in the returned data. Defaults to True.
 
+    use_datetime64 : boolean
+        Flag indicating whether converted times should be returned as a
+        numpy datetime64[m] column (in UTC) instead of datetime.datetime
+        objects.  This is much faster to create and allows vectorized
+        comparisons of the times.  Only used if *convert_time* is True.
+        Defaults to False.
+
     Returns : array
         A nfield by ntime masked array.  nfield is the number of fields
         requested and ntime is the number of times in the file.  Each
         variable is a row in the array.  The variables are returned in
         the order given in *fields*.
     '''
-    from datetime import datetime, timedelta
-    from pytz import utc
-
     if is_string_like(filename):
         if filename.endswith('.gz'):
             import gzip
@@ -440,58 +775,14 @@ def read_mesonet_data(filename, fields=None, convert_time=True,
     if fields:
         fields = map(str.upper, fields)
 
-    #If we're converting the time, we need to read the 2nd line of the file
-    #and parse that into a date object.  We use this object with a timedelta
-    #to make a custom converter.  We also need to then tell the reader to no
-    #longer skip any rows.
-    if convert_time:
-        #Skip first line, read the second for the date
-        fh.readline()
-        info = fh.readline().split()
-        dt = datetime(tzinfo=utc, *map(int, info[1:4]))
-        skip = 0
-        conv = {'TIME': lambda t: dt + timedelta(minutes=int(t))}
-    else:
-        skip = 2
-        conv = None
-
-    # This long list is needed because missing values are detected by
-    # string equality and not value, so that -999 is not the same
-    # as -999.00
-    missing_vals = range(BAD_DATA_LIMIT, BAD_DATA_LIMIT-10, -1)
-    missing_strs = (map(str, missing_vals)
-        + ['%d.' % v for v in missing_vals]
-        + ['%.1f' % v for v in missing_vals]
-        + ['%.2f' % v for v in missing_vals])
-    missing = ','.join(missing_strs)
-    data = mafromtxt(fh, dtype=None, names=True, usecols=fields, skiprows=skip,
-        converters=conv, missing=missing)
-
-    #Use the inverted dictionary to map names in the FILE to their more
-    #descriptive counterparts
-    data = add_dtype_titles(data, mesonet_inv_var_map)
+    #The 2nd line of the file has the date, which is combined with the minutes
+    #given in the TIME column if we're converting the time.
+    fh.readline()
+    info = fh.readline().split()
+    data = _parse_mesonet_table(fh, fields)
 
-    #Change converted column name from TIME to datetime
-    if convert_time and (fields is None or 'TIME' in fields):
-        names = list(data.dtype.names)
-        names[names.index('TIME')] = 'datetime'
-        data.dtype.names = names
-        data.mask.dtype.names = names
-
-    #Lookup station information so that returned data has latitude and
-    #longitude information
-    if lookup_stids and (fields is None or 'STID' in fields):
-        sta_table = mesonet_stid_info()
-        station_indices = sta_table['stid'].searchsorted(data['STID'])
-        lat = sta_table['Lat'][station_indices]
-        lon = sta_table['Lon'][station_indices]
-        elev = sta_table['Elev'][station_indices]
-        names = sta_table['Name'][station_indices]
-        data = append_fields(data,
-            ('latitude', 'longitude', 'elevation', 'site'),
-            (lat, lon, elev, names))
-
-    return data
+    return _process_mesonet_table(data, info, fields, convert_time,
+        lookup_stids, use_datetime64)
 
 def mesonet_stid_info(info=None, remote=False):
     '''
@@ -524,6 +815,39 @@ def mesonet_stid_info(info=None, remote=False):
     return ndfromtxt(station_info, dtype=None, skiprows=123, usecols=cols,
         names=names, delimiter=',')
 
+@lru_cache(maxsize=1)
+def _station_table():
+    '''
+    Helper function returning the local station table, sorted by station
+    id.  The table is only parsed once per process.
+    '''
+    table = mesonet_stid_info()
+    return table[table['stid'].argsort()]
+
+def _lookup_stations(stids, info):
+    '''
+    Helper function for looking up information for an array of station ids.
+
+    stids : array
+        The station ids to look up
+
+    info : sequence of strings
+        The names of the station table columns to return.
+
+    Returns : list of masked arrays
+        An array for each name in *info*, with an entry for each station in
+        *stids*.  Entries for stations not in the table are masked.
+    '''
+    table = _station_table()
+
+    # Only search for each distinct station once
+    unique_ids, inds = np.unique(np.asarray(stids), return_inverse=True)
+    rows = table['stid'].searchsorted(unique_ids).clip(0, len(table) - 1)
+    missing = (table['stid'][rows] != unique_ids)[inds]
+    rows = rows[inds]
+
+    return [ma.array(table[name][rows], mask=missing) for name in info]
+
 def get_last_time(data, ref_field='TAIR', dt_field='datetime'):
     '''
     Get the time of the last actual observation in a mesonet file.
@@ -539,7 +863,8 @@ def get_last_time(data, ref_field='TAIR', dt_field='datetime'):
         The name of the field containing date/time information. Defaults
         to 'datetime'.
 
-    Returns : the date/time of the last actual observation in the file
+    Returns : the date/time of the last actual observation in the file,
+        as a datetime object or numpy datetime64, matching *dt_field*
     '''
     mask = data[ref_field].data != FUTURE_OBSERVATION
     return data[dt_field][mask][-1]
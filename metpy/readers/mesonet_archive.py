@@ -0,0 +1,391 @@
+'''
+An append-only archive of Oklahoma Mesonet observations, stored on disk by
+column so that time series for a station (or a snapshot of the whole
+network) can be pulled out without re-reading the original data files.
+'''
+import os
+from datetime import datetime
+import numpy as np
+from numpy import ma
+from metpy.cbook import add_dtype_titles, append_fields
+from metpy.readers.mesonet import mesonet_inv_var_map, _lookup_stations
+
+__all__ = ['MesonetArchive']
+
+#Fields that are station metadata rather than observations
+_station_fields = ('STID', 'STNM', 'TIME', 'datetime', 'latitude',
+    'longitude', 'elevation', 'site')
+
+def _to_minutes(times):
+    '''
+    Helper function for converting datetime objects (naive ones are assumed
+    to be UTC) or numpy datetime64 values to integer minutes since 1970-01-01.
+    '''
+    times = np.asarray(times)
+    if times.dtype.kind != 'M':
+        # Only convert each distinct time once
+        unique_times, inds = np.unique(times, return_inverse=True)
+        converted = np.empty(unique_times.shape, dtype='datetime64[m]')
+        for i, t in enumerate(unique_times):
+            if getattr(t, 'tzinfo', None) is not None:
+                t = t.replace(tzinfo=None) - t.utcoffset()
+            converted[i] = np.datetime64(t, 'm')
+        times = converted[inds].reshape(times.shape)
+    return times.astype('datetime64[m]').astype(np.int64)
+
+def _to_datetimes(minutes):
+    '''
+    Helper function for converting minutes since 1970-01-01 to an array of
+    timezone-aware (UTC) datetime objects.
+    '''
+    from pytz import utc
+    unique_minutes, inds = np.unique(minutes, return_inverse=True)
+    times = np.empty(unique_minutes.shape, dtype=object)
+    times[:] = [t.replace(tzinfo=utc) for t in
+        unique_minutes.astype('datetime64[m]').astype(datetime)]
+    return times[inds]
+
+def _storage_type(dtype):
+    '''
+    Helper function for getting the type used to store a field of type
+    *dtype*.  Booleans are stored as bytes (int8), so that there is room for
+    a missing value.
+    '''
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'b':
+        return np.dtype(np.int8)
+    return dtype
+
+def _fill_value(dtype):
+    '''
+    Helper function for getting the value that marks missing observations
+    in a stored array of type *dtype*: NaN for floats, and the most negative
+    (or, for unsigned types, the largest) value for integers.  This makes
+    the fill for booleans, which are stored as int8, -128.
+    '''
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return np.nan
+    if dtype.kind == 'u':
+        return np.iinfo(dtype).max
+    return np.iinfo(dtype).min
+
+def _is_missing(values):
+    'Helper function for finding the missing values in a stored array.'
+    if values.dtype.kind == 'f':
+        return np.isnan(values)
+    return values == _fill_value(values.dtype)
+
+class MesonetArchive(object):
+    '''
+    An append-only columnar store of mesonet observations.
+
+    The archive is a directory with a subdirectory for each variable, which
+    holds a file for each UTC day.  Each file is a memory-mapped array with
+    a row for each station and a column for each 5-minute observation time
+    in the day, so finding the values for a station and a range of times is
+    simple offset arithmetic.  Each variable is stored with the type it was
+    read with (booleans as bytes), and is promoted if later data need a
+    wider type.  Missing observations are stored as NaN for floats, and as
+    the most negative (or largest unsigned) value for integers, so -128 for
+    booleans.  The order of the stations (the rows) and the list of
+    variables, with their types, are kept in text files in the directory.
+
+    directory : string
+        The location of the archive.  It is created if it does not exist.
+    '''
+    interval = 5 # minutes between observations
+    per_day = 24 * 60 // interval
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.stations = self._read_list('stations.txt')
+        self._read_fields()
+        self._station_rows = dict((s, i) for i, s in enumerate(self.stations))
+
+    def _read_list(self, fname):
+        path = os.path.join(self.directory, fname)
+        if not os.path.exists(path):
+            return []
+        return open(path).read().split()
+
+    def _write_list(self, fname, items):
+        fh = open(os.path.join(self.directory, fname), 'w')
+        fh.write('\n'.join(items) + '\n')
+        fh.close()
+
+    def _read_fields(self):
+        '''
+        Read the list of variables and their types.  Archives written
+        before types were recorded only hold floats.
+        '''
+        self.fields = []
+        self.dtypes = dict()
+        path = os.path.join(self.directory, 'fields.txt')
+        if not os.path.exists(path):
+            return
+        for line in open(path):
+            parts = line.split()
+            if not parts:
+                continue
+            self.fields.append(parts[0])
+            self.dtypes[parts[0]] = np.dtype(parts[1] if len(parts) > 1
+                else np.float64)
+
+    def _write_fields(self):
+        self._write_list('fields.txt', ['%s %s' % (f, self.dtypes[f].str)
+            for f in self.fields])
+
+    def _promote_field(self, field, dtype):
+        '''
+        Change the type of *field* to *dtype*, converting the files already
+        in the archive and keeping missing values missing.
+        '''
+        old_type = _storage_type(self.dtypes[field])
+        new_type = _storage_type(dtype)
+        directory = os.path.join(self.directory, field)
+        if new_type != old_type and os.path.isdir(directory):
+            for fname in os.listdir(directory):
+                if not fname.endswith('.dat'):
+                    continue
+                path = os.path.join(directory, fname)
+                values = np.fromfile(path, dtype=old_type)
+                converted = values.astype(new_type)
+                converted[_is_missing(values)] = _fill_value(new_type)
+                # Write a new file and rename it, so that a failure leaves
+                # the old one in place
+                converted.tofile(path + '.tmp')
+                os.rename(path + '.tmp', path)
+        self.dtypes[field] = np.dtype(dtype)
+
+    def _path(self, field, day):
+        return os.path.join(self.directory, field, '%d.dat' % day)
+
+    def _day_array(self, field, day, create=False):
+        '''
+        Get the memory-mapped array for *field* on *day* (days since
+        1970-01-01).  If *create* is True, the file is created or extended
+        with missing values as needed to hold all known stations.  Otherwise
+        None is returned if there is no file.
+        '''
+        path = self._path(field, day)
+        dtype = _storage_type(self.dtypes.get(field, np.float64))
+        row_bytes = self.per_day * dtype.itemsize
+        if os.path.exists(path):
+            nrows = os.path.getsize(path) // row_bytes
+        elif create:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            nrows = 0
+        else:
+            return None
+
+        if create and nrows < len(self.stations):
+            # Rows are stations, so new stations go on the end of the file
+            fill = np.empty((len(self.stations) - nrows, self.per_day),
+                dtype=dtype)
+            fill.fill(_fill_value(dtype))
+            fh = open(path, 'ab')
+            fill.tofile(fh)
+            fh.close()
+            nrows = len(self.stations)
+
+        return np.memmap(path, dtype=dtype, mode='r+' if create else 'r',
+            shape=(nrows, self.per_day))
+
+    def append(self, data):
+        '''
+        Add observations to the archive.  Values already in the archive for
+        the same stations and times are overwritten.
+
+        data : masked record array
+            Data as returned by :func:`read_mesonet_data` (with time
+            conversion), which must include the STID and datetime fields.
+        '''
+        stids = np.asarray(data['STID'])
+        minutes = _to_minutes(data['datetime'])
+        if (minutes % self.interval).any():
+            raise ValueError('Observation times must be multiples of %d '
+                'minutes' % self.interval)
+
+        # Add any new stations and variables
+        unique_ids, inds = np.unique(stids, return_inverse=True)
+        new_ids = [s for s in unique_ids if s not in self._station_rows]
+        if new_ids:
+            for s in new_ids:
+                self._station_rows[s] = len(self.stations)
+                self.stations.append(s)
+            self._write_list('stations.txt', self.stations)
+
+        fields = [name for name in data.dtype.names
+            if name not in _station_fields and data.dtype[name].kind in 'biuf']
+        changed = False
+        for f in fields:
+            dtype = data.dtype[f]
+            if f not in self.dtypes:
+                self.fields.append(f)
+                self.dtypes[f] = dtype
+                changed = True
+            elif np.promote_types(self.dtypes[f], dtype) != self.dtypes[f]:
+                self._promote_field(f, np.promote_types(self.dtypes[f],
+                    dtype))
+                changed = True
+        if changed:
+            self._write_fields()
+
+        rows = np.array([self._station_rows[s] for s in unique_ids])[inds]
+        days = minutes // (24 * 60)
+        slots = (minutes % (24 * 60)) // self.interval
+
+        for field in fields:
+            dtype = _storage_type(self.dtypes[field])
+            values = ma.filled(ma.asarray(data[field]).astype(dtype),
+                _fill_value(dtype))
+            for day in np.unique(days):
+                sel = days == day
+                arr = self._day_array(field, day, create=True)
+                arr[rows[sel], slots[sel]] = values[sel]
+                arr.flush()
+                del arr
+
+    def _empty_values(self, fields, shape):
+        '''
+        Helper for creating arrays of missing values, of the stored type of
+        each of *fields*, to copy query results into.
+        '''
+        values = dict()
+        for f in fields:
+            dtype = _storage_type(self.dtypes.get(f, np.float64))
+            values[f] = np.empty(shape, dtype=dtype)
+            values[f].fill(_fill_value(dtype))
+        return values
+
+    def _make_output(self, stids, minutes, values, fields, use_datetime64,
+        lookup_stids):
+        '''
+        Helper for assembling query results into the same kind of masked
+        record array returned by :func:`read_mesonet_data`.
+        '''
+        times = (minutes.astype('datetime64[m]') if use_datetime64
+            else _to_datetimes(minutes))
+        descr = ([('STID', stids.dtype), ('datetime', times.dtype)]
+            + [(f, self.dtypes.get(f, np.float64)) for f in fields])
+        data = np.empty(minutes.shape, dtype=descr)
+        mask = np.zeros(minutes.shape, dtype=[(n, np.bool) for n,t in descr])
+        data['STID'] = stids
+        data['datetime'] = times
+        for f in fields:
+            mask[f] = _is_missing(values[f])
+            data[f] = values[f]
+        data = add_dtype_titles(ma.array(data, mask=mask), mesonet_inv_var_map)
+        if not lookup_stids:
+            return data
+
+        lat, lon, elev, names = _lookup_stations(stids,
+            ('Lat', 'Lon', 'Elev', 'Name'))
+        return append_fields(data,
+            ('latitude', 'longitude', 'elevation', 'site'),
+            (lat, lon, elev, names))
+
+    def time_series(self, stid, start, end, fields=None, use_datetime64=False,
+        lookup_stids=True):
+        '''
+        Get all observations for a station over a range of times.
+
+        stid : string
+            The station identifier
+
+        start, end : datetime or numpy datetime64
+            The first and last times (inclusive) to return.
+
+        fields : sequence or None
+            The variables to return.  Defaults to all in the archive.
+
+        use_datetime64 : boolean
+            Flag indicating whether times are returned as datetime64[m]
+            values instead of datetime objects.  Defaults to False.
+
+        lookup_stids : boolean
+            Flag indicating whether to add the station's location and name,
+            as in :func:`read_mesonet_data`.  Defaults to True.
+
+        Returns : masked record array
+            Record array, suitable for :func:`meteogram`, with a record for
+            every observation time in the range.  Values that are not in
+            the archive are masked.
+        '''
+        if fields is None:
+            fields = self.fields
+        first, last = _to_minutes([start, end])
+        first -= first % self.interval
+        minutes = np.arange(first, last + 1, self.interval)
+        row = self._station_rows.get(stid)
+
+        values = self._empty_values(fields, minutes.shape)
+        for f in fields:
+            if row is None:
+                continue
+            # Copy from each day file in turn
+            for day in range(first // 1440, last // 1440 + 1):
+                arr = self._day_array(f, day)
+                if arr is None or row >= arr.shape[0]:
+                    continue
+                day_start = day * 1440
+                begin = max(first, day_start)
+                stop = min(last, day_start + 1439)
+                out_slice = slice((begin - first) // self.interval,
+                    (stop - first) // self.interval + 1)
+                in_slice = slice((begin - day_start) // self.interval,
+                    (stop - day_start) // self.interval + 1)
+                values[f][out_slice] = arr[row, in_slice]
+                del arr
+
+        stids = np.empty(minutes.shape, dtype='|S%d' % max(len(stid), 1))
+        stids.fill(stid)
+        return self._make_output(stids, minutes, values, fields,
+            use_datetime64, lookup_stids)
+
+    def snapshot(self, time, fields=None, use_datetime64=False,
+        lookup_stids=True):
+        '''
+        Get observations for all stations at a single time.
+
+        time : datetime or numpy datetime64
+            The observation time.
+
+        fields : sequence or None
+            The variables to return.  Defaults to all in the archive.
+
+        use_datetime64 : boolean
+            Flag indicating whether times are returned as datetime64[m]
+            values instead of datetime objects.  Defaults to False.
+
+        lookup_stids : boolean
+            Flag indicating whether to add the station's location and name,
+            as in :func:`read_mesonet_data`.  Defaults to True.
+
+        Returns : masked record array
+            Record array, suitable for :func:`station_plot`, with a record
+            for each station in the archive.
+        '''
+        if fields is None:
+            fields = self.fields
+        minute = _to_minutes([time])[0]
+        day, slot = divmod(minute, 1440)
+        slot //= self.interval
+        nstations = len(self.stations)
+
+        values = self._empty_values(fields, nstations)
+        for f in fields:
+            arr = self._day_array(f, day)
+            if arr is not None:
+                values[f][:arr.shape[0]] = arr[:, slot]
+                del arr
+
+        stids = np.array(self.stations)
+        minutes = np.empty(nstations, dtype=np.int64)
+        minutes.fill(minute - minute % self.interval)
+        return self._make_output(stids, minutes, values, fields,
+            use_datetime64, lookup_stids)
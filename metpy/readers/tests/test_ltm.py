@@ -0,0 +1,45 @@
+import os
+import tempfile
+import datetime
+from numpy.testing import *
+import numpy as np
+from metpy.readers.ltm import sonic
+
+sonic_text = '''%header
+%header
+"2007-05-01 12:00:00",0,1,2,3,4,1,2,3,4,1,2,3,4,1,2,3,4,0,1,3,4
+"2007-05-01 12:00:00.05",1,5,6,7,8,5,6,7,8,5,6,7,8,5,6,7,8,0,1,7,8
+'''
+
+class TestSonic(TestCase):
+    def setUp(self):
+        (fd, self.fname) = tempfile.mkstemp(suffix='.dat')
+        os.write(fd, sonic_text)
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def test_levels(self):
+        'Test that the values are split up by level.'
+        date,data = sonic(self.fname, L5_fix=False)
+        assert data.shape == (5, 2)
+        assert_array_equal(data['u'][:,1], [5, 5, 5, 5, 0])
+        assert_array_equal(data['T'][0], [4, 8])
+
+    def test_dates(self):
+        'Test reading the timestamps.'
+        date,data = sonic(self.fname)
+        assert date[1] == datetime.datetime(2007, 5, 1, 12, 0, 0, 50000)
+        date,data = sonic(self.fname, use_datetime64=True)
+        assert_array_equal(date, np.array(['2007-05-01T12:00:00.000',
+            '2007-05-01T12:00:00.050'], dtype='datetime64[ms]'))
+
+    def test_l5_fix(self):
+        'Test the level 5 alignment fix.'
+        date,data = sonic(self.fname)
+        assert_almost_equal(np.hypot(data['u'][4], data['v'][4]), [1, 1])
+        assert not np.allclose(data['v'][4], [1, 1])
+
+if __name__ == '__main__':
+    run_module_suite()
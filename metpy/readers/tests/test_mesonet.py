@@ -0,0 +1,287 @@
+import os
+import shutil
+import tempfile
+import threading
+from calendar import timegm
+from cStringIO import StringIO
+from datetime import datetime
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from numpy.testing import *
+import numpy as np
+from numpy import ma
+from metpy.cbook import DiskCache
+from metpy.readers import mesonet
+from metpy.readers.mesonet import (read_mesonet_data, MesonetPoller,
+    _lookup_stations)
+from metpy.readers.mesonet_archive import (MesonetArchive, _storage_type,
+    _fill_value)
+
+mts_text = '''  101 ! (c) 2008 Oklahoma Climatological Survey and the Oklahoma Mesonet - all rights reserved
+  22 2008 12 15 00 00 00
+ STID  STNM  TIME   RELH   TAIR   WSPD   WDIR   RAIN     PRES   TR75
+ NRMN   121     0     46   -0.4   10.6   352    0.00   971.19   -998
+ NRMN   121     5   -996   -0.6   12.0   347    0.00   971.51   -998
+ NRMN   121    10     46 -996.0   11.9   345    0.00   971.79 -998.00
+'''
+
+class TestReadMesonet(TestCase):
+    def test_types(self):
+        'Test that column types are inferred from the values.'
+        data = read_mesonet_data(StringIO(mts_text), lookup_stids=False)
+        assert data.dtype['STID'] == np.dtype('|S4')
+        assert data.dtype['RELH'].kind == 'i'
+        assert data.dtype['TAIR'].kind == 'f'
+        assert data.dtype['TR75'].kind == 'b'
+        assert_array_equal(data['TAIR'].data, [-0.4, -0.6, -996.])
+        assert_array_equal(data['STNM'], [121, 121, 121])
+
+    def test_missing(self):
+        'Test that values at or below BAD_DATA_LIMIT are masked.'
+        data = read_mesonet_data(StringIO(mts_text), lookup_stids=False)
+        assert_array_equal(data['RELH'].mask, [False, True, False])
+        assert_array_equal(data['TAIR'].mask, [False, False, True])
+        assert data['TR75'].mask.all()
+
+    def test_fields(self):
+        'Test selecting fields, which are returned in the order given.'
+        data = read_mesonet_data(StringIO(mts_text), fields=('tair', 'stid'),
+            lookup_stids=False)
+        assert data.dtype.names == ('TAIR', 'STID')
+
+    def test_convert_time(self):
+        'Test converting minutes into datetime objects.'
+        from datetime import datetime
+        from pytz import utc
+        data = read_mesonet_data(StringIO(mts_text), lookup_stids=False)
+        assert 'TIME' not in data.dtype.names
+        assert data['datetime'][2] == datetime(2008, 12, 15, 0, 10,
+            tzinfo=utc)
+        assert_array_equal(data['temperature'], data['TAIR'])
+
+    def test_datetime64(self):
+        'Test converting minutes into a datetime64 column.'
+        data = read_mesonet_data(StringIO(mts_text), lookup_stids=False,
+            use_datetime64=True)
+        assert data.dtype['datetime'] == np.dtype('datetime64[m]')
+        assert_array_equal(data['datetime'],
+            np.array(['2008-12-15T00:00', '2008-12-15T00:05',
+                '2008-12-15T00:10'], dtype='datetime64[m]'))
+
+class TestStationLookup(TestCase):
+    def setUp(self):
+        # A small table, sorted by station id, in place of the full one
+        self.saved = mesonet._station_table
+        table = np.array([('ACME', 'Acme', 34.81, -98.02, 397),
+            ('NRMN', 'Norman', 35.24, -97.46, 357),
+            ('WOOD', 'Woodward', 36.42, -99.42, 625)],
+            dtype=[('stid', 'S4'), ('Name', 'S8'), ('Lat', float),
+                ('Lon', float), ('Elev', int)])
+        mesonet._station_table = lambda: table
+
+    def tearDown(self):
+        mesonet._station_table = self.saved
+
+    def test_unknown(self):
+        'Test that stations not in the station table are masked.'
+        lat, name = _lookup_stations(['NRMN', 'AAAA', 'ZZZZ', 'NRMN', 'NRMX'],
+            ('Lat', 'Name'))
+        assert_array_equal(lat.mask, [False, True, True, False, True])
+        assert_array_equal(name.mask, lat.mask)
+        assert_array_equal(lat.compressed(), [35.24, 35.24])
+
+    def test_read(self):
+        'Test that unknown stations in a file get masked locations.'
+        data = read_mesonet_data(StringIO(mts_text.replace(' NRMN   121    10',
+            ' ZZZZ   121    10')))
+        assert_array_equal(data['latitude'].mask, [False, False, True])
+        assert_array_equal(data['site'].mask, [False, False, True])
+        assert_array_equal(data['site'][:2], ['Norman', 'Norman'])
+
+class GrowingFileHandler(BaseHTTPRequestHandler):
+    'Serves the server\'s contents attribute, honoring Range if asked to.'
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('Range'))
+        text = server.contents
+        rng = self.headers.get('Range')
+        if rng and server.use_range:
+            start = int(rng.split('=')[1].rstrip('-'))
+            if start >= len(text):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            text = text[start:]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(text)))
+        self.end_headers()
+        self.wfile.write(text)
+
+    def log_message(self, *args):
+        pass
+
+class TestMesonetPoller(TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), GrowingFileHandler)
+        self.server.requests = []
+        self.server.use_range = True
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_port
+        lines = mts_text.splitlines(True)
+        self.header = ''.join(lines[:3])
+        self.rows = lines[3:]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def check_growing(self):
+        poller = MesonetPoller('nrmn', url=self.url, lookup_stids=False,
+            use_datetime64=True)
+        self.server.contents = self.header + self.rows[0]
+        assert poller.poll() == 1
+        self.server.contents += self.rows[1] + self.rows[2][:10]
+        assert poller.poll() == 1
+        assert poller.poll() == 0
+        self.server.contents += self.rows[2][10:]
+        assert poller.poll() == 1
+
+        ref = read_mesonet_data(StringIO(mts_text), lookup_stids=False,
+            use_datetime64=True)
+        data = poller.data
+        assert poller.offset == len(mts_text)
+        assert_array_equal(data['datetime'], ref['datetime'])
+        for name in ('RELH', 'TAIR', 'PRES', 'TR75'):
+            assert_array_equal(ma.getmaskarray(data[name]),
+                ma.getmaskarray(ref[name]))
+            assert_array_equal(data[name].compressed(), ref[name].compressed())
+        assert_array_equal(data['temperature'], data['TAIR'])
+
+    def test_range(self):
+        'Test that only new bytes are requested.'
+        self.check_growing()
+        header_len = len(self.header)
+        assert self.server.requests == [None,
+            'bytes=%d-' % (header_len + len(self.rows[0])),
+            'bytes=%d-' % (header_len + len(self.rows[0]) + len(self.rows[1])),
+            'bytes=%d-' % (header_len + len(self.rows[0]) + len(self.rows[1]))]
+
+    def test_no_range(self):
+        'Test falling back to fetching the whole file.'
+        self.server.use_range = False
+        self.check_growing()
+
+    def test_replaced(self):
+        'Test starting over when the file shrinks.'
+        self.server.contents = mts_text
+        poller = MesonetPoller('nrmn', url=self.url, lookup_stids=False)
+        assert poller.poll() == 3
+        self.server.use_range = False
+        self.server.contents = self.header + self.rows[0]
+        assert poller.poll() == 1
+        assert len(poller.data) == 1
+
+class TestMesonetCache(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.saved = (mesonet.mesonet_cache, mesonet.urlopen)
+        mesonet.mesonet_cache = DiskCache(self.dir)
+        mesonet.urlopen = lambda url: StringIO('new')
+        self.date = datetime(2008, 12, 15, 12)
+        self.url = mesonet._mesonet_url(self.date, 'nrmn')
+        mesonet.mesonet_cache.put(self.url, 'old')
+
+    def tearDown(self):
+        mesonet.mesonet_cache, mesonet.urlopen = self.saved
+        shutil.rmtree(self.dir)
+
+    def set_modified(self, date_time):
+        stamp = timegm(date_time.timetuple())
+        os.utime(mesonet.mesonet_cache._path(self.url), (stamp, stamp))
+
+    def test_complete(self):
+        'Test that a copy made after the end of the day never expires.'
+        self.set_modified(datetime(2008, 12, 16, 0, 1))
+        assert mesonet._fetch_mesonet_data(self.date, 'nrmn') == 'old'
+
+    def test_incomplete(self):
+        'Test that a copy made during the day expires for past days.'
+        self.set_modified(datetime(2008, 12, 15, 23, 50))
+        assert mesonet._fetch_mesonet_data(self.date, 'nrmn') == 'new'
+        assert mesonet.mesonet_cache.get(self.url) == 'new'
+
+class TestMesonetArchive(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.data = read_mesonet_data(StringIO(mts_text), lookup_stids=False,
+            use_datetime64=True)
+        MesonetArchive(self.dir).append(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_time_series(self):
+        'Test getting back a station time series, with missing values masked.'
+        arc = MesonetArchive(self.dir)
+        ts = arc.time_series('NRMN', np.datetime64('2008-12-14T23:55'),
+            np.datetime64('2008-12-15T00:15'), fields=['TAIR', 'RELH'],
+            use_datetime64=True, lookup_stids=False)
+        assert_array_equal(ts['datetime'], np.arange('2008-12-14T23:55',
+            '2008-12-15T00:20', 5, dtype='datetime64[m]'))
+        assert_array_equal(ts['TAIR'].mask, [True, False, False, True, True])
+        assert_array_equal(ts['TAIR'][1:3], self.data['TAIR'][:2])
+        assert_array_equal(ts['RELH'].mask, [True, False, True, False, True])
+        assert_array_equal(ts['temperature'], ts['TAIR'])
+
+    def test_snapshot(self):
+        'Test getting all stations at a single time.'
+        from datetime import datetime
+        arc = MesonetArchive(self.dir)
+        snap = arc.snapshot(datetime(2008, 12, 15, 0, 5), lookup_stids=False)
+        assert_array_equal(snap['STID'], ['NRMN'])
+        assert_array_equal(snap['PRES'], [971.51])
+        assert snap['RELH'].mask.all()
+        assert snap['TR75'].mask.all()
+
+    def test_types(self):
+        'Test that each field keeps the type it was read with.'
+        arc = MesonetArchive(self.dir)
+        ts = arc.time_series('NRMN', np.datetime64('2008-12-15T00:00'),
+            np.datetime64('2008-12-15T00:10'), use_datetime64=True,
+            lookup_stids=False)
+        for name in ('RELH', 'TAIR', 'TR75'):
+            assert ts.dtype[name] == self.data.dtype[name]
+            assert_array_equal(ts[name].mask, self.data[name].mask)
+        assert_array_equal(ts['RELH'].compressed(), [46, 46])
+        assert MesonetArchive(self.dir).dtypes == arc.dtypes
+
+    def test_promote(self):
+        'Test that stored values are kept when a field needs a wider type.'
+        # The same observations 15 minutes later, with a fractional RELH
+        later = mts_text.replace('121     0     46', '121    15     45.5')
+        later = later.replace('121     5', '121    20')
+        later = later.replace('121    10', '121    25')
+        data = read_mesonet_data(StringIO(later), lookup_stids=False,
+            use_datetime64=True)
+        arc = MesonetArchive(self.dir)
+        arc.append(data)
+        assert arc.dtypes['RELH'] == np.float64
+        ts = arc.time_series('NRMN', np.datetime64('2008-12-15T00:00'),
+            np.datetime64('2008-12-15T00:25'), fields=['RELH', 'TR75'],
+            use_datetime64=True, lookup_stids=False)
+        assert ts.dtype['RELH'] == np.float64
+        assert_array_equal(ts['RELH'].mask,
+            [False, True, False, False, True, False])
+        assert_array_equal(ts['RELH'].compressed(), [46., 46., 45.5, 46.])
+        assert ts['TR75'].mask.all()
+
+    def test_bool_fill(self):
+        'Test that booleans are stored as bytes with -128 marking missing.'
+        assert _storage_type(np.bool_) == np.int8
+        assert _fill_value(_storage_type(np.bool_)) == -128
+
+if __name__ == '__main__':
+    run_module_suite()
@@ -13,6 +13,66 @@ class TestVaporPressure(TestCase):
         es = vapor_pressure(0)
         assert_almost_equal(es, 6.112, 3)
 
+    def test_out(self):
+        'Test calculating in place, keeping single precision.'
+        temp = np.array([5, 10, 18, 25], dtype=np.float32)
+        vapor_pressure(temp, out=temp)
+        assert temp.dtype == np.float32
+        assert_array_almost_equal(temp, [8.72, 12.28, 20.64, 31.68], 2)
+
+    def test_masked(self):
+        'Test that masked input gives masked output.'
+        temp = np.ma.array([5, 10, 18, 25], mask=[False, True, False, False])
+        es = vapor_pressure(temp)
+        assert_array_equal(es.mask, temp.mask)
+
+class TestVaporPressureTable(TestCase):
+    def test_error_bound(self):
+        'Test that the table is within its error bound.'
+        for step in (0.01, 0.05, 0.3):
+            table = VaporPressureTable(-80, 50, step)
+            temp = np.linspace(-80, 50, 100001)
+            es = vapor_pressure(temp)
+            assert (np.abs(table(temp) - es) / es).max() <= table.max_rel_error
+
+    def test_fallback(self):
+        'Test values outside the table.'
+        temp = np.array([-120, np.nan, 70, 20.])
+        es = vapor_pressure(temp, table=VaporPressureTable(-100, 60))
+        assert_array_almost_equal(es, vapor_pressure(temp), 5)
+        assert np.isnan(es[1])
+
+    def test_edges(self):
+        'Test values at and just beyond the ends of the table.'
+        table = VaporPressureTable(-100, 60)
+        temp = np.array([-100.01, -100., 59.99, 60., 60.01])
+        assert_allclose(table(temp), vapor_pressure(temp),
+            rtol=table.max_rel_error)
+
+    def test_blocks(self):
+        'Test arrays larger than a block, written into a transposed output.'
+        table = VaporPressureTable()
+        temp = np.random.uniform(-120, 70, (300, 400))
+        out = np.empty((400, 300)).T
+        assert table(temp, out) is out
+        assert_allclose(out, vapor_pressure(temp), rtol=table.max_rel_error)
+
+    def test_dtype(self):
+        'Test that single precision is kept.'
+        temp = np.array([5, 10, 18, 25], dtype=np.float32)
+        es = vapor_pressure(temp, table=True)
+        assert es.dtype == np.float32
+        assert_array_almost_equal(es, [8.72, 12.28, 20.64, 31.68], 2)
+
+    def test_single_precision_bound(self):
+        'Test that single precision input is within the error bound.'
+        table = VaporPressureTable(-80, 50)
+        temp = np.linspace(-80, 50, 100001).astype(np.float32)
+        es = vapor_pressure(temp.astype(np.float64))
+        rel_error = np.abs(table(temp) - es) / es
+        assert rel_error.max() <= (table.max_rel_error
+            + np.finfo(np.float32).eps)
+
 class TestDewpoint(TestCase):
     def test_basic(self):
         temp = np.array([30, 25, 10, 20, 25])
@@ -25,6 +85,25 @@ class TestDewpoint(TestCase):
         td = dewpoint(10.6, .37) * 1.8 + 32.
         assert_almost_equal(td, 26, 0)
 
+    def test_same_as_masked(self):
+        'Test that the fused calculation matches the masked version.'
+        temp = np.array([30, 25, 10, 20, 25.])
+        rh = np.array([30, 45, 0, 80, -5])/100.
+        td = dewpoint(temp, rh)
+        masked_td = dewpoint(np.ma.array(temp), np.ma.array(rh))
+        assert_array_equal(td.mask, [False, False, True, False, True])
+        assert_array_equal(td.mask, masked_td.mask)
+        assert_array_almost_equal(td, masked_td, 10)
+
+    def test_out(self):
+        'Test broadcasting into an output array.'
+        temp = np.array([[30], [10]], dtype=np.float32)
+        rh = np.array([.3, .55], dtype=np.float32)
+        out = np.empty((2, 2), dtype=np.float32)
+        assert dewpoint(temp, rh, out=out) is out
+        assert_array_almost_equal(out, dewpoint(temp.astype(np.float64),
+            rh.astype(np.float64)), 4)
+
 class TestWindComps(TestCase):
     def test_basic(self):
         'Test the basic calculation.'
@@ -58,6 +137,17 @@ class TestWindChill(TestCase):
         wc = windchill(-5, 35, metric=False)
         assert_almost_equal(wc, -34, 0)
 
+    def test_same_as_masked(self):
+        'Test that the unmasked calculation matches the masked version.'
+        temp = np.array([40, -10, -45, 20, 60.])
+        speed = np.array([5, 55, 25, 15, 10.])
+        for metric in (True, False):
+            wc = windchill(temp, speed, metric=metric, face_level_winds=True)
+            masked_wc = windchill(np.ma.array(temp), np.ma.array(speed),
+                metric=metric, face_level_winds=True)
+            assert_array_equal(wc.mask, masked_wc.mask)
+            assert_array_almost_equal(wc, masked_wc, 10)
+
     def test_metric(self):
         'Test the basic wind chill calculation.'
         temp = (np.array([40, -10, -45, 20]) - 32.) / 1.8
@@ -99,6 +189,16 @@ class TestHeatIndex(TestCase):
         hi = heat_index(96, 65)
         assert_almost_equal(hi, 121, 0)
 
+    def test_out(self):
+        'Test calculating into an output array.'
+        temp = np.array([80, 88, 92, 110])
+        rh = np.array([40, 100, 70, 40])
+        out = np.empty(4)
+        assert heat_index(temp, rh, out=out) is out
+        assert_array_almost_equal(out, [80, 121, 112, 136], 0)
+        masked_hi = heat_index(np.ma.array(temp), np.ma.array(rh))
+        assert_array_almost_equal(out, masked_hi, 10)
+
     def test_invalid(self):
         'Test for values that should be masked.'
         temp = np.array([80, 88, 92, 79, 30, 81])
@@ -117,6 +217,40 @@ class TestHeatIndex(TestCase):
         mask = np.array([False]*6)
         assert_array_equal(hi.mask, mask)
 
+class TestWorkers(TestCase):
+    def setUp(self):
+        self.temp = np.random.uniform(-20, 110, (700, 501))
+        self.other = np.random.uniform(-5, 100, (700, 501))
+
+    def check_same(self, func, *args, **kwargs):
+        ref = func(*args, **kwargs)
+        result = func(workers=3, *args, **kwargs)
+        assert_array_equal(np.ma.getmaskarray(result),
+            np.ma.getmaskarray(ref))
+        assert_array_equal(np.ma.getdata(result), np.ma.getdata(ref))
+
+    def test_same(self):
+        'Test that the threaded calculations match the serial ones.'
+        self.check_same(heat_index, self.temp, self.other)
+        self.check_same(heat_index, self.temp, 50., mask_undefined=False)
+        self.check_same(windchill, self.temp, self.other[0], metric=False)
+        self.check_same(dewpoint, self.temp / 4, self.other / 100.)
+
+    def test_shapes(self):
+        'Test arrays whose leading dimensions are smaller than a block.'
+        temp = self.temp.reshape(2, 350, 501)
+        self.check_same(heat_index, temp, self.other.reshape(2, 350, 501))
+        self.check_same(dewpoint, self.temp.reshape(1, -1) / 4, 0.5)
+
+    def test_out(self):
+        'Test writing the blocks into an output array.'
+        out = np.empty(self.temp.shape, dtype=np.float32)
+        hi = heat_index(self.temp, self.other, mask_undefined=False, out=out,
+            workers=2)
+        assert hi is out
+        assert_array_almost_equal(out, heat_index(self.temp, self.other,
+            mask_undefined=False), 2)
+
 #class TestIrrad(TestCase):
 #    def test_basic(self):
 #        'Test the basic solar irradiance calculation.'
@@ -180,6 +314,40 @@ class TestGradients(TestCase):
         assert_array_equal(c, true_c)
         assert_array_equal(v, true_v)
 
+    def test_batch(self):
+        'Test calculating over leading (time, level) dimensions.'
+        u = np.random.randn(2, 3, 4, 5)
+        v = np.random.randn(2, 3, 4, 5)
+        c,v4 = convergence_vorticity(u, v, 2., 3., axes=(-2, -1))
+        for t in range(2):
+            for lev in range(3):
+                c2,v2 = convergence_vorticity(u[t, lev], v[t, lev], 2., 3.)
+                assert_array_almost_equal(c[t, lev], c2, 12)
+                assert_array_almost_equal(v4[t, lev], v2, 12)
+        assert_array_almost_equal(v_vorticity(u.T, v.T, 2., 3., axes=(1, 0)),
+            v4.T, 12)
+
+    def test_default_axes(self):
+        'Test that x and y default to the first two dimensions.'
+        u = np.random.randn(4, 5, 3)
+        v = np.random.randn(4, 5, 3)
+        c, vort = convergence_vorticity(u, v, 2., 3.)
+        for lev in range(3):
+            c2, v2 = convergence_vorticity(u[..., lev], v[..., lev], 2., 3.)
+            assert_array_almost_equal(c[..., lev], c2, 12)
+            assert_array_almost_equal(vort[..., lev], v2, 12)
+
+    def test_nonuniform(self):
+        'Test giving coordinates instead of a constant spacing.'
+        x = np.array([0., 1., 3., 4., 7.])
+        y = np.array([0., 2., 3.])
+        u = (x**2)[:, np.newaxis] * np.ones_like(y)
+        v = np.ones_like(x)[:, np.newaxis] * y**2
+        c = h_convergence(u, v, x, y)
+        true_c = 2 * x[:, np.newaxis] + 2 * y
+        assert_array_almost_equal(c[1:-1, 1:-1], true_c[1:-1, 1:-1], 12)
+        assert_array_almost_equal(c[0], [3, 5, 6], 12)
+
 class TestAdvection(TestCase):
     def test_basic(self):
         'Basic braindead test of advection'
@@ -234,5 +402,17 @@ class TestGeos(TestCase):
         assert_array_equal(ug, true_u)
         assert_array_equal(vg, true_v)
 
+    def test_axes(self):
+        'Test trailing and leading extra dimensions.'
+        z = np.array([[48, 49, 48], [49, 50, 49], [48, 49, 48]]) * 100.
+        true_u = np.array([[-1, 0, 1]]*3)
+        z3 = np.dstack([z, 2 * z])
+        ug, vg = geostrophic_wind(z3, g, 100., 100.)
+        assert_array_equal(ug[..., 1], 2 * true_u)
+        ug, vg = geostrophic_wind(np.rollaxis(z3, 2), g, 100., 100.,
+            axes=(-2, -1))
+        assert_array_equal(ug[1], 2 * true_u)
+        assert_array_equal(vg[0], -true_u.T)
+
 if __name__ == '__main__':
     run_module_suite()
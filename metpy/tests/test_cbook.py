@@ -0,0 +1,67 @@
+import os
+import time
+import shutil
+import tempfile
+from numpy.testing import *
+from metpy.cbook import DiskCache
+
+class TestDiskCache(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = DiskCache(os.path.join(self.dir, 'cache'), max_size=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_basic(self):
+        'Test storing and retrieving from the cache.'
+        assert self.cache.get('http://a') is None
+        self.cache.put('http://a', 'abc')
+        assert self.cache.get('http://a') == 'abc'
+        assert 'http://a' in self.cache
+        assert self.cache.hits == 1
+        assert self.cache.misses == 1
+
+    def test_max_age(self):
+        'Test that old entries are not returned when a max age is given.'
+        self.cache.put('http://a', 'abc')
+        path = self.cache._path('http://a')
+        old = time.time() - 3600
+        os.utime(path, (old, old))
+        assert self.cache.get('http://a', max_age=60) is None
+        assert self.cache.get('http://a') == 'abc'
+
+    def test_put_fails(self):
+        'Test that failing to store an entry leaves nothing behind.'
+        os.makedirs(self.cache._path('a'))
+        self.cache.put('a', 'abc')
+        assert self.cache.get('a') is None
+        assert os.listdir(self.cache.directory) == [
+            os.path.basename(self.cache._path('a'))]
+        # The directory can't be created inside of a file
+        open(os.path.join(self.dir, 'file'), 'w').close()
+        self.cache.directory = os.path.join(self.dir, 'file', 'cache')
+        self.cache.put('b', 'abc')
+        assert 'b' not in self.cache
+
+    def test_evict(self):
+        'Test that the least recently used entries are evicted first.'
+        self.cache.put('a', 'x' * 40)
+        self.cache.put('b', 'x' * 40)
+        old = time.time() - 3600
+        os.utime(self.cache._path('a'), (old - 10, old))
+        os.utime(self.cache._path('b'), (old - 20, old))
+        self.cache.get('a')
+        self.cache.put('c', 'x' * 40)
+        assert 'a' in self.cache
+        assert 'b' not in self.cache
+        assert 'c' in self.cache
+        assert self.cache.size() <= 100
+
+    def test_clear(self):
+        self.cache.put('a', 'abc')
+        self.cache.clear()
+        assert self.cache.size() == 0
+
+if __name__ == '__main__':
+    run_module_suite()
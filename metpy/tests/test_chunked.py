@@ -0,0 +1,61 @@
+import os
+import tempfile
+from numpy.testing import *
+import numpy as np
+from metpy.calc import v_vorticity, advection, geostrophic_wind, dewpoint
+from metpy.tools.chunked import apply_chunked
+
+class TestApplyChunked(TestCase):
+    def setUp(self):
+        self.u = np.random.randn(11, 7)
+        self.v = np.random.randn(11, 7)
+
+    def test_derivative(self):
+        'Test that the tiles match the full calculation exactly.'
+        truth = v_vorticity(self.u, self.v, 2., 3.)
+        for chunksize in (1, 3, 20):
+            for axis in (0, 1):
+                vort = apply_chunked(v_vorticity, (self.u, self.v, 2., 3.),
+                    axis=axis, chunksize=chunksize)
+                assert_array_equal(vort, truth)
+
+    def test_coords(self):
+        'Test slicing coordinates along with the tiles.'
+        x = np.cumsum(np.random.rand(11) + .5)
+        truth = v_vorticity(self.u, self.v, x, 3.)
+        vort = apply_chunked(v_vorticity, (self.u, self.v, x, 3.),
+            chunksize=4, coords=(2,))
+        assert_array_equal(vort, truth)
+
+    def test_lists(self):
+        'Test arrays inside lists and keyword arguments.'
+        s = np.random.randn(11, 7)
+        truth = advection(s, [self.u, self.v], (2., 3.))
+        adv = apply_chunked(advection, (s,), dict(wind=[self.u, self.v],
+            deltas=(2., 3.)), chunksize=2)
+        assert_array_equal(adv, truth)
+
+    def test_memmap(self):
+        'Test writing multiple results to memory-mapped files.'
+        (fd, fname) = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            vg = np.memmap(fname, dtype=np.float64, mode='w+', shape=(11, 7))
+            truth = geostrophic_wind(self.u, 1e-4, 2., 3.)
+            ug, vg = apply_chunked(geostrophic_wind, (self.u, 1e-4, 2., 3.),
+                out=(None, vg), chunksize=3)
+            assert isinstance(vg, np.memmap)
+            assert_array_equal(ug, truth[0])
+            assert_array_equal(vg, truth[1])
+            del vg
+        finally:
+            os.remove(fname)
+
+    def test_masked(self):
+        'Test that masked values are stored as NaN.'
+        rh = np.linspace(-.5, 1, 77).reshape(11, 7)
+        td = apply_chunked(dewpoint, (20., rh), halo=0, chunksize=5)
+        assert_array_equal(np.isnan(td), rh <= 0)
+
+if __name__ == '__main__':
+    run_module_suite()
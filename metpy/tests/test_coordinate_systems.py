@@ -0,0 +1,185 @@
+import shutil
+import tempfile
+from numpy.testing import *
+import numpy as np
+from metpy.coordinate_systems import (GeographicSystem, MapProjection,
+    RadarCoordinateSystem, TangentPlaneCartesianSystem, GateGeometryCache,
+    geodetic_to_ecef, ecef_to_geodetic)
+
+class TestGeodetic(TestCase):
+    def setUp(self):
+        self.lon, self.lat, self.alt = np.meshgrid(np.linspace(-180, 180, 25),
+            np.linspace(-90, 90, 13), [-500., 0., 1e4, 1e5], indexing='ij')
+        self.ecef = GeographicSystem().toECEF(self.lon, self.lat, self.alt)
+
+    def test_proj(self):
+        'Test that the numpy conversions match proj on a grid.'
+        x, y, z = geodetic_to_ecef(self.lon, self.lat, self.alt)
+        assert x.shape == (25, 13, 4)
+        assert_allclose((x, y, z), self.ecef, rtol=0, atol=1e-6)
+        lon, lat, alt = ecef_to_geodetic(*self.ecef)
+        # Longitude is arbitrary at the poles
+        poles = np.abs(self.lat) == 90
+        assert_allclose(np.cos(np.radians(lon - self.lon))[~poles], 1.)
+        assert_allclose(lat, self.lat, rtol=0, atol=1e-8)
+        assert_allclose(alt, self.alt, rtol=0, atol=1e-6)
+
+    def test_in_place(self):
+        'Test converting in place and in single precision.'
+        data = [self.lon.copy(), self.lat.copy(), self.alt.copy()]
+        out = geodetic_to_ecef(*data, out=data)
+        assert out[0] is data[0]
+        assert_allclose(data, self.ecef, rtol=0, atol=1e-6)
+        ecef_to_geodetic(*data, out=data)
+        assert_allclose(data[2], self.alt, rtol=0, atol=1e-6)
+        x, y, z = geodetic_to_ecef(self.lon, self.lat, self.alt,
+            dtype=np.float32)
+        assert x.dtype == np.float32
+        assert_allclose((x, y, z), self.ecef, rtol=0, atol=2.)
+
+    def test_backend(self):
+        'Test choosing the numpy backend for the coordinate systems.'
+        geo = GeographicSystem(backend='numpy')
+        assert_allclose(geo.toECEF(self.lon, self.lat, self.alt), self.ecef,
+            rtol=0, atol=1e-6)
+        x, y, z = np.random.uniform(-3e5, 3e5, (3, 10))
+        proj = MapProjection('lcc', 35., -97., lat_1=30, lat_2=60, lon_0=-97)
+        numpy = MapProjection('lcc', 35., -97., lat_1=30, lat_2=60, lon_0=-97,
+            backend='numpy')
+        assert_allclose(numpy.toECEF(x.copy(), y.copy(), z.copy()),
+            proj.toECEF(x.copy(), y.copy(), z.copy()), rtol=0, atol=1e-6)
+        assert_raises(ValueError, GeographicSystem, backend='pyproj')
+
+class TestRadarCoordinateSystem(TestCase):
+    def setUp(self):
+        self.radar = RadarCoordinateSystem(35.2, -97.4, 370.)
+        self.r = np.arange(1, 6) * 250.
+        self.az = np.array([0.5, 90.5, 180.5, 270.5])
+        self.el = np.array([0.5, 1.5, 2.4])
+
+    def test_broadcast(self):
+        'Test a volume of gates given as broadcasting arrays.'
+        x, y, z = self.radar.toECEF(self.r, self.az[:, np.newaxis],
+            self.el[:, np.newaxis, np.newaxis])
+        assert x.shape == (3, 4, 5)
+        r, az, el = np.broadcast_arrays(self.r, self.az[:, np.newaxis],
+            self.el[:, np.newaxis, np.newaxis])
+        flat = self.radar.toECEF(r.ravel(), az.ravel(), el.ravel())
+        assert_array_equal(x.ravel(), flat[0])
+        assert_array_equal(z.ravel(), flat[2])
+
+    def test_round_trip(self):
+        'Test converting a volume to ECEF and back.'
+        r, az, el = np.broadcast_arrays(self.r, self.az[:, np.newaxis],
+            self.el[:, np.newaxis, np.newaxis])
+        r2, az2, el2 = self.radar.fromECEF(*self.radar.toECEF(r, az, el))
+        assert r2.shape == (3, 4, 5)
+        assert_allclose(r2, r, rtol=1e-6)
+        assert_allclose(az2, az, atol=1e-8)
+        # Tiny height errors give noticeable elevation errors close to the radar
+        assert_allclose(el2, el, atol=5e-3)
+
+    def test_scalar(self):
+        'Test converting a single gate.'
+        r, az, el = self.radar.fromECEF(*self.radar.toECEF(1000., 45., 1.))
+        assert_allclose((r, az, el), (1000., 45., 1.), rtol=1e-3)
+        r, az, el = self.radar.fromECEF(*self.radar.toECEF(1000., 300., 1.))
+        assert not isinstance(az, np.ndarray)
+        assert_allclose(az, 300.)
+
+class TestTangentPlaneCartesianSystem(TestCase):
+    def setUp(self):
+        self.tangent = TangentPlaneCartesianSystem(35.2, -97.4, 370.)
+        self.ecef = np.array(GeographicSystem().toECEF([-97.4, -97.3, -97.4],
+            [35.3, 35.2, 35.2], [370., 370., 1370.]))
+
+    def test_directions(self):
+        'Test that local x, y, and z point east, north, and up.'
+        x, y, z = self.tangent.toLocal(self.ecef)
+        assert y[0] > 11000 and abs(x[0]) < 1
+        assert x[1] > 9000 and abs(y[1]) < 10
+        assert_almost_equal(z[2], 1000., 6)
+
+    def test_inverse(self):
+        'Test converting to the local system and back.'
+        local = self.tangent.toLocal(self.ecef)
+        assert_allclose(self.tangent.fromLocal(local), self.ecef, rtol=1e-12)
+        x, y, z = self.tangent.fromECEF(*self.ecef)
+        assert_array_almost_equal((x, y, z), local)
+        assert_allclose(self.tangent.toECEF(x, y, z), self.ecef, rtol=1e-12)
+
+    def test_single(self):
+        'Test that a single 3x1 vector gives a result of shape (3,).'
+        local = self.tangent.toLocal(self.ecef[:, 2:])
+        assert local.shape == (3,)
+        assert_almost_equal(local[2], 1000., 6)
+
+    def test_chain(self):
+        'Test converting radar gates to the local system.'
+        radar = RadarCoordinateSystem(35.2, -97.4, 370.)
+        x, y, z = self.tangent.fromECEF(*radar.toECEF(np.arange(1, 5) * 1e3,
+            np.array([[0.], [90.]]), 0.5))
+        assert x.shape == (2, 4)
+        assert_array_almost_equal(y[0], [1e3, 2e3, 3e3, 4e3], 0)
+        assert_array_almost_equal(x[1], [1e3, 2e3, 3e3, 4e3], 0)
+
+class TestGateGeometryCache(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.radar = RadarCoordinateSystem(35.2, -97.4, 370.)
+        self.r = np.arange(1, 6) * 250.
+        self.az = np.array([0.5, 90.5, 180.5, 270.5])
+        self.el = np.array([0.5, 1.5, 2.4])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_memory(self):
+        'Test that the locations are only calculated once.'
+        cache = GateGeometryCache()
+        x, y, z = cache.get(self.radar, self.r, self.az, self.el)
+        assert x.shape == (3, 4, 5)
+        truth = self.radar.toECEF(self.r, self.az[:, np.newaxis],
+            self.el[:, np.newaxis, np.newaxis])
+        assert_array_equal((x, y, z), truth)
+        assert_raises(ValueError, x.__setitem__, 0, 0.)
+        cache.get(self.radar, self.r, self.az, self.el)
+        cache.get(self.radar, self.r, self.az, self.el + 1)
+        assert cache.hits == 1 and cache.misses == 2
+
+    def test_disk(self):
+        'Test reading the locations saved by another cache.'
+        tangent = TangentPlaneCartesianSystem(35.2, -97.4, 370.)
+        truth = GateGeometryCache(self.dir).get(self.radar, self.r, self.az,
+            self.el, tangent)
+        cache = GateGeometryCache(self.dir)
+        x, y, z = cache.get(self.radar, self.r, self.az, self.el, tangent)
+        assert cache.hits == 1
+        assert isinstance(x, np.memmap)
+        assert_array_equal((x, y, z), truth)
+
+    def test_single_precision(self):
+        'Test that single precision locations are rounded only at the end.'
+        tangent = TangentPlaneCartesianSystem(35.2, -97.4, 370.)
+        truth = GateGeometryCache().get(self.radar, self.r, self.az, self.el,
+            tangent)
+        x, y, z = GateGeometryCache(dtype='float32').get(self.radar, self.r,
+            self.az, self.el, tangent)
+        assert x.dtype == np.float32
+        assert_array_equal((x, y, z), np.asarray(truth, dtype=np.float32))
+
+    def test_systems(self):
+        'Test that each coordinate system and site gets its own locations.'
+        cache = GateGeometryCache()
+        lon, lat, alt = cache.get(self.radar, self.r, self.az, self.el,
+            GeographicSystem())
+        assert_array_almost_equal(alt[:, 0, 0],
+            self.radar.getGroundRangeHeight(250., self.el)[1])
+        other = RadarCoordinateSystem(36., -97.4, 370.)
+        lon2, lat2, alt2 = cache.get(other, self.r, self.az, self.el,
+            GeographicSystem())
+        assert (lat2 > lat).all()
+        assert cache.misses == 2
+
+if __name__ == '__main__':
+    run_module_suite()
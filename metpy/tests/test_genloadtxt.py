@@ -0,0 +1,215 @@
+import os
+import tempfile
+from StringIO import StringIO
+from numpy.testing import *
+import numpy as np
+from numpy import ma
+from metpy.genloadtxt import (genloadtxt, iterloadtxt, parallel_loadtxt,
+    _genloadtxt_setup, _fast_eligible, _fast_columns, _finish_output)
+
+text = '''a b c
+1 x 2.5
+2 yy 3
+3 zzz -
+4 w 5
+'''
+
+class TestChunked(TestCase):
+    def check_same(self, text, **kwargs):
+        (ref, refmask) = genloadtxt(StringIO(text), **kwargs)
+        for chunksize in (1, 2, 100):
+            (data, mask) = genloadtxt(StringIO(text), chunksize=chunksize,
+                **kwargs)
+            assert data.dtype == ref.dtype
+            assert data.shape == ref.shape
+            assert_array_equal(data.tolist(), ref.tolist())
+            if refmask is not None:
+                assert_array_equal(mask.tolist(), refmask.tolist())
+
+    def test_float(self):
+        'Test reading a plain float array in chunks.'
+        self.check_same('1,2,3\n4,5,6\n\n7,8,9\n', delimiter=',')
+        self.check_same('1,2,3\n4,5,6\n\n7,8,9\n', delimiter=',', unpack=True)
+
+    def test_guess_types(self):
+        'Test reading in chunks when the types are guessed.'
+        self.check_same(text, dtype=None, names=True, missing='-',
+            usemask=True)
+        self.check_same('1 2\n3 4.5\n5 6\n', dtype=None)
+
+    def test_upgrade(self):
+        'Test that earlier chunks are promoted when a type is upgraded.'
+        (data, mask) = genloadtxt(StringIO('1\n2\n3.5\n'), dtype=None,
+            chunksize=2)
+        assert data.dtype == np.float64
+        assert_array_equal(data, [1., 2., 3.5])
+
+    def test_upgrade_strings(self):
+        'Test that values are kept as written when upgraded to strings.'
+        self.check_same('1.50\n2\nabc\n', dtype=None)
+        self.check_same('1.50 1\n- 2\nabc -\n4 x\n', dtype=None,
+            missing='-', usemask=True)
+        (data, mask) = genloadtxt(StringIO('1.50\n2\nabc\n'), dtype=None,
+            chunksize=1)
+        assert_array_equal(data, ['1.50', '2', 'abc'])
+
+    def test_reread(self):
+        'Test that only upgraded columns are read again, not kept as strings.'
+        class CountingFile(StringIO):
+            lines = 0
+            def next(self):
+                line = StringIO.next(self)
+                self.lines += 1
+                return line
+
+        rows = ['%d %d\n' % (i, i) for i in range(10)]
+        fhd = CountingFile('a b\n' + ''.join(rows))
+        (data, mask) = genloadtxt(fhd, dtype=None, names=True, chunksize=3)
+        assert_equal(fhd.lines, 10)
+
+        rows[-1] = '9 x\n'
+        fhd = CountingFile('a b\n' + ''.join(rows))
+        (data, mask) = genloadtxt(fhd, dtype=None, names=True, chunksize=3)
+        assert_equal(fhd.lines, 20)
+        assert data.dtype['a'].kind == 'i'
+        assert_array_equal(data['b'], [str(i) for i in range(9)] + ['x'])
+
+    def test_nested(self):
+        'Test reading a nested dtype in chunks.'
+        self.check_same('1 2 3\n3 4.5 3\n',
+            dtype=[('a', int), ('b', [('c', np.float32), ('d', int)])],
+            usemask=True)
+
+    def test_iter(self):
+        'Test getting the rows a chunk at a time.'
+        chunks = list(iterloadtxt(StringIO(text), chunksize=3, dtype=None,
+            names=True, missing='-', usemask=True))
+        assert_array_equal([len(c) for c in chunks], [3, 1])
+        assert_array_equal(chunks[0]['a'], [1, 2, 3])
+        assert_array_equal(chunks[0]['c'].mask, [False, False, True])
+        assert_array_equal(chunks[1]['b'], ['w'])
+
+class TestInferRows(TestCase):
+    def test_sample(self):
+        'Test guessing the types from the first rows.'
+        (data, mask) = genloadtxt(StringIO(text), dtype=None, names=True,
+            missing='-', usemask=True, infer_rows=2)
+        (ref, refmask) = genloadtxt(StringIO(text), dtype=None, names=True,
+            missing='-', usemask=True)
+        assert data.dtype == ref.dtype
+        assert_array_equal(data.tolist(), ref.tolist())
+        assert_array_equal(mask.tolist(), refmask.tolist())
+
+    def test_fallback(self):
+        'Test that a column is upgraded if a later value needs it.'
+        (data, mask) = genloadtxt(StringIO('1 2\n3 4\n5.5 6\n'), dtype=None,
+            infer_rows=1, names='a,b')
+        assert data.dtype['a'] == np.float64
+        assert data.dtype['b'].kind == 'i'
+        assert_array_equal(data['a'], [1., 3., 5.5])
+
+    def test_fallback_chunked(self):
+        'Test upgrading a column in a later chunk.'
+        (data, mask) = genloadtxt(StringIO('1\n2\nx\n'), dtype=None,
+            infer_rows=1, chunksize=2)
+        assert_array_equal(data, ['1', '2', 'x'])
+
+class TestFastPath(TestCase):
+    def check_same(self, text, **kwargs):
+        (ref, refmask) = genloadtxt(StringIO(text), fastpath=False, **kwargs)
+        (data, mask) = genloadtxt(StringIO(text), **kwargs)
+        assert data.dtype == ref.dtype
+        assert data.shape == ref.shape
+        assert_array_equal(data.tolist(), ref.tolist())
+        if refmask is not None:
+            assert_array_equal(mask.tolist(), refmask.tolist())
+
+    def test_comments(self):
+        'Test numeric data with comments and blank lines.'
+        self.check_same('1 2 3\n4 5 6 # c\n# x\n\n7 8 9\n')
+        self.check_same('1,2,3\n4,5,6\n', delimiter=',', unpack=True)
+
+    def test_types(self):
+        'Test converting to the columns of a numeric dtype.'
+        self.check_same('1,2.5,3\n4,5,6\n', delimiter=',', usemask=True,
+            dtype=[('a', int), ('b', np.float32), ('c', float)])
+        self.check_same('1,2,3\n4,5,6\n', delimiter=',', dtype=int,
+            usecols=(0, 2))
+
+    def test_sentinel(self):
+        'Test masking numeric missing values.'
+        self.check_same('1,2,3\n4,-999,6\n', delimiter=',', usemask=True,
+            missing='-999')
+        self.check_same('1,-999.0,3\n4,-999,6\n', delimiter=',',
+            usemask=True, missing='-999')
+
+    def test_mixed_blocks(self):
+        'Test that fast and line by line blocks mask missing values the same.'
+        text = '1,-999\n2,-999.0\n' * 4 + '3,\n' + '4,-999.0\n5,-999\n' * 4
+        (ref, refmask) = genloadtxt(StringIO(text), delimiter=',',
+            missing='-999', usemask=True, fastpath=False)
+        (fhd, first_line, split_line, dtype, names, usecols, converters,
+         missing_values) = _genloadtxt_setup(StringIO(text), float, '#', ',',
+            0, None, '-999', None, None, None, None, None)
+        sentinels = _fast_eligible(dtype, missing_values)
+        (data, datamask) = _fast_columns(fhd, first_line, split_line, '#',
+            ',', dtype, usecols, converters, missing_values, sentinels, True,
+            True, blocksize=16)
+        (data, mask) = _finish_output(data, datamask, dtype, names, set(),
+            True, False)
+        assert_array_equal(data.tolist(), ref.tolist())
+        assert_array_equal(mask.tolist(), refmask.tolist())
+
+    def test_fallback(self):
+        'Test data that has to be read line by line.'
+        self.check_same('1,2,3\n4,,6\n7,8,9\n', delimiter=',', usemask=True)
+        self.check_same('1,2,3,\n4,5,6,\n', delimiter=',')
+        self.check_same('1 2 nan\n', dtype=int)
+
+    def test_ragged(self):
+        'Test that rows with different numbers of fields are not reshaped.'
+        for text in ('1 2 3\n4 5 6 7\n8 9\n', '1,2,3\n4,5,6,7\n8,9\n'):
+            delimiter = ',' if ',' in text else None
+            assert_raises(ValueError, genloadtxt, StringIO(text),
+                delimiter=delimiter, fastpath=False)
+            assert_raises(ValueError, genloadtxt, StringIO(text),
+                delimiter=delimiter)
+
+class TestParallel(TestCase):
+    def setUp(self):
+        (fd, self.fname) = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def check_same(self, text, **kwargs):
+        open(self.fname, 'w').write(text)
+        (ref, refmask) = genloadtxt(self.fname, **kwargs)
+        for nchunks in (1, 3, 50):
+            data = parallel_loadtxt(self.fname, processes=2, nchunks=nchunks,
+                **kwargs)
+            assert data.dtype == ref.dtype
+            assert data.shape == ref.shape
+            assert_array_equal(np.asarray(data).tolist(), ref.tolist())
+            if refmask is not None:
+                assert_array_equal(ma.getmaskarray(data).tolist(),
+                    refmask.tolist())
+
+    def test_float(self):
+        'Test reading floats in parallel.'
+        rows = ['%d,%f\n' % (i, i * .5) for i in range(100)]
+        self.check_same('# comment\n' + ''.join(rows), delimiter=',')
+        self.check_same('skipped\n' + ''.join(rows), delimiter=',',
+            skiprows=1, usecols=(1,), dtype=int)
+
+    def test_guess_types(self):
+        'Test that the types guessed for each part of the file agree.'
+        rows = ['%d,%d,%d\n' % (i, i, i) for i in range(100)]
+        rows[70] = '70,7.5,x\n'
+        self.check_same('a,b,c\n' + ''.join(rows), delimiter=',',
+            dtype=None, names=True, usemask=True, missing='x')
+        self.check_same(''.join(rows), delimiter=',', dtype=None)
+
+if __name__ == '__main__':
+    run_module_suite()
@@ -0,0 +1,89 @@
+from numpy.testing import *
+import numpy as np
+from metpy.calc import vapor_pressure
+from metpy.parcel import lcl, parcel_profile, cape_cin
+from metpy.vis.skewt import calc_moist_adiabat
+
+class TestLCL(TestCase):
+    def test_saturation(self):
+        'Test that the mixing ratio at the LCL matches the surface.'
+        temp = np.array([[30., 20.], [10., 0.]])
+        dewpt = temp - np.array([[15., 5.], [1., 10.]])
+        p_lcl, T_lcl = lcl(1000., temp, dewpt)
+        assert p_lcl.shape == (2, 2)
+        e = vapor_pressure(dewpt)
+        es = vapor_pressure(T_lcl)
+        assert_allclose(e / (1000. - e), es / (p_lcl - es), rtol=2e-3)
+
+    def test_saturated(self):
+        'Test that a saturated parcel has its LCL at the start.'
+        p_lcl, T_lcl = lcl(900., 10., 10.)
+        assert_almost_equal(p_lcl, 900., 1)
+        assert_almost_equal(T_lcl, 10., 1)
+
+class TestParcelProfile(TestCase):
+    def test_moist(self):
+        'Test that the parcel follows the moist adiabat above the LCL.'
+        p = np.linspace(1000, 200, 33)
+        parcel = parcel_profile(p, 10., 10., substeps=1)
+        assert_array_almost_equal(parcel, calc_moist_adiabat(10., p))
+
+    def test_dry(self):
+        'Test that the parcel follows the dry adiabat below the LCL.'
+        p = np.array([1000., 950., 900.])
+        parcel = parcel_profile(p, 30., -20.)
+        assert_array_almost_equal(parcel,
+            303.15 * (p / 1000.)**(287. / 1004.) - 273.15)
+
+    def test_batch(self):
+        'Test that stacks of soundings match lifting each one.'
+        p = np.array([[1000., 900., 800., 600., 400.],
+            [950., 850., 700., 500., 300.]])
+        temp = np.array([25., 15.])
+        dewpt = np.array([20., 5.])
+        parcel = parcel_profile(p, temp, dewpt)
+        assert parcel.shape == (2, 5)
+        for i in range(2):
+            assert_array_equal(parcel[i], parcel_profile(p[i], temp[i],
+                dewpt[i]))
+
+class TestCapeCin(TestCase):
+    def setUp(self):
+        self.p = np.linspace(1000, 100, 37)
+        self.dewpt = np.linspace(18., -60., 37)
+        self.parcel = parcel_profile(self.p, 25., 18.)
+
+    def test_stable(self):
+        'Test that an environment warmer than the parcel has no CAPE or CIN.'
+        env = self.parcel + 1.
+        env[0] = self.parcel[0]
+        cape, cin = cape_cin(self.p, env, self.dewpt)
+        assert cape == 0 and cin == 0
+
+    def test_areas(self):
+        'Test CAPE and CIN for an environment with a known buoyancy.'
+        # The parcel starts at the environmental temperature, and is 1 K
+        # cooler than the environment above that, up to 800 mb, and 2 K
+        # warmer from there up
+        env = np.where(self.p > 800., self.parcel + 1., self.parcel - 2.)
+        env[0] = self.parcel[0]
+        cape, cin = cape_cin(self.p, env, self.dewpt)
+        # The crossing is a third of the way through the layer from 825 mb
+        dlnp = np.log(825. / 800.)
+        assert_almost_equal(cape, 287. * (2. * np.log(800. / 100.)
+            + dlnp * 2. / 3.), 6)
+        assert_almost_equal(cin, -287. * (np.log(1000. / 825.)
+            - 0.5 * np.log(1000. / 975.) + dlnp / 6.), 6)
+
+    def test_batch(self):
+        'Test that stacks of soundings match doing each one.'
+        env = self.parcel - np.random.uniform(-3, 3, (4, 37))
+        dewpt = np.array([18., 10., 15., 20.])[:, np.newaxis] * np.ones(37)
+        cape, cin = cape_cin(self.p, env, dewpt)
+        assert cape.shape == (4,)
+        for i in range(4):
+            assert_array_equal((cape[i], cin[i]), cape_cin(self.p, env[i],
+                dewpt[i]))
+
+if __name__ == '__main__':
+    run_module_suite()
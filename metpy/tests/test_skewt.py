@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+from numpy.testing import *
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from metpy.vis.skewt import (calc_moist_adiabat, plot_skewt,
+    plot_skewt_batch, _background_lines)
+
+class TestMoistAdiabat(TestCase):
+    def test_vectorized(self):
+        'Test that stepping adiabats together matches doing them singly.'
+        P = np.linspace(1000, 100, 20)
+        Tref = np.array([[-20., 0.], [15., 30.]])
+        T = calc_moist_adiabat(Tref, P)
+        assert T.shape == (2, 2, 20)
+        for ind in np.ndindex(Tref.shape):
+            assert_array_almost_equal(T[ind], calc_moist_adiabat(Tref[ind], P),
+                12)
+
+    def test_basic(self):
+        'Test that the adiabat cools at a moist lapse rate.'
+        T = calc_moist_adiabat(20., np.linspace(1000, 100, 5))
+        assert T.shape == (5,)
+        assert_almost_equal(T[0], 20.)
+        assert (np.diff(T) < 0).all()
+        # Warmer than a dry adiabat
+        assert T[1] > (20. + 273.15) * (775. / 1000)**(287. / 1004) - 273.15
+
+    def test_adaptive(self):
+        'Test the adaptive integration against many midpoint steps.'
+        P = np.linspace(1000, 100, 901)
+        truth = calc_moist_adiabat(np.array([-20., 0., 25.]), P)[:, ::100]
+        T = calc_moist_adiabat(np.array([-20., 0., 25.]), P[::100], tol=1e-4)
+        assert_array_almost_equal(T, truth, 2)
+        assert_array_almost_equal(T[:, 0], [-20., 0., 25.], 12)
+
+    def test_adaptive_shape(self):
+        'Test the adaptive integration with scalar and increasing input.'
+        P = np.linspace(100, 1000, 4)
+        T = calc_moist_adiabat(20., P, tol=1e-3)
+        assert T.shape == (4,)
+        assert_array_almost_equal(T, calc_moist_adiabat(20., P[::-1],
+            tol=1e-3), 12)
+
+    def test_single_level(self):
+        'Test that a single level gives back the starting temperatures.'
+        P = np.array([850.])
+        for tol in (None, 1e-3):
+            T = calc_moist_adiabat(np.array([5., 20.]), P, tol=tol)
+            assert T.shape == (2, 1)
+            assert_array_equal(T[:, 0], [5., 20.])
+
+class TestPlotSkewT(TestCase):
+    def setUp(self):
+        self.p = np.linspace(1000, 100, 10)
+        self.T = 20 - (1000 - self.p) * .08
+        self.fig = Figure(figsize=(4, 4))
+        FigureCanvasAgg(self.fig)
+
+    def test_cache(self):
+        'Test that the background lines are reused.'
+        misses = _background_lines.misses
+        plot_skewt(self.p, None, self.T, self.T - 5, fig=self.fig)
+        self.fig.clf()
+        fig, ax = plot_skewt(self.p, None, self.T, self.T - 5, fig=self.fig)
+        assert _background_lines.misses <= misses + 1
+        assert len(ax.collections) == 3
+
+    def test_blit(self):
+        'Test that blitting only updates the traces.'
+        ax = self.fig.add_subplot(111, projection='skewx')
+        plot_skewt(self.p, None, self.T, self.T - 5, fig=self.fig, ax=ax,
+            blit=True)
+        fig, ax = plot_skewt(self.p, None, self.T + 3, self.T - 2,
+            fig=self.fig, ax=ax, blit=True)
+        assert len(ax.lines) == 2
+        assert len(ax.collections) == 3
+        assert_array_equal(ax.lines[0].get_xdata(), self.T + 3)
+
+    def test_blit_axes_only(self):
+        'Test blitting when only the axes are given.'
+        ax = self.fig.add_subplot(111, projection='skewx')
+        plot_skewt(self.p, None, self.T, self.T - 5, ax=ax, blit=True)
+        fig, ax = plot_skewt(self.p, None, self.T + 3, self.T - 2, ax=ax,
+            blit=True)
+        assert fig is self.fig
+        assert len(ax.lines) == 2
+        assert_array_equal(ax.lines[0].get_xdata(), self.T + 3)
+
+class TestPlotSkewTBatch(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        p = np.linspace(1000, 100, 10)
+        self.profiles = [(p, 20 - (1000 - p) * .08 + i, 10 - (1000 - p) * .08)
+            for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check_images(self, times):
+        assert times.shape == (3,)
+        fnames = sorted(os.listdir(self.dir))
+        assert fnames == ['skewt_0.png', 'skewt_1.png', 'skewt_2.png']
+        first = open(os.path.join(self.dir, fnames[0]), 'rb').read()
+        assert first.startswith('\x89PNG')
+        assert first != open(os.path.join(self.dir, fnames[1]), 'rb').read()
+
+    def test_serial(self):
+        'Test plotting a batch of soundings in this process.'
+        times = plot_skewt_batch(self.profiles,
+            os.path.join(self.dir, 'skewt_%d.png'), processes=1, dpi=40)
+        self.check_images(times)
+
+    def test_parallel(self):
+        'Test plotting a batch of soundings in other processes.'
+        fnames = [os.path.join(self.dir, 'skewt_%d.png' % i) for i in range(3)]
+        times = plot_skewt_batch(iter(self.profiles), fnames, processes=2,
+            dpi=40, chunksize=1)
+        self.check_images(times)
+
+if __name__ == '__main__':
+    run_module_suite()
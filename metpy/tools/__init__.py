@@ -3,6 +3,7 @@ from stats import *
 from wavelets import *
 from solar import *
 from oban import *
+from chunked import *
 
 __all__ = []
 __all__.extend(eigana.__all__)
@@ -10,3 +11,4 @@ __all__.extend(stats.__all__)
 __all__.extend(wavelets.__all__)
 __all__.extend(solar.__all__)
 __all__.extend(oban.__all__)
+__all__.extend(chunked.__all__)
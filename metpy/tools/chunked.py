@@ -0,0 +1,175 @@
+'''
+Tools for running calculations over arrays that are too large to fit in
+memory, such as memory-mapped files or netCDF variables, by splitting them
+into tiles along one dimension.
+'''
+import numpy as np
+
+__all__ = ['apply_chunked']
+
+def _is_array(obj):
+    'Helper for deciding whether *obj* is an array that can be sliced.'
+    return hasattr(obj, 'shape') and hasattr(obj, '__getitem__')
+
+def _find_shape(args, kwargs):
+    '''
+    Helper for getting the shape of the grid from the first array (with at
+    least one dimension) in the arguments, searching inside lists.
+    '''
+    for arg in list(args) + kwargs.values():
+        if isinstance(arg, (list, tuple)):
+            shape = _find_shape(arg, {})
+            if shape is not None:
+                return shape
+        elif _is_array(arg) and len(arg.shape) > 0:
+            return tuple(arg.shape)
+    return None
+
+def _take_tile(arg, shape, axis, start, stop, is_coord=False):
+    '''
+    Helper for slicing out a tile from *arg* if it is an array on the full
+    grid (or a 1-D coordinate array along *axis*).  Lists and tuples of
+    arrays (like the wind components for advection) are sliced item by item.
+    Anything else is passed through unchanged.
+    '''
+    if is_coord:
+        return np.asarray(arg[start:stop])
+    if isinstance(arg, (list, tuple)):
+        return type(arg)(_take_tile(a, shape, axis, start, stop) for a in arg)
+    if _is_array(arg) and tuple(arg.shape) == shape:
+        index = [slice(None)] * len(shape)
+        index[axis] = slice(start, stop)
+        return arg[tuple(index)]
+    return arg
+
+def _create_output(dest, shape, dtype):
+    '''
+    Helper for getting an array to write results into.  Strings are taken
+    as filenames for new memory-mapped arrays and None gives an array in
+    memory.
+    '''
+    if dest is None:
+        return np.empty(shape, dtype=dtype)
+    if isinstance(dest, basestring):
+        return np.memmap(dest, dtype=dtype, mode='w+', shape=shape)
+    if tuple(dest.shape) != shape:
+        raise ValueError('Output array has shape %s, expected %s'
+            % (dest.shape, shape))
+    return dest
+
+def apply_chunked(func, args=(), kwargs=None, out=None, axis=0,
+    chunksize=None, halo=1, coords=(), max_memory=2**26):
+    '''
+    Apply a calculation, like those in :mod:`metpy.calc`, to large arrays a
+    tile at a time, writing the results incrementally to the output.
+
+    The inputs are split into tiles along *axis*.  Each tile is extended by
+    *halo* points on either side, where available, so that finite
+    differences at the tile edges use the same neighboring points they
+    would for the whole array; the halo is then dropped from the result.
+    With the default halo of 1, the results of the derivative-based
+    functions (e.g. :func:`v_vorticity`, :func:`advection`, and
+    :func:`geostrophic_wind`) are exactly the same as if the calculation
+    was done on the whole array at once.  Element-wise functions (e.g.
+    :func:`dewpoint`) can use a halo of 0.
+
+    func : callable
+        The function to call for each tile.  It must return an array (or a
+        tuple of arrays) with the same shape as the inputs.
+
+    args : sequence
+        The positional arguments for *func*.  Any array (including
+        memory-mapped arrays and netCDF variables) with the shape of the
+        grid, including those in lists or tuples, is sliced into tiles.
+        The shape of the grid is taken from the first array.  Other
+        arguments are passed to each call unchanged.
+
+    kwargs : dictionary or None
+        The keyword arguments for *func*, treated the same as *args*.
+
+    out : array, string, None, or a tuple of these
+        The destination for the results.  This can be an existing array
+        (such as a :class:`numpy.memmap`) with the shape of the grid, a
+        filename, in which case a new memory-mapped array is created with
+        the data type of the results, or None, to create an array in
+        memory.  Functions that return a tuple need a tuple of outputs.
+
+    axis : integer
+        The dimension along which to split the arrays.  Defaults to 0.
+
+    chunksize : integer or None
+        The number of points along *axis* in each tile.  If None, this is
+        chosen so that each input tile uses about *max_memory* bytes.
+
+    halo : integer
+        The number of extra points to include on each side of a tile.
+        Defaults to 1, which is enough for the centered differences used by
+        :mod:`metpy.calc`.
+
+    coords : sequence
+        The positions (integers) or names (strings) of arguments that are
+        1-D coordinates along *axis*, for functions that accept coordinates
+        instead of constant grid spacing.  These are sliced to match each
+        tile.
+
+    max_memory : integer
+        The target size, in bytes, of a tile of each input when *chunksize*
+        is None.  Defaults to 64 MB.
+
+    Returns : array or tuple of arrays
+        The output array(s), filled with the results.  Masked values in the
+        results are stored as NaN (or the fill value, for integer types).
+    '''
+    if kwargs is None:
+        kwargs = dict()
+    args = list(args)
+    shape = _find_shape(args, kwargs)
+    if shape is None:
+        raise ValueError('No arrays found in the arguments.')
+    axis = axis % len(shape)
+    length = shape[axis]
+
+    if chunksize is None:
+        point_bytes = 8 * int(np.prod(shape)) // max(length, 1)
+        chunksize = max(1, max_memory // max(point_bytes, 1))
+
+    outputs = None
+    single = True
+    for start in range(0, length, chunksize):
+        stop = min(start + chunksize, length)
+        lo = max(start - halo, 0)
+        hi = min(stop + halo, length)
+
+        tile_args = [_take_tile(a, shape, axis, lo, hi, i in coords)
+            for i, a in enumerate(args)]
+        tile_kwargs = dict((k, _take_tile(v, shape, axis, lo, hi, k in coords))
+            for k, v in kwargs.iteritems())
+        results = func(*tile_args, **tile_kwargs)
+
+        if outputs is None:
+            single = not isinstance(results, tuple)
+            dests = [out] if single else out
+            if dests is None:
+                dests = [None] * len(results)
+            if len(dests) != (1 if single else len(results)):
+                raise ValueError('Need an output for each of the %d results'
+                    % len(results))
+            outputs = [_create_output(d, shape, np.asarray(r).dtype)
+                for d, r in zip(dests, [results] if single else results)]
+
+        # Strip the halo and write the tile out
+        index = [slice(None)] * len(shape)
+        index[axis] = slice(start - lo, stop - lo)
+        out_index = [slice(None)] * len(shape)
+        out_index[axis] = slice(start, stop)
+        for dest, res in zip(outputs, [results] if single else results):
+            res = res[tuple(index)]
+            if np.ma.isMaskedArray(res):
+                fill = np.nan if res.dtype.kind in 'fc' else res.fill_value
+                res = res.filled(fill)
+            dest[tuple(out_index)] = res
+            if hasattr(dest, 'flush'):
+                dest.flush()
+        del results, tile_args, tile_kwargs
+
+    return outputs[0] if single else tuple(outputs)
@@ -288,6 +288,8 @@ def grid_spherical_decomposed(x, y, z, data, x_i, y_i, z_i, horz_res, missing_va
         can be used in concert to convert from spherical data coordinates to map projections.
         Beware that the RadarCoordinateSystem assumes effectiveRadiusMultiplier=4./3. to
         correct for atmospheric refraction at microwave frequencies.
+        coordinate_systems.GateGeometryCache keeps the converted x, y, z for each site and
+        scan strategy, so they don't have to be recalculated for every volume.
         
     """
 
@@ -13,6 +13,18 @@ default_units = {'temperature':'C', 'dewpoint':'C', 'relative humidity':'%',
     'pressure':'mb', 'wind speed':'m/s', 'solar radiation':'$W/m^2$',
     'rainfall':'mm', 'wind gusts':'m/s'}
 
+def _to_datetimes(times):
+    # Convert an array of numpy datetime64 values, assumed to be in UTC, to
+    # timezone-aware datetime objects, which is what the date handling in
+    # matplotlib works with.  Anything else is returned unchanged.
+    times = np.asarray(times)
+    if times.dtype.kind != 'M':
+        return times
+    naive = times.astype('datetime64[us]').astype(object)
+    aware = np.empty(naive.shape, dtype=object)
+    aware[:] = [t.replace(tzinfo=UTC) for t in naive]
+    return aware
+
 def _rescale_yaxis(ax, bounds):
     # Manually tweak the limits here to ignore the low bottom set
     # for fill_between
@@ -32,7 +44,8 @@ def meteogram(data, fig=None, num_panels=3, time_range=None, layout=None,
 
     *data* : numpy record array
         A numpy record array containing time series for individual variables
-        in each field.
+        in each field.  The times are taken from the 'datetime' field, which
+        can hold datetime objects or numpy datetime64 values (in UTC).
 
     *fig* : :class:`matplotlib.figure.Figure` instance or None.
         A matplotlib Figure on which to draw.  If None, a new figure
@@ -85,7 +98,7 @@ def meteogram(data, fig=None, num_panels=3, time_range=None, layout=None,
         fig = plt.figure()
 
     # Get the time variable
-    time = data['datetime']
+    time = _to_datetimes(data['datetime'])
 
     # Process time_range.
     major_ticker = AutoDateLocator(tz=tz)
@@ -101,6 +114,8 @@ def meteogram(data, fig=None, num_panels=3, time_range=None, layout=None,
         end = time[-1]
         start = end - time_range
         time_range = (start, end)
+    else:
+        time_range = _to_datetimes(time_range)
 
     #List of variables in each panel.  None denotes that at that point, twinx
     #should be called and the remaining variables plotted on the other axis
@@ -27,7 +27,15 @@ import matplotlib.axis as maxis
 import matplotlib.artist as artist
 from matplotlib.projections import register_projection
 
+import inspect
 import numpy as np
+from metpy.cbook import lru_cache
+from metpy.parcel import moist_lapserate, moist_pseudo_lapserate, _moist_step
+
+# Newer matplotlib finds the tick label boxes for the axis label itself,
+# from the renderer
+_label_position_uses_renderer = (inspect.getargspec(
+    maxis.XAxis._update_label_position).args == ['self', 'renderer'])
 
 #TODO:
 #   *Panning and zooming are horribly broken, probably because the
@@ -102,7 +110,10 @@ class SkewXAxis(maxis.XAxis):
         # *copy* of the axis label box because we don't wan't to scale
         # the actual bbox
 
-        self._update_label_position(ticklabelBoxes, ticklabelBoxes2)
+        if _label_position_uses_renderer:
+            self._update_label_position(renderer)
+        else:
+            self._update_label_position(ticklabelBoxes, ticklabelBoxes2)
 
         self.label.draw(renderer)
 
@@ -208,125 +219,154 @@ class SkewXAxes(Axes):
 register_projection(SkewXAxes)
 
 
-def moist_lapserate(w, T):
-    # From AMS glossary,
-    # http://glossary.ametsoc.org/wiki/Moist-adiabatic_lapse_rate
-
-    # the constants are hardcoded to match consts in plot_skewt - 
-    # probably this ought to be refactored to group all atmo 
-    # related consts into one common location
-
-    # copied from Wallace & Hobbs 2nd edition, page 467,468
-    g = 9.81
-    Cp = 1004
-    Rd = 287.0
-    Rv = 461.51
-    epsilon = Rd/Rv
-    T0 = 273.15
-
-    # assumes T is in deg C; this is a linear interp/extrap from:
-    # Lv = 2.5e6 (O deg C) and 2.0e6 (100 deg C)
-    Lv_func = lambda T: 2.5e6 - 2500.0 * T
-    # alternate form (Glanz and Orlob 1973, 
-    # B. Henderson-Sellers 1984 QJRMS
-    #Lv_func = lambda T: 1.91846e6 * ((T+T0)/(T+T0-33.91))**2
-
-    TK = T + T0
-    Lv = Lv_func(T)
-    A = Lv * w / (Rd*TK)
-    return g * (1 + A) / (Cp + Lv * epsilon * A / TK)
-
-def moist_pseudo_lapserate(w, T):
-    # From AMS glossary,
-    # http://glossary.ametsoc.org/wiki/Pseudoadiabatic_lapse_rate
-
-    # the constants are hardcoded to match consts in plot_skewt - 
-    # probably this ought to be refactored to group all atmo 
-    # related consts into one common location
+def calc_moist_adiabat(Tref, P, tol=None, lapse_rate=moist_lapserate):
+    '''
+    Integrate moist adiabats upward through the pressure levels *P*.
+
+    Tref : scalar or array
+        The temperature(s), in degrees C, at the first level.  All of the
+        adiabats are stepped through the levels together, so computing many
+        of them costs a single loop over the levels.
+
+    P : 1 dimensional array
+        The pressure levels, in mb.  These are assumed to be monotonic and
+        are put in decreasing order if they are not already.
+
+    tol : scalar or None
+        If None (the default), each layer between the levels in *P* is a
+        single midpoint step, so the accuracy depends on how closely spaced
+        the levels are.  Otherwise, the adiabats are integrated with an
+        adaptive 5th order Runge-Kutta (Dormand-Prince) scheme, taking
+        steps as large as possible while keeping the estimated error of
+        each step below *tol* (degrees C), and the results are interpolated
+        to *P*.
+
+    lapse_rate : callable
+        The function giving the lapse rate from the mixing ratio and the
+        temperature, :func:`moist_lapserate` (the default) or
+        :func:`moist_pseudo_lapserate`.
+
+    Returns : array
+        The temperatures, with the shape of *Tref* plus a trailing
+        dimension for the levels.
+    '''
+    if tol is not None:
+        return _adaptive_moist_adiabat(Tref, P, tol, lapse_rate)
+
+    # Levels are the first dimension while integrating, so that each level
+    # is a contiguous array of all of the adiabats
+    Tref = np.asarray(Tref, dtype=np.float64)
+    T = np.zeros(P.shape + Tref.shape)
+    T[0] = Tref
+    # want "upward" P - e.g. P should be decreasing. Assume it is monotonic 
+    # and flip it if needed.
+    if len(P) > 1 and P[0]<P[1]:
+        uP = P[::-1]
+    else:
+        uP = P
 
-    # copied from Wallace & Hobbs 2nd edition, page 467,468
+    for n in range(1,P.shape[0]):
+        T[n] = _moist_step(T[n-1], uP[n-1], uP[n], lapse_rate)
+
+    return np.rollaxis(T, 0, T.ndim)
+
+# Dormand-Prince coefficients
+_dp_c = [0., 1./5, 3./10, 4./5, 8./9, 1., 1.]
+_dp_a = [[],
+    [1./5],
+    [3./40, 9./40],
+    [44./45, -56./15, 32./9],
+    [19372./6561, -25360./2187, 64448./6561, -212./729],
+    [9017./3168, -355./33, 46732./5247, 49./176, -5103./18656],
+    [35./384, 0., 500./1113, 125./192, -2187./6784, 11./84]]
+# Difference between the 5th and 4th order weights, for the error estimate
+_dp_e = [71./57600, 0., -71./16695, 71./1920, -17253./339200, 22./525,
+    -1./40]
+# Weights for the 4th order continuous extension (dense output)
+_dp_d = [-12715105075./11282082432, 0., 87487479700./32700410799,
+    -10690763975./1880347072, 701980252875./199316789632,
+    -1453857185./822651844, 69997945./29380423]
+
+def _adaptive_moist_adiabat(Tref, P, tol, lapse_rate):
+    '''
+    Helper for integrating moist adiabats with adaptive steps, used by
+    :func:`calc_moist_adiabat`.
+
+    With the layer thickness from the hydrostatic equation, the moist
+    adiabat is dT/dlnP = Gamma * Rd * Tv / g, which is integrated in lnP.
+    All of the adiabats take the same steps, sized for the one with the
+    largest error.  The output levels are interpolated within the steps
+    using the 4th order continuous extension of the method, which needs
+    no extra lapse rate evaluations.
+    '''
+    # Same constants as calc_moist_adiabat
     g = 9.81
-    Cp = 1004
-    Cv = 717
     Rd = 287.0
     Rv = 461.51
     epsilon = Rd/Rv
     T0 = 273.15
 
-    # assumes T is in deg C; this is a linear interp/extrap from:
-    # Lv = 2.5e6 (O deg C) and 2.0e6 (100 deg C)
-    Lv_func = lambda T: 2.5e6 - 2500.0 * T
-    # alternate form (Glanz and Orlob 1973, 
-    # B. Henderson-Sellers 1984 QJRMS)
-    #Lv_func = lambda T: 1.91846e6 * (T/(T-33.91))**2
-
-    TK = T + T0
-    Lv = Lv_func(T)
-    A = Lv * w / (Rd*TK)
-    return g * ( (1 + w) * (1 + A) / 
-                 (Cp + w*Cv + Lv * (epsilon + w) * A / TK) )
-
-
-def calc_moist_adiabat(Tref, P):
+    def deriv(lnP, T):
+        wv_sat = 6.112 * np.exp(17.67 * T / (243.5 + T))
+        w = epsilon * wv_sat / (np.exp(lnP) - wv_sat)
+        Tv = (T + T0) * (1 + ((1-epsilon)/epsilon) * w)
+        return lapse_rate(w, T) * Rd * Tv / g
 
-    # the constants are hardcoded to match consts in plot_skewt - 
-    # probably this ought to be refactored to group all atmo 
-    # related consts into one common location
-
-    # copied from Wallace & Hobbs 2nd edition, page 467,468
-    g = 9.81
-    Cp = 1004
-    Rd = 287.0
-    Rv = 461.51
-    epsilon = Rd/Rv
-    T0 = 273.15
-
-    T = np.zeros(P.shape)
-    T[0] = Tref
-    # want "upward" P - e.g. P should be decreasing. Assume it is monotonic 
-    # and flip it if needed.
+    Tref = np.asarray(Tref, dtype=np.float64)
+    # With a single level there is nothing to integrate, as for fixed steps
+    if len(P) == 1:
+        return Tref[..., np.newaxis].copy()
     if P[0]<P[1]:
         uP = P[::-1]
     else:
         uP = P
-    dP = uP[:-1] - uP[1:]
-
-    for n in range(1,P.shape[0]):
-        # First, find the thickness, in m, of the layer with pressure 
-        # thickess given by dP, but assuming the T and wv pressure from 
-        # the level at the bottom of the layer.
-
-        # using same approx as used below in plot_skewt() to plot the mixing 
-        # ratio lines (though I am unsure of the source)
-        # May want to modify to use the MK approximation.
-        wv_sat = 6.112 * np.exp(17.67 * T[n-1] / (243.5 + T[n-1]))
-        # wv_sat = wv_satpressure_mk(T[n-1])
-
-        # Following Wallace & Hobbs, page 80, 2nd ed.
-        # find mixing ratio from dewpoint and then virtual temp
-        w = epsilon * wv_sat / (uP[n-1] - wv_sat)
-        Tv = (T[n-1] + T0) * (1 + ((1-epsilon)/epsilon) * w)
-        rho = uP[n-1] / (Rd * Tv)
-        Dz = dP[n-1] / rho / g
-
-        # second, compute the lapse rate, and then combine with the 
-        # thickess to get the temperate at the level at the top of the layer.
-        Gamma = moist_lapserate(w, T[n-1])
-        T[n] = T[n-1] - Gamma * Dz
-
-        # Now that we have the temp at layer top, repeat calculation at midpt, 
-        # using the average layer temp (I think this is slightly more correct)
-        Tbar = 0.5*(T[n-1] + T[n])
-        Pbar = 0.5*(uP[n-1] + uP[n])
-        wv_sat = 6.112 * np.exp(17.67 * Tbar / (243.5 + Tbar))
-        w = epsilon * wv_sat / (Pbar - wv_sat)
-        Tv = (Tbar + T0) * (1 + ((1-epsilon)/epsilon) * w)
-        rho = Pbar / (Rd * Tv)
-        Dz = dP[n-1] / rho / g
-        Gamma = moist_lapserate(w, Tbar)
-        T[n] = T[n-1] - Gamma * Dz
-
-    return T
+    lnP = np.log(uP)
+    end = lnP[-1]
+
+    # Start of each accepted step, which are a decreasing sequence in lnP,
+    # along with the step size and the coefficients of the interpolating
+    # polynomial for the step
+    x = lnP[0]
+    y = Tref.copy()
+    f = deriv(x, y)
+    xs, hs, conts = [], [], []
+
+    # Start with a step that would be right for a 4th order method with a
+    # unit error constant, and a tenth of the layer as a limit
+    h = -min(0.1 * (lnP[0] - end), (tol / max(np.abs(f).max(), 1e-10))**0.2)
+    while x > end:
+        if x + h < end:
+            h = end - x
+        k = [f]
+        for i in range(1, 7):
+            yi = y + h * sum(a * ki for a, ki in zip(_dp_a[i], k) if a)
+            k.append(deriv(x + _dp_c[i] * h, yi))
+        # yi is the 5th order solution and k[6] the derivative there
+        err = np.abs(h * sum(e * ki for e, ki in zip(_dp_e, k) if e)).max()
+        if err <= tol:
+            dy = yi - y
+            cont3 = h * f - dy
+            cont4 = dy - h * k[6] - cont3
+            cont5 = h * sum(d * ki for d, ki in zip(_dp_d, k) if d)
+            xs.append(x)
+            hs.append(h)
+            conts.append((y, dy, cont3, cont4, cont5))
+            x, y, f = x + h, yi, k[6]
+        factor = 5. if err == 0 else min(5., max(0.2, 0.9 * (tol / err)**0.2))
+        h *= factor
+
+    # Interpolate to the requested levels.  The steps are decreasing, so
+    # search in -lnP.
+    inds = (np.searchsorted(-np.array(xs), -lnP, side='right') - 1).clip(0,
+        len(xs) - 1)
+    shape = (-1,) + (1,) * Tref.ndim
+    theta = ((lnP - np.array(xs)[inds]) / np.array(hs)[inds]).reshape(shape)
+    y0, cont2, cont3, cont4, cont5 = [np.array(c)[inds]
+        for c in zip(*conts)]
+    T = y0 + theta * (cont2 + (1 - theta) * (cont3 + theta * (cont4
+        + (1 - theta) * cont5)))
+
+    return np.rollaxis(T, 0, T.ndim)
 
 def wv_satpressure_mk(T):
     """ es = wv_satpressure_mk(T):
@@ -348,56 +388,40 @@ def wv_satpressure_mk(T):
     es = np.exp(log_es) / 100;
     return es
 
-def plot_skewt(p,h,T,Td, fig=None, ax=None, **kwargs):
-    import matplotlib.pyplot as plt
-
-    if fig is None:
-        fig = plt.figure(1, figsize=(6.5875, 6.2125))
-        fig.clf()
-    if ax is None:
-        ax = fig.add_subplot(111, projection='skewx')
-
-    plt.grid(True)
-
-#     print "T"
-#     print T
-#     print "Td"
-#     print Td
-#     print "p"
-#     print p
-
-    ax.semilogy(T, p, 'r')
-    ax.semilogy(Td, p, 'g')
-
-    ax.set_yticks(np.linspace(100,1000,10))
-    ax.yaxis.set_major_formatter(ScalarFormatter())
-    ax.set_xticks(np.arange(-80,45,10))
-    ax.set_xlim(-40,45)
-    ax.set_ylim(1050,50)
-
-    T0 = ax.get_xticks()
-
+@lru_cache(16)
+def _background_lines(T0, pbot, ptop, R, Cp):
+    '''
+    Helper for calculating the line data for the background of a skew-T:
+    the dry adiabats, moist adiabats and mixing ratio lines.  This only
+    depends on the temperature ticks *T0* (a tuple), the pressure range,
+    and the gas constant and specific heat, so the results are cached.
+
+    Returns : tuple
+        Lists of (N, 2) arrays of (T, p) points for the dry adiabats, moist
+        adiabats, and mixing ratio lines.  These are shared by all callers
+        and must not be modified.
+    '''
     # allowing P0 to be redefined causes headaches for the moist 
     # adiabats, so don't allow it.
     P0 = 1000.
-    R = kwargs.get('R', 287.05)
-    Cp = kwargs.get('Cp', 1004.)
 
     # easier if we start at 1000 and just add the 1050 (see discussion 
     # below with moist adiabats)
-    # Note this re-hardcodes the ylimit which is not so great.
-    P = np.r_[1050, np.linspace(1000, 50)]
+    P = np.r_[pbot, np.linspace(1000, ptop)]
     P = P.reshape(1, -1)
 
+    def make_lines(T):
+        lines = [np.vstack((t[np.newaxis,:], P)).T for t in T]
+        for line in lines:
+            line.setflags(write=False)
+        return lines
+
     # I think it makes more sense to plot starting from xticks and then 
     # extrapolate to a wider range with the same tick increment size
     DT = T0[1]-T0[0]
     adiabat_Ts = np.r_[T0, T0[-1] + np.arange(1,10)*DT]
     T = (adiabat_Ts[:,np.newaxis] + 273.15) * (P/P0)**(R/Cp) - 273.15
-    linedata = [np.vstack((t[np.newaxis,:], P)).T for t in T]
-    dry_adiabats = LineCollection(linedata, colors='r', linestyles='dashed',
-                                  alpha=0.5)
-    ax.add_collection(dry_adiabats)
+    dry = make_lines(T)
 
     # add moist adiabats
     # Now, we need T to be equal to the ticks (T0) at P=1000 
@@ -410,27 +434,214 @@ def plot_skewt(p,h,T,Td, fig=None, ax=None, **kwargs):
     # edge of the plot pretty quickly)
     adiabat_Ts = np.r_[T0, T0[-1] + np.arange(1,3)*DT]
     T = np.zeros( (adiabat_Ts.shape[0], P.shape[1]) )
-    for n in range(adiabat_Ts.shape[0]):
-        T[n,1:] = calc_moist_adiabat(adiabat_Ts[n], P[0,1:])
-        tmpT = calc_moist_adiabat(adiabat_Ts[n], P1000)
-        T[n,0] = T[n,1] + (tmpT[0]-tmpT[1]) * 50.0
-
-    linedata = [np.vstack((t[np.newaxis,:], P)).T for t in T]
-    moist_adiabats = LineCollection(linedata, colors='r', 
-                                    linestyles='dotted', alpha=0.5)
-    ax.add_collection(moist_adiabats)
+    T[:,1:] = calc_moist_adiabat(adiabat_Ts, P[0,1:])
+    tmpT = calc_moist_adiabat(adiabat_Ts, P1000)
+    T[:,0] = T[:,1] + (tmpT[:,0]-tmpT[:,1]) * (pbot - 1000.)
+    moist = make_lines(T)
 
     w = np.array([0.0004,0.001, 0.002, 0.004, 0.007, 0.01, 0.016, 0.024,
         0.032]).reshape(-1, 1)
     e = P * w / (0.622 + w)
     T = 243.5/(17.67/np.log(e/6.112) - 1)
-    linedata = [np.vstack((t[np.newaxis,:], P)).T for t in T]
-    mixing = LineCollection(linedata, colors='g', linestyles='dashed',
+    mixing = make_lines(T)
+
+    return dry, moist, mixing
+
+def plot_skewt(p,h,T,Td, fig=None, ax=None, blit=False, **kwargs):
+    '''
+    Plot a sounding on a skew-T log-p diagram, along with dry adiabats,
+    moist adiabats and mixing ratio lines.
+
+    p, h, T, Td : arrays
+        The pressure (mb), height, temperature and dewpoint (both C) of
+        the sounding.  The height is not currently used.
+
+    fig, ax : matplotlib Figure and SkewXAxes instances, optional
+        The figure and axes to plot on.  New ones are created if not given.
+
+    blit : boolean
+        If True, the first call draws the background (everything except the
+        temperature and dewpoint traces) once and saves it.  Later calls with
+        the same *ax* only restore the saved background and draw the new
+        traces on top, which is much faster for plotting many soundings.
+        Since the traces are then animated artists, they are only drawn on
+        the canvas (for Agg, its renderer buffer) and not by
+        :meth:`Figure.savefig`.  Defaults to False.
+
+    R, Cp : scalars, optional keyword arguments
+        The gas constant and specific heat used for the dry adiabats.
+
+    Returns : tuple
+        The figure and axes
+    '''
+    if fig is None and ax is not None:
+        fig = ax.figure
+
+    # With a saved background, only the traces need to be drawn
+    state = getattr(ax, '_skewt_blit', None)
+    if blit and state is not None:
+        key, background, t_line, td_line = state
+        t_line.set_data(T, p)
+        td_line.set_data(Td, p)
+        if key == _canvas_key(fig):
+            fig.canvas.restore_region(background)
+        else:
+            # The figure has changed size, so the background is redrawn
+            fig.canvas.draw()
+            background = fig.canvas.copy_from_bbox(fig.bbox)
+            ax._skewt_blit = (_canvas_key(fig), background, t_line, td_line)
+        ax.draw_artist(t_line)
+        ax.draw_artist(td_line)
+        fig.canvas.blit(ax.bbox)
+        return fig, ax
+
+    if fig is None:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(1, figsize=(6.5875, 6.2125))
+        fig.clf()
+    if ax is None:
+        ax = fig.add_subplot(111, projection='skewx')
+
+    ax.grid(True)
+
+    t_line, = ax.semilogy(T, p, 'r', animated=blit)
+    td_line, = ax.semilogy(Td, p, 'g', animated=blit)
+
+    ax.set_yticks(np.linspace(100,1000,10))
+    ax.yaxis.set_major_formatter(ScalarFormatter())
+    ax.set_xticks(np.arange(-80,45,10))
+    ax.set_xlim(-40,45)
+    ax.set_ylim(1050,50)
+
+    T0 = tuple(ax.get_xticks())
+    R = kwargs.get('R', 287.05)
+    Cp = kwargs.get('Cp', 1004.)
+    dry, moist, mixing = _background_lines(T0, 1050., 50., R, Cp)
+
+    dry_adiabats = LineCollection(dry, colors='r', linestyles='dashed',
+                                  alpha=0.5)
+    ax.add_collection(dry_adiabats)
+    moist_adiabats = LineCollection(moist, colors='r', 
+                                    linestyles='dotted', alpha=0.5)
+    ax.add_collection(moist_adiabats)
+    mixing = LineCollection(mixing, colors='g', linestyles='dashed',
         alpha=0.8)
     ax.add_collection(mixing)
-    
+
+    if blit:
+        fig.canvas.draw()
+        background = fig.canvas.copy_from_bbox(fig.bbox)
+        ax.draw_artist(t_line)
+        ax.draw_artist(td_line)
+        fig.canvas.blit(ax.bbox)
+        ax._skewt_blit = (_canvas_key(fig), background, t_line, td_line)
+
     return fig, ax
 
+def _canvas_key(fig):
+    '''
+    Helper for getting what a saved background depends on, so that it can
+    be redrawn if the figure is resized.
+    '''
+    return (fig.dpi, tuple(fig.get_size_inches()))
+
+# The figure and axes reused by each batch worker
+_batch_state = None
+
+def _batch_setup(figsize, dpi):
+    '''
+    Helper for creating the figure and axes that a worker process reuses for
+    all of its soundings.  This uses the Agg canvas directly, without
+    pyplot, so that nothing is kept around by the figure manager.
+    '''
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    global _batch_state
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='skewx')
+    _batch_state = (fig, ax)
+
+def _batch_render(task):
+    '''
+    Helper for drawing one sounding onto the worker's figure and writing it
+    out as a PNG.  Returns the time taken, in seconds.
+    '''
+    import time
+    from matplotlib.image import imsave
+    start = time.time()
+    p, T, Td, fname = task
+    fig, ax = _batch_state
+    plot_skewt(p, None, T, Td, fig=fig, ax=ax, blit=True)
+    # The traces are animated, so write out the blitted buffer instead of
+    # redrawing the whole figure with savefig
+    width, height = fig.canvas.get_width_height()
+    image = np.frombuffer(fig.canvas.buffer_rgba(), dtype=np.uint8)
+    imsave(fname, image.reshape(height, width, 4), dpi=fig.dpi)
+    return time.time() - start
+
+def plot_skewt_batch(profiles, fnames, processes=None, figsize=(6.5875,
+    6.2125), dpi=100, chunksize=16):
+    '''
+    Plot many soundings on skew-T diagrams and save each to a PNG file.
+
+    Each process creates one figure and set of axes, draws the background
+    once, and then only replaces the temperature and dewpoint traces for
+    each sounding (see the *blit* option of :func:`plot_skewt`), so memory
+    use stays the same no matter how many soundings are plotted.
+
+    profiles : iterable
+        Sequence of (p, T, Td) tuples of arrays giving the pressure (mb),
+        temperature and dewpoint (C) for each sounding.  This can be a
+        generator, in which case the soundings are read as needed.
+
+    fnames : sequence or string
+        The PNG file name for each sounding, or a format string (e.g.
+        'skewt_%04d.png') that is filled in with the index of the sounding.
+
+    processes : {None, int}
+        Number of processes to use.  Defaults to the number of CPUs.  With
+        1, the soundings are plotted in this process.
+
+    figsize : tuple
+        The size of the figure in inches.
+
+    dpi : scalar
+        The resolution of the images in dots per inch.  Defaults to 100.
+
+    chunksize : integer
+        The number of soundings sent to a process at a time.  Defaults to 16.
+
+    Returns : array
+        The time, in seconds, taken to draw and save each image.
+    '''
+    import itertools
+    import multiprocessing
+    if isinstance(fnames, basestring):
+        fnames = itertools.imap(fnames.__mod__, itertools.count())
+    tasks = (tuple(prof) + (fname,) for prof, fname in
+        itertools.izip(profiles, fnames))
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes <= 1:
+        global _batch_state
+        saved = _batch_state
+        try:
+            _batch_setup(figsize, dpi)
+            times = [_batch_render(task) for task in tasks]
+        finally:
+            _batch_state = saved
+        return np.array(times)
+
+    pool = multiprocessing.Pool(processes, _batch_setup, (figsize, dpi))
+    try:
+        times = list(pool.imap(_batch_render, tasks, chunksize))
+    finally:
+        pool.close()
+        pool.join()
+    return np.array(times)
+
 
 if __name__ == '__main__':
     # Now make a simple example using the custom projection.
@@ -0,0 +1,33 @@
+#!/usr/bin/python
+# Compare the chunked calculation on memory-mapped files to the usual
+# in-memory one
+
+import os
+import time
+import tempfile
+import numpy as np
+from metpy.calc import v_vorticity
+from metpy.tools.chunked import apply_chunked
+
+shape = (2000, 1000, 4)
+tmpdir = tempfile.mkdtemp()
+u = np.memmap(os.path.join(tmpdir, 'u.dat'), dtype=np.float32, mode='w+',
+    shape=shape)
+v = np.memmap(os.path.join(tmpdir, 'v.dat'), dtype=np.float32, mode='w+',
+    shape=shape)
+u[:] = np.random.randn(*shape)
+v[:] = np.random.randn(*shape)
+
+t = time.time()
+vort = apply_chunked(v_vorticity, (u, v, 1000., 1000.), kwargs=dict(
+    axes=(0, 1)), out=os.path.join(tmpdir, 'vort.dat'), chunksize=100)
+print 'chunked:', time.time() - t
+t = time.time()
+truth = v_vorticity(np.asarray(u), np.asarray(v), 1000., 1000., axes=(0, 1))
+print 'in memory:', time.time() - t
+print 'identical:', (vort == truth).all()
+
+del u, v, vort
+for fname in os.listdir(tmpdir):
+    os.remove(os.path.join(tmpdir, fname))
+os.rmdir(tmpdir)
@@ -0,0 +1,30 @@
+#!/usr/bin/python
+# Compare the line by line conversion in genloadtxt with the numeric fast path
+
+import os
+import timeit
+import tempfile
+import numpy as np
+from numpy.testing import assert_equal
+from metpy.genloadtxt import loadtxt
+
+(tmp_fd, tmp_fl) = tempfile.mkstemp()
+data = np.empty((5000, 3), dtype="|S6")
+data.flat = np.array(np.random.rand(data.size))
+for row in data:
+    os.write(tmp_fd, ", ".join(row) + "\n")
+os.close(tmp_fd)
+
+setup = 'from metpy.genloadtxt import loadtxt'
+args = "'%s', dtype=float, delimiter=','" % tmp_fl
+command = "loadtxt(%s, fastpath=False)" % args
+timer = timeit.Timer(command, setup)
+timer_slow = min(timer.repeat(3, 5))
+print command, timer_slow
+command = "loadtxt(%s, fastpath=True)" % args
+timer = timeit.Timer(command, setup)
+timer_fast = min(timer.repeat(3, 5))
+print command, timer_fast, "(%.1fx)" % (timer_slow / timer_fast)
+assert_equal(loadtxt(tmp_fl, dtype=float, delimiter=',', fastpath=True),
+    loadtxt(tmp_fl, dtype=float, delimiter=',', fastpath=False))
+os.remove(tmp_fl)
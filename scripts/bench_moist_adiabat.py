@@ -0,0 +1,28 @@
+#!/usr/bin/python
+# Convergence of the moist adiabats: error at 100 mb intervals versus the
+# number of lapse rate evaluations, for the midpoint scheme with more and
+# more levels and for the adaptive scheme with smaller tolerances
+
+import numpy as np
+from metpy.parcel import moist_lapserate
+from metpy.vis.skewt import calc_moist_adiabat
+
+evals = [0]
+def counting_lapserate(w, T):
+    evals[0] += 1
+    return moist_lapserate(w, T)
+
+Tref = np.arange(-40, 45, 10.)
+P = np.linspace(1000, 100, 10)
+truth = calc_moist_adiabat(Tref, P, tol=1e-10)
+for nlevels in (10, 37, 91, 181, 901):
+    evals[0] = 0
+    T = calc_moist_adiabat(Tref, np.linspace(1000, 100, nlevels),
+        lapse_rate=counting_lapserate)[:, ::(nlevels - 1) // 9]
+    print 'midpoint, %4d levels: %5d evaluations, max error %.2e' % (
+        nlevels, evals[0], np.abs(T - truth).max())
+for tol in (1e-2, 1e-3, 1e-4, 1e-6):
+    evals[0] = 0
+    T = calc_moist_adiabat(Tref, P, tol=tol, lapse_rate=counting_lapserate)
+    print 'adaptive, tol %5g: %5d evaluations, max error %.2e' % (
+        tol, evals[0], np.abs(T - truth).max())
@@ -0,0 +1,17 @@
+#!/usr/bin/python
+# CAPE and CIN for a grid of model columns with their own pressure levels
+
+import time
+import numpy as np
+from metpy.parcel import cape_cin
+
+shape = (500, 400, 30)
+psfc = np.random.uniform(850, 1020, shape[:-1])
+p = psfc[..., np.newaxis] * np.linspace(1, 0.1, shape[-1])
+temp = (np.random.uniform(15, 35, shape[:-1])[..., np.newaxis]
+    - 45. * np.log(psfc[..., np.newaxis] / p)
+    + np.random.uniform(-1, 1, shape))
+dewpt = temp - np.random.uniform(1, 15, shape)
+t = time.time()
+cape, cin = cape_cin(p, temp, dewpt)
+print '%d soundings: %.2f s' % (cape.size, time.time() - t)
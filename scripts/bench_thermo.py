@@ -0,0 +1,21 @@
+#!/usr/bin/python
+# Compare the in-place kernels against the masked implementations on a
+# (smaller) model grid
+
+import timeit
+
+setup = '''
+import numpy as np
+from metpy.calc import dewpoint, heat_index
+temp = np.random.uniform(-20, 40, (200, 200, 50)).astype(np.float32)
+rh = np.random.uniform(0.05, 1, temp.shape).astype(np.float32)
+out = np.empty_like(temp)
+mtemp, mrh = np.ma.array(temp), np.ma.array(rh)
+'''
+for command in ['dewpoint(mtemp, mrh)', 'dewpoint(temp, rh, out=out)',
+    'dewpoint(temp, rh, out=out, workers=4)',
+    'heat_index(mtemp * 2 + 60, mrh * 100)',
+    'heat_index(temp * 2 + 60, rh * 100, out=out)',
+    'heat_index(temp * 2 + 60, rh * 100, out=out, workers=4)']:
+    timer = timeit.Timer(command, setup)
+    print command, min(timer.repeat(3, 5)) / 5
@@ -0,0 +1,19 @@
+#!/usr/bin/python
+# Compare the vapor pressure lookup table to the exact formula
+
+import timeit
+from metpy.calc import VaporPressureTable
+
+print 'Table maximum relative error:', VaporPressureTable().max_rel_error
+for dtype in ['float64', 'float32']:
+    setup = '''
+import numpy as np
+from metpy.calc import vapor_pressure, VaporPressureTable
+table = VaporPressureTable()
+temp = np.random.uniform(-60, 40, 2000000).astype(np.%s)
+out = np.empty_like(temp)
+''' % dtype
+    for command in ['vapor_pressure(temp, out=out)', 'table(temp, out=out)',
+        'vapor_pressure(temp, out=out, table=table)']:
+        timer = timeit.Timer(command, setup)
+        print dtype, command, min(timer.repeat(5, 5)) / 5